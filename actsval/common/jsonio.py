@@ -0,0 +1,233 @@
+""" This module provides the JSON input/output for large configurations and maps
+
+    A fast backend (orjson) is used if available, the standard library
+    json module otherwise. Configurations can be written compact or pretty
+    printed and are read either as a whole or incrementally, such that the
+    entries are processed one at a time. JSON has no NaN or infinity, both
+    backends write non-finite numbers as null.
+"""
+
+import json
+import math
+
+# orjson is a compiled extension, its members are not visible to pylint
+# pylint: disable=no-member
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, the standard library is used instead
+    orjson = None
+
+# The decoder used for the incremental parsing
+_decoder = json.JSONDecoder()
+
+_WHITESPACE = " \t\n\r"
+
+
+def backend() -> str:
+    """The name of the JSON backend in use"""
+    return "orjson" if orjson is not None else "json"
+
+
+def loads(data):
+    """Parse a JSON document from a string or bytes"""
+
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _finite(value):
+    """The value with non-finite numbers replaced by None, as orjson writes them"""
+
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def dumps(value, indent: int = None) -> str:
+    """Serialize a value, compact if indent is None
+
+    The fast backend only indents by two spaces, other even indentations
+    are obtained by scaling the leading spaces of each line. Compact output
+    and an indentation of two are the fastest.
+    """
+
+    if orjson is not None and (indent is None or indent % 2 == 0):
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent is None:
+            return orjson.dumps(value, option=option).decode("utf-8")
+        text = orjson.dumps(value, option=option | orjson.OPT_INDENT_2)
+        if indent != 2:
+            # strings carry no raw newlines or control characters, so the
+            # leading spaces are marked and scaled level by level
+            text = text.replace(b"\n  ", b"\n\x01")
+            while b"\x01  " in text:
+                text = text.replace(b"\x01  ", b"\x01\x01")
+            text = text.replace(b"\x01", b" " * indent)
+        return text.decode("utf-8")
+    if indent is None:
+        return json.dumps(_finite(value), separators=(",", ":"), allow_nan=False)
+    return json.dumps(_finite(value), indent=indent, allow_nan=False)
+
+
+def load(file_name: str):
+    """Read a JSON document as a whole"""
+
+    with open(file_name, "rb") as stream:
+        return loads(stream.read())
+
+
+def write(stream, header: dict, entries, indent: int = None) -> None:
+    """Write a configuration to a text stream, one entry at a time
+
+    The header items are written first, followed by the entries, which can
+    be any iterable, e.g. a generator from the incremental reader.
+    """
+
+    pad = " " * indent if indent is not None else ""
+    newline = "\n" if indent is not None else ""
+    separator = ": " if indent is not None else ":"
+    stream.write("{")
+    for key, value in header.items():
+        text = dumps(value, indent).replace("\n", "\n" + pad)
+        stream.write(newline + pad + json.dumps(key) + separator + text + ",")
+    stream.write(newline + pad + "\"entries\"" + separator + "[")
+    n_entries = 0
+    for entry in entries:
+        text = dumps(entry, indent).replace("\n", "\n" + 2 * pad)
+        stream.write(("," if n_entries > 0 else "") + newline + 2 * pad + text)
+        n_entries += 1
+    stream.write((newline + pad if n_entries > 0 else "") + "]" + newline + "}")
+
+
+class _Buffer:
+    """A text buffer that is refilled from a stream on demand"""
+
+    def __init__(self, stream, chunk_size: int) -> None:
+        """constructor from a text stream"""
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read the next chunk, drop the consumed part, False at the end"""
+
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if chunk == "":
+            self.eof = True
+            return False
+        self.text = self.text[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, empty at the end"""
+
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, characters: str) -> str:
+        """Consume the next non-whitespace character, it must be one of these"""
+
+        character = self.peek()
+        if character == "" or character not in characters:
+            raise ValueError(
+                f"Expected one of '{characters}' in JSON stream, found '{character}'"
+            )
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Decode the next value, reading more data as needed"""
+
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # a value ending with the buffer may be truncated, e.g. a number
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iterate(stream, chunk_size: int = 1 << 20):
+    """Parse a configuration incrementally from a text stream
+
+    Yields (key, value) for the top-level items, except for the entries
+    array, whose elements are yielded one by one as ("entries", entry).
+    Only one entry at a time is held in memory.
+    """
+
+    buffer = _Buffer(stream, chunk_size)
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        key = buffer.value()
+        buffer.expect(":")
+        if key == "entries" and buffer.peek() == "[":
+            buffer.expect("[")
+            if buffer.peek() == "]":
+                buffer.expect("]")
+            else:
+                while True:
+                    yield key, buffer.value()
+                    if buffer.expect(",]") == "]":
+                        break
+        else:
+            yield key, buffer.value()
+        if buffer.expect(",}") == "}":
+            return
+
+
+def patch(stream_in, stream_out, patcher, indent: int = None) -> int:
+    """Stream a configuration from input to output, patching the entries
+
+    The patcher is called for every entry and may modify it in place, the
+    header items have to precede the entries. Returns the number of entries.
+    """
+
+    items = iterate(stream_in)
+    header = {}
+    first = None
+    # collect the header until the first entry
+    for key, value in items:
+        if key == "entries":
+            first = value
+            break
+        header[key] = value
+
+    n_entries = 0
+
+    def patched():
+        """Patch the entries as they are streamed through"""
+        nonlocal n_entries
+        entry = first
+        while entry is not None:
+            patcher(entry)
+            n_entries += 1
+            yield entry
+            key, entry = next(items, (None, None))
+            if key not in [None, "entries"]:
+                raise ValueError(f"Header item '{key}' after the entries")
+
+    write(stream_out, header, patched(), indent)
+    return n_entries
@@ -0,0 +1,191 @@
+""" This module provides access to the digitization configuration entries
+
+    The entries of a digitization configuration are identified by their
+    (volume, layer, extra) key, where a missing layer or extra bit is
+    represented by None and stands for all layers or extra bits.
+"""
+
+import copy
+import fnmatch
+
+from common import jsonio
+
+
+def entry_key(entry: dict) -> tuple:
+    """The (volume, layer, extra) key of a configuration entry"""
+
+    return (entry["volume"], entry.get("layer"), entry.get("extra"))
+
+
+def make_key(volume: int, layer: int = None, extra: int = None) -> tuple:
+    """The key for a volume, layer and extra id, ids <= 0 mean all"""
+
+    return (
+        volume,
+        layer if layer is not None and layer > 0 else None,
+        extra if extra is not None and extra > 0 else None,
+    )
+
+
+class ConfigIndex:
+    """An index over the digitization configuration entries
+
+    The index is built once and kept up to date when entries are
+    inserted, lookups are constant time. If an entry key appears more
+    than once, the first entry is indexed.
+    """
+
+    def __init__(self, entries: list) -> None:
+        """constructor from the list of entries, which is not copied"""
+        self.entries = entries
+        self.index = {}
+        for position, entry in enumerate(entries):
+            self.index.setdefault(entry_key(entry), position)
+
+    def __len__(self) -> int:
+        """number of indexed keys"""
+        return len(self.index)
+
+    def __contains__(self, key: tuple) -> bool:
+        """check if there is an entry for exactly this key"""
+        return key in self.index
+
+    def get(self, volume: int, layer: int = None, extra: int = None) -> dict:
+        """The entry for exactly this key, None if not present"""
+
+        position = self.index.get(make_key(volume, layer, extra))
+        return self.entries[position] if position is not None else None
+
+    def find(self, volume: int, layer: int = None, extra: int = None) -> dict:
+        """The entry for this key with hierarchical fallback
+
+        The fallback goes from (volume, layer, extra) to (volume, layer)
+        and then to the volume entry, None if neither is present.
+        """
+
+        volume, layer, extra = make_key(volume, layer, extra)
+        for key in [(volume, layer, extra), (volume, layer, None), (volume, None, None)]:
+            position = self.index.get(key)
+            if position is not None:
+                return self.entries[position]
+        return None
+
+    def insert(self, entry: dict) -> dict:
+        """Insert an entry, an existing entry with the same key is replaced"""
+
+        key = entry_key(entry)
+        position = self.index.get(key)
+        if position is None:
+            self.index[key] = len(self.entries)
+            self.entries.append(entry)
+        else:
+            self.entries[position] = entry
+        return entry
+
+    def derive(self, volume: int, layer: int = None, extra: int = None) -> dict:
+        """The entry for exactly this key, derived if not present
+
+        A missing entry is copied from the hierarchical fallback, the
+        layer and extra ids are set and the new entry is inserted.
+        Returns None if there is not even a volume entry.
+        """
+
+        volume, layer, extra = make_key(volume, layer, extra)
+        entry = self.get(volume, layer, extra)
+        if entry is not None:
+            return entry
+        fallback = self.find(volume, layer, extra)
+        if fallback is None:
+            return None
+        entry = copy.deepcopy(fallback)
+        if layer is not None:
+            entry["layer"] = layer
+        if extra is not None:
+            entry["extra"] = extra
+        return self.insert(entry)
+
+
+def _match(value, patterns: list) -> bool:
+    """Check a single id against a list of glob patterns, None matches all"""
+
+    if patterns is None:
+        return True
+    if value is None:
+        return False
+    return any(fnmatch.fnmatchcase(str(value), str(pattern)) for pattern in patterns)
+
+
+def matches(
+    entry: dict, volumes: list = None, layers: list = None, extras: list = None
+) -> bool:
+    """Check if an entry is selected by the glob patterns
+
+    A missing pattern list selects all entries, a given pattern list only
+    selects entries that have this id, e.g. layers=["*"] selects all layer
+    entries but not the volume entries.
+    """
+
+    volume, layer, extra = entry_key(entry)
+    return (
+        _match(volume, volumes) and _match(layer, layers) and _match(extra, extras)
+    )
+
+
+def _is_below(key: tuple, parent: tuple) -> bool:
+    """Check if a key is strictly finer than the parent key"""
+
+    if key == parent or key[0] != parent[0]:
+        return False
+    return all(p is None or p == k for k, p in zip(key[1:], parent[1:]))
+
+
+def merge(configs: list, selector=None, hierarchical: bool = False) -> dict:
+    """Merge configurations, later ones are overlaid onto earlier ones
+
+    The first configuration is the base and is updated in place. Entries
+    of the later configurations replace base entries with the same key or
+    are appended, if a selector is given, only selected entries are taken
+    over. In hierarchical mode, an overlaid entry also removes the finer
+    entries below it that stem from earlier configurations, e.g. a volume
+    entry replaces all layer entries of that volume.
+    """
+
+    base = configs[0]
+    index = ConfigIndex(base["entries"])
+    for overlay in configs[1:]:
+        entries = [
+            entry
+            for entry in overlay["entries"]
+            if selector is None or selector(entry)
+        ]
+        if hierarchical:
+            keys = {entry_key(entry) for entry in entries}
+            parents = {}
+            for key in keys:
+                parents.setdefault(key[0], []).append(key)
+            removed = {
+                key
+                for key in index.index
+                if any(_is_below(key, parent) for parent in parents.get(key[0], []))
+                and key not in keys
+            }
+            if len(removed) > 0:
+                kept = [
+                    entry for entry in index.entries if entry_key(entry) not in removed
+                ]
+                index = ConfigIndex(kept)
+        for entry in entries:
+            index.insert(entry)
+    base["entries"] = index.entries
+    return base
+
+
+def dump(cfg: dict, stream, indent: int = 4) -> None:
+    """Write a configuration to a text stream, one entry at a time
+
+    The header items are written before the entries, compact output is
+    written for indent=None.
+    """
+
+    header = {key: value for key, value in cfg.items() if key != "entries"}
+    jsonio.write(stream, header, cfg.get("entries", []), indent)
@@ -0,0 +1,169 @@
+""" This module provides robust width estimators for filled histograms
+
+    All estimators work on stacked histogram contents, i.e. an array of
+    counts with shape (n_histograms, n_bins) and the matching bin edges
+    with shape (n_histograms, n_bins + 1), such that thousands of
+    histograms are processed in one vectorized call.
+"""
+
+import numpy as np
+
+# The central interval corresponding to one standard deviation
+CENTRAL68 = (0.158655, 0.841345)
+
+
+def stack(hists: list) -> tuple:
+    """Stack the contents and edges of one-dimensional histograms"""
+
+    counts = np.stack([h.values() for h in hists]).astype(np.float64)
+    edges = np.stack([h.axes[0].edges for h in hists]).astype(np.float64)
+    return counts, edges
+
+
+def rms(counts: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Binned root mean square (around zero) of the histograms"""
+
+    centers = 0.5 * (edges[:, :-1] + edges[:, 1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.sqrt(
+            np.sum(counts * centers**2, axis=1) / np.sum(counts, axis=1)
+        )
+
+
+def quantiles(counts: np.ndarray, edges: np.ndarray, probs: list) -> np.ndarray:
+    """Quantiles of the histograms, linearly interpolated within the bins
+
+    Returns an array of shape (len(probs), n_histograms), histograms without
+    entries yield NaN.
+    """
+
+    totals = np.sum(counts, axis=1)
+    cdf = np.cumsum(counts, axis=1)
+    rows = np.arange(counts.shape[0])
+    results = np.full((len(probs), counts.shape[0]), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for ip, prob in enumerate(probs):
+            target = prob * totals
+            # first bin where the cumulative sum reaches the target
+            ibin = np.minimum(np.sum(cdf < target[:, None], axis=1), counts.shape[1] - 1)
+            below = np.where(ibin > 0, cdf[rows, np.maximum(ibin - 1, 0)], 0.0)
+            inbin = counts[rows, ibin]
+            frac = np.where(inbin > 0, (target - below) / inbin, 0.5)
+            low = edges[rows, ibin]
+            high = edges[rows, ibin + 1]
+            results[ip] = np.where(totals > 0, low + frac * (high - low), np.nan)
+    return results
+
+
+def central_interval(
+    counts: np.ndarray, edges: np.ndarray, interval: tuple = CENTRAL68
+) -> np.ndarray:
+    """Half width of the central interval, equals sigma for a Gaussian"""
+
+    low, high = quantiles(counts, edges, list(interval))
+    return 0.5 * (high - low)
+
+
+def truncated_rms(
+    counts: np.ndarray, edges: np.ndarray, fraction: float = 0.95
+) -> np.ndarray:
+    """Root mean square (around zero) of the central fraction of entries
+
+    The truncation window is given by the quantiles of the central
+    fraction, bins at the window border enter with their overlap.
+    """
+
+    tail = 0.5 * (1.0 - fraction)
+    low, high = quantiles(counts, edges, [tail, 1.0 - tail])
+    bin_widths = edges[:, 1:] - edges[:, :-1]
+    overlap = np.minimum(edges[:, 1:], high[:, None]) - np.maximum(
+        edges[:, :-1], low[:, None]
+    )
+    weights = counts * np.clip(overlap / bin_widths, 0.0, 1.0)
+    centers = 0.5 * (edges[:, :-1] + edges[:, 1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.sqrt(
+            np.sum(weights * centers**2, axis=1) / np.sum(weights, axis=1)
+        )
+
+
+def gaussian_core(
+    counts: np.ndarray,
+    edges: np.ndarray,
+    nsigma: float = 2.0,
+    iterations: int = 3,
+) -> tuple:
+    """Gaussian fit to the core of the histograms
+
+    The logarithm of the bin contents is fitted with a parabola by weighted
+    least squares within +/- nsigma around the current estimate, starting
+    from the median and the central 68% interval. The fit is iterated and
+    done for all histograms at once. Histograms where the fit fails keep the
+    starting values.
+
+    Returns the (mean, sigma) arrays.
+    """
+
+    centers = 0.5 * (edges[:, :-1] + edges[:, 1:])
+    q16, q50, q84 = quantiles(counts, edges, [CENTRAL68[0], 0.5, CENTRAL68[1]])
+    mean = q50
+    sigma = 0.5 * (q84 - q16)
+    logc = np.log(np.where(counts > 0, counts, 1.0))
+    for _ in range(iterations):
+        # bins inside the core window, the variance of log(n) is 1/n
+        window = np.abs(centers - mean[:, None]) <= nsigma * sigma[:, None]
+        weights = np.where(window & (counts > 0), counts, 0.0)
+        # shift the abscissa for a well conditioned system
+        xval = centers - np.where(np.isfinite(mean), mean, 0.0)[:, None]
+        powers = np.stack([np.ones_like(xval), xval, xval**2], axis=-1)
+        lhs = np.einsum("hb,hbi,hbj->hij", weights, powers, powers)
+        rhs = np.einsum("hb,hbi,hb->hi", weights, powers, logc)
+        # only solve the well-defined systems (at least three bins)
+        valid = np.sum(weights > 0, axis=1) >= 3
+        valid &= np.abs(np.linalg.det(lhs)) > 0
+        coeffs = np.zeros_like(rhs)
+        if np.any(valid):
+            coeffs[valid] = np.linalg.solve(lhs[valid], rhs[valid][..., None])[..., 0]
+        valid &= coeffs[:, 2] < 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fit_sigma = np.sqrt(-0.5 / coeffs[:, 2])
+            fit_mean = mean - 0.5 * coeffs[:, 1] / coeffs[:, 2]
+        mean = np.where(valid, fit_mean, mean)
+        sigma = np.where(valid, fit_sigma, sigma)
+    return mean, sigma
+
+
+def gaussian_core_sigma(
+    counts: np.ndarray, edges: np.ndarray, nsigma: float = 2.0
+) -> np.ndarray:
+    """Width of the Gaussian core fit"""
+
+    return gaussian_core(counts, edges, nsigma)[1]
+
+
+# The estimators that can be chosen by name
+ESTIMATORS = {
+    "rms": rms,
+    "truncated-rms": truncated_rms,
+    "central68": central_interval,
+    "gauss-core": gaussian_core_sigma,
+}
+
+
+def widths(hists: list, estimator: str, **kwargs) -> np.ndarray:
+    """Estimate the widths of a list of one-dimensional histograms
+
+    Histograms are stacked by number of bins, so each group is processed
+    in one vectorized call.
+    """
+
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unknown width estimator '{estimator}'")
+    results = np.full(len(hists), np.nan)
+    groups = {}
+    for ih, h in enumerate(hists):
+        groups.setdefault(h.axes[0].size, []).append(ih)
+    for indices in groups.values():
+        counts, edges = stack([hists[ih] for ih in indices])
+        results[indices] = ESTIMATORS[estimator](counts, edges, **kwargs)
+    return results
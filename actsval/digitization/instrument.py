@@ -0,0 +1,215 @@
+""" This module records the time and memory spent per processing phase
+
+    Phases are timed with a context manager, they carry the number of rows
+    processed and the peak resident memory at their end. The records are
+    summarised per phase and can be written as a JSON trace, or as a Chrome
+    trace event file to be inspected in chrome://tracing or Perfetto.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+FORMATS = ["json", "chrome"]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB"""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+class TimingExecutor:
+    """A synchronous executor that accumulates the time spent in its tasks
+
+    It can be handed to readers that accept an executor, e.g. as the
+    decompression executor of uproot, to separate this part of the reading.
+    """
+
+    def __init__(self) -> None:
+        """constructor with zero time"""
+        self.time = 0.0
+
+    def submit(self, task, /, *args, **kwargs) -> Future:
+        """Run the task immediately and return its result as a done future"""
+
+        start = time.perf_counter()
+        future = Future()
+        try:
+            future.set_result(task(*args, **kwargs))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            future.set_exception(error)
+        self.time += time.perf_counter() - start
+        return future
+
+    def take(self) -> float:
+        """The accumulated time, which is reset"""
+
+        accumulated, self.time = self.time, 0.0
+        return accumulated
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Nothing to be shut down, tasks run synchronously"""
+
+
+class Recorder:
+    """Collects the timed phases of a run"""
+
+    def __init__(self) -> None:
+        """constructor, the time origin is the construction time"""
+        self.origin = time.perf_counter()
+        self.records = []
+        # the index of the current batch, counted over all timed iterables
+        self.batch = -1
+
+    @contextmanager
+    def phase(self, name: str, rows: int = 0, **labels):
+        """Time a phase, the yielded record can be updated, e.g. with the rows"""
+
+        record = dict(labels, name=name, rows=rows)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["start"] = start - self.origin
+            record["duration"] = time.perf_counter() - start
+            record["peak_rss_mb"] = peak_rss_mb()
+            self.records.append(record)
+
+    def timed(self, name: str, iterable, **labels):
+        """Time the production of every item of an iterable, e.g. a reader
+
+        The phase of each item is labelled with the running batch index
+        and with its length as rows.
+        """
+
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.batch += 1
+            self.records.append(
+                dict(
+                    labels,
+                    name=name,
+                    batch=self.batch,
+                    rows=len(item),
+                    start=start - self.origin,
+                    duration=time.perf_counter() - start,
+                    peak_rss_mb=peak_rss_mb(),
+                )
+            )
+            yield item
+
+    def split_last(self, name: str, duration: float) -> None:
+        """Split a part of the given duration off the last record
+
+        This separates e.g. the decompression, timed by an executor, from
+        the reading it is part of.
+        """
+
+        last = self.records[-1]
+        duration = min(duration, last["duration"])
+        last["duration"] -= duration
+        self.records.append(
+            dict(last, name=name, start=last["start"] + last["duration"], duration=duration)
+        )
+
+    def batch_records(self, batch: int) -> list:
+        """The records of one batch"""
+        return [record for record in self.records if record.get("batch") == batch]
+
+    def summary(self) -> dict:
+        """Total time, calls, rows and rows per second per phase"""
+
+        phases = {}
+        for record in self.records:
+            phase = phases.setdefault(
+                record["name"], {"calls": 0, "time": 0.0, "rows": 0}
+            )
+            phase["calls"] += 1
+            phase["time"] += record["duration"]
+            phase["rows"] += record["rows"]
+        for phase in phases.values():
+            phase["rows_per_second"] = (
+                phase["rows"] / phase["time"] if phase["time"] > 0 else 0.0
+            )
+        return phases
+
+    def log_batch(self, batch: int) -> None:
+        """Log the phases of one batch in one line"""
+
+        records = self.batch_records(batch)
+        if len(records) == 0:
+            return
+        phases = ", ".join(
+            f"{record['name']} {record['duration']:.3f} s" for record in records
+        )
+        rows = max(record["rows"] for record in records)
+        duration = sum(record["duration"] for record in records)
+        rate = rows / duration if duration > 0 else 0.0
+        logging.info(
+            f"Batch {batch}: {rows} rows, {phases}, {rate:.0f} rows/s, "
+            f"peak RSS {records[-1]['peak_rss_mb']:.0f} MB"
+        )
+
+    def log_summary(self) -> None:
+        """Log the summary per phase"""
+
+        for name, phase in self.summary().items():
+            logging.info(
+                f"Phase {name}: {phase['time']:.3f} s in {phase['calls']} calls"
+                + (f", {phase['rows_per_second']:.0f} rows/s" if phase["rows"] > 0 else "")
+            )
+        logging.info(f"Peak RSS {peak_rss_mb():.0f} MB")
+
+    def write(self, file_name: str, fmt: str = "json") -> None:
+        """Write the records as JSON trace or as Chrome trace events"""
+
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown trace format '{fmt}'")
+        if fmt == "json":
+            trace = {"phases": self.records, "summary": self.summary()}
+        else:
+            pid = os.getpid()
+            events = []
+            for record in self.records:
+                labels = {
+                    key: value
+                    for key, value in record.items()
+                    if key not in ["name", "start", "duration"]
+                }
+                events.append(
+                    {
+                        "name": record["name"],
+                        "ph": "X",
+                        "ts": record["start"] * 1e6,
+                        "dur": record["duration"] * 1e6,
+                        "pid": pid,
+                        "tid": 0,
+                        "args": labels,
+                    }
+                )
+                # the memory as counter track
+                events.append(
+                    {
+                        "name": "peak RSS [MB]",
+                        "ph": "C",
+                        "ts": (record["start"] + record["duration"]) * 1e6,
+                        "pid": pid,
+                        "args": {"rss": record["peak_rss_mb"]},
+                    }
+                )
+            trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        with open(file_name, "w", encoding="utf-8") as stream:
+            json.dump(trace, stream, indent=1)
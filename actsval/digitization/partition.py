@@ -0,0 +1,69 @@
+""" This module partitions measurement rows by their geometry key
+
+    The (volume, layer, extra) ids are packed into one integer key, a
+    stable sort by this key makes the rows of every key contiguous, such
+    that all selections become slices, i.e. views without copies.
+"""
+
+import numpy as np
+
+# Bits per packed id, the ids are stored with an offset of one, so -1 fits
+ID_BITS = 21
+ID_MASK = (1 << ID_BITS) - 1
+
+
+def pack(volume_id, layer_id, extra_id):
+    """Pack (arrays of) volume, layer and extra ids into int64 keys, ids >= -1"""
+
+    return (
+        (np.asarray(volume_id, dtype=np.int64) + 1) << (2 * ID_BITS)
+        | (np.asarray(layer_id, dtype=np.int64) + 1) << ID_BITS
+        | (np.asarray(extra_id, dtype=np.int64) + 1)
+    )
+
+
+def unpack(keys) -> list:
+    """Unpack int64 keys into a list of (volume, layer, extra) tuples"""
+
+    keys = np.asarray(keys, dtype=np.int64)
+    volume_ids = (keys >> (2 * ID_BITS)) - 1
+    layer_ids = ((keys >> ID_BITS) & ID_MASK) - 1
+    extra_ids = (keys & ID_MASK) - 1
+    return list(
+        zip(volume_ids.tolist(), layer_ids.tolist(), extra_ids.tolist())
+    )
+
+
+class Partition:
+    """Contiguous row ranges per packed key
+
+    The rows are ordered once by a stable argsort of the keys, columns
+    sorted with this order can then be sliced per key.
+    """
+
+    def __init__(self, keys: np.ndarray) -> None:
+        """constructor from the packed key per row"""
+        self.order = np.argsort(keys, kind="stable")
+        self.keys, self.starts, self.counts = np.unique(
+            keys[self.order], return_index=True, return_counts=True
+        )
+        self.slices = {
+            int(key): slice(int(start), int(start + count))
+            for key, start, count in zip(self.keys, self.starts, self.counts)
+        }
+
+    def __len__(self) -> int:
+        """number of distinct keys"""
+        return len(self.keys)
+
+    def sort(self, column: np.ndarray) -> np.ndarray:
+        """Bring a column into the partition order, this is the only copy"""
+        return column[self.order]
+
+    def rows(self, key: int) -> slice:
+        """The slice of sorted rows for a key, empty if the key is not present"""
+        return self.slices.get(int(key), slice(0, 0))
+
+    def reduce(self, ufunc: np.ufunc, column: np.ndarray) -> np.ndarray:
+        """Reduce a sorted column per key, e.g. np.fmax for the maximum"""
+        return ufunc.reduceat(column, self.starts) if len(self.starts) > 0 else column[:0]
@@ -0,0 +1,160 @@
+""" This module keeps the filling state of the parameterisation
+
+    The state holds the booked histograms with their accumulated moments,
+    the geometry keys and the inputs already processed. It is written to
+    an npz file together with the binning and key configuration, such that
+    a later run can resume and fill only new files or entry ranges.
+"""
+
+import json
+
+import hist
+import numpy as np
+from hist import Hist
+
+# The version of the file layout, states of other versions are rejected
+FORMAT_VERSION = 2
+
+
+class State:
+    """The histograms and moments filled so far"""
+
+    def __init__(self, config: dict) -> None:
+        """constructor from the configuration the histograms are booked with"""
+        self.config = config
+        # name -> [histogram, accumulated value]
+        self.histograms = {}
+        self.histograms_overview = {}
+        self.unique_ids = []
+        self.process_unique_ids = []
+        self.n_batches = 0
+        self.inputs = []
+
+    def __len__(self) -> int:
+        """number of one-dimensional histograms"""
+        return len(self.histograms)
+
+    def add_ids(self, unique_ids: list, process_unique_ids: list) -> None:
+        """Add the geometry keys that are not yet known, keeping the order"""
+
+        for known, ids in [
+            (self.unique_ids, unique_ids),
+            (self.process_unique_ids, process_unique_ids),
+        ]:
+            seen = set(known)
+            known.extend(key for key in ids if key not in seen)
+
+    def book(self, histograms: dict, histograms_overview: dict) -> int:
+        """Add booked histograms whose names are not yet known
+
+        Returns the number of newly added histograms, existing ones keep
+        their binning and content.
+        """
+
+        n_booked = 0
+        for known, booked in [
+            (self.histograms, histograms),
+            (self.histograms_overview, histograms_overview),
+        ]:
+            for name, hist_value in booked.items():
+                if name not in known:
+                    known[name] = hist_value
+                    n_booked += 1
+        return n_booked
+
+    def processed(self, input_range: dict) -> bool:
+        """Check if an input (file, tree and entry range) was already filled"""
+        return input_range in self.inputs
+
+
+def _axis_spec(axis) -> list:
+    """The type and parameters of a regular or (growing) integer category axis"""
+
+    if isinstance(axis, hist.axis.IntCategory):
+        return ["category", [int(value) for value in axis], axis.name]
+    return ["regular", axis.size, float(axis.edges[0]), float(axis.edges[-1]), axis.name]
+
+
+def _axis(spec: list):
+    """The axis from its specification"""
+
+    if spec[0] == "category":
+        return hist.axis.IntCategory(spec[1], growth=True, name=spec[2])
+    return hist.axis.Regular(bins=spec[1], start=spec[2], stop=spec[3], name=spec[4])
+
+
+def save(file_name: str, fill_state: State) -> None:
+    """Write the state as npz file, the histogram contents include the flow bins"""
+
+    groups = {"histograms": fill_state.histograms,
+              "histograms_overview": fill_state.histograms_overview}
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "config": fill_state.config,
+        "unique_ids": fill_state.unique_ids,
+        "process_unique_ids": fill_state.process_unique_ids,
+        "n_batches": fill_state.n_batches,
+        "inputs": fill_state.inputs,
+    }
+    arrays = {}
+    for group, histograms in groups.items():
+        meta[group] = [
+            [name, [_axis_spec(axis) for axis in hist_value[0].axes]]
+            for name, hist_value in histograms.items()
+        ]
+        contents = [hist_value[0].values(flow=True).ravel() for hist_value in histograms.values()]
+        arrays[group + "_values"] = (
+            np.concatenate(contents) if len(contents) > 0 else np.zeros(0)
+        )
+        # the moments are scalars or arrays, they keep their precision,
+        # such that a resumed sum continues exactly
+        moments = [hist_value[1] for hist_value in histograms.values()]
+        meta[group + "_moment_shapes"] = [list(np.shape(moment)) for moment in moments]
+        meta[group + "_moment_dtypes"] = [np.asarray(moment).dtype.str for moment in moments]
+        arrays[group + "_moments"] = (
+            np.concatenate([np.ravel(moment).astype(np.float64) for moment in moments])
+            if len(moments) > 0
+            else np.zeros(0)
+        )
+    with open(file_name, "wb") as stream:
+        np.savez(stream, meta=np.array(json.dumps(meta)), **arrays)
+
+
+def load(file_name: str) -> State:
+    """Read a state written with save"""
+
+    with np.load(file_name, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"State '{file_name}' has format version {meta.get('format_version')},"
+                f" expected {FORMAT_VERSION}"
+            )
+        fill_state = State(meta["config"])
+        fill_state.unique_ids = [tuple(key) for key in meta["unique_ids"]]
+        fill_state.process_unique_ids = [tuple(key) for key in meta["process_unique_ids"]]
+        fill_state.n_batches = meta["n_batches"]
+        fill_state.inputs = meta["inputs"]
+        for group, histograms in [
+            ("histograms", fill_state.histograms),
+            ("histograms_overview", fill_state.histograms_overview),
+        ]:
+            values = np.asarray(data[group + "_values"])
+            moments = np.asarray(data[group + "_moments"])
+            offset = 0
+            moment_offset = 0
+            for (name, axes), shape, dtype in zip(
+                meta[group], meta[group + "_moment_shapes"], meta[group + "_moment_dtypes"]
+            ):
+                restored = Hist(*[_axis(spec) for spec in axes])
+                view = restored.view(flow=True)
+                view[...] = values[offset : offset + view.size].reshape(view.shape)
+                offset += view.size
+                size = int(np.prod(shape))
+                moment = (
+                    moments[moment_offset : moment_offset + size].reshape(shape).astype(dtype)
+                )
+                moment_offset += size
+                # scalars are restored as numpy scalars of the saved precision
+                histograms[name] = [restored, moment if len(shape) > 0 else moment[()]]
+    return fill_state
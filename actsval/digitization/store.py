@@ -0,0 +1,89 @@
+""" This module stores the residual histograms of all cluster sizes at once
+
+    One histogram per (key, variable) with a growing integer category axis
+    for the cluster size replaces one histogram per cluster size, so only
+    the cluster sizes that occur are allocated and every batch is filled
+    with a single call. The per batch rms is accumulated per cluster size
+    next to the histogram. The one-dimensional histograms per cluster size,
+    cluster size 0 standing for all, are projected out after the filling.
+"""
+
+import hist
+import numpy as np
+from hist import Hist
+
+# The name of the cluster size axis
+CLUSTER_SIZE = "cluster_size"
+
+
+def book(bins: int, start: float, stop: float, name: str) -> list:
+    """A new entry: the histogram and the rms sums, all cluster sizes first"""
+
+    return [
+        Hist(
+            hist.axis.IntCategory([], growth=True, name=CLUSTER_SIZE),
+            hist.axis.Regular(bins=bins, start=start, stop=stop, name=name),
+        ),
+        np.zeros(1),
+    ]
+
+
+def fill(entry: list, sizes: np.ndarray, values: np.ndarray) -> None:
+    """Fill the values with their cluster sizes and accumulate the batch rms
+
+    NaN values are dropped. The rms of this batch is added for all cluster
+    sizes together and for every cluster size that has entries.
+    """
+
+    valid = ~np.isnan(values)
+    values = values[valid]
+    sizes = sizes[valid]
+    if len(values) == 0:
+        return
+    histogram = entry[0]
+    histogram.fill(sizes, values)
+
+    # the rms per cluster size of this batch, aligned with the category axis
+    unique_sizes, inverse = np.unique(sizes, return_inverse=True)
+    squares = values.astype(np.float64) ** 2
+    rms = np.sqrt(np.bincount(inverse, weights=squares) / np.bincount(inverse))
+    categories = histogram.axes[0].size
+    if len(entry[1]) < categories + 1:
+        entry[1] = np.concatenate([entry[1], np.zeros(categories + 1 - len(entry[1]))])
+    entry[1][0] += np.sqrt(np.mean(squares))
+    entry[1][1 + np.asarray(histogram.axes[0].index(unique_sizes))] += rms
+
+
+def cluster_sizes(entry: list) -> list:
+    """The cluster sizes with entries"""
+    return sorted(int(size) for size in entry[0].axes[0])
+
+
+def project(entry: list, cluster_size: int = 0) -> list:
+    """The histogram and rms sum of one cluster size, 0 for all cluster sizes
+
+    Cluster sizes without entries give an empty histogram and a zero sum.
+    """
+
+    histogram = entry[0]
+    if cluster_size == 0:
+        return [histogram[sum, :], float(entry[1][0])]
+    if cluster_size not in cluster_sizes(entry):
+        empty = Hist(histogram.axes[1])
+        return [empty, 0.0]
+    index = histogram.axes[0].index(cluster_size)
+    return [histogram[index, :], float(entry[1][1 + index])]
+
+
+def expand(entry: list, max_cluster_size: int = None) -> dict:
+    """The histograms and rms sums per cluster size, 0 for all cluster sizes
+
+    All cluster sizes from 1 to the largest one with entries are given, the
+    largest cluster size can be limited.
+    """
+
+    sizes = cluster_sizes(entry)
+    largest = max(sizes) if len(sizes) > 0 else 0
+    if max_cluster_size is not None:
+        largest = min(largest, max_cluster_size)
+    return {size: project(entry, size) for size in range(0, largest + 1)}
@@ -0,0 +1,198 @@
+""" This module generates synthetic measurement trees
+
+    The trees follow the branch schema of the ACTS root measurement writer,
+    with a configurable number of volumes, layers and extra ids, cluster
+    size distributions and residual shapes. They allow to run and benchmark
+    the digitization parameterisation without a simulation.
+"""
+
+import numpy as np
+
+# The branches of the measurement tree and their types, in writer order
+SCHEMA = {
+    "event_nr": "int32",
+    "volume_id": "int32",
+    "layer_id": "int32",
+    "surface_id": "int32",
+    "extra_id": "int32",
+    "rec_loc0": "float32",
+    "rec_loc1": "float32",
+    "rec_time": "float32",
+    "var_loc0": "float32",
+    "var_loc1": "float32",
+    "var_time": "float32",
+    "clus_size": "int32",
+    "channel_value": "var * float32",
+    "channel_loc0": "var * int32",
+    "clus_size_loc0": "int32",
+    "channel_loc1": "var * int32",
+    "clus_size_loc1": "int32",
+    "true_loc0": "float32",
+    "true_loc1": "float32",
+    "true_phi": "float32",
+    "true_theta": "float32",
+    "true_qop": "float32",
+    "true_time": "float32",
+    "true_x": "float32",
+    "true_y": "float32",
+    "true_z": "float32",
+    "true_incident_phi": "float32",
+    "true_incident_theta": "float32",
+    "residual_loc0": "float32",
+    "residual_loc1": "float32",
+    "residual_time": "float32",
+    "pull_loc0": "float32",
+    "pull_loc1": "float32",
+    "pull_time": "float32",
+}
+
+# The residual shapes that can be generated
+SHAPES = ["gauss", "box", "tails"]
+
+
+class Detector:
+    """The geometry and response of the synthetic detector"""
+
+    def __init__(
+        self,
+        volumes: list = None,
+        layers: int = 3,
+        extras: int = 0,
+        cluster_size_mean: tuple = (1.5, 2.0),
+        resolution: tuple = (0.01, 0.03, 0.5),
+        shape: str = "gauss",
+        outlier_fraction: float = 0.02,
+        outlier_scale: float = 20.0,
+        pitch: tuple = (0.05, 0.05),
+        hits_per_event: int = 1000,
+    ) -> None:
+        """constructor with default arguments
+
+        Layers are numbered 2, 4, ... per volume, extra ids 1, 2, ... and
+        0 if there are none. The cluster sizes per direction follow a
+        geometric distribution with the given means, the residuals of
+        (loc0, loc1, time) have the given resolution and shape. The
+        resolution shrinks with the square root of the cluster size.
+        """
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown residual shape '{shape}'")
+        self.volumes = volumes if volumes is not None else [8, 9, 16]
+        self.layers = [2 * (il + 1) for il in range(layers)]
+        self.extras = [ie + 1 for ie in range(extras)] if extras > 0 else [0]
+        self.cluster_size_mean = cluster_size_mean
+        self.resolution = resolution
+        self.shape = shape
+        self.outlier_fraction = outlier_fraction
+        self.outlier_scale = outlier_scale
+        self.pitch = pitch
+        self.hits_per_event = hits_per_event
+
+
+def _residuals(rng, detector: Detector, sigma: np.ndarray) -> np.ndarray:
+    """Residuals with the detector shape and per row resolution"""
+
+    if detector.shape == "box":
+        # a binary readout, the rms of a box of width w is w / sqrt(12)
+        return rng.uniform(-0.5, 0.5, len(sigma)) * np.sqrt(12.0) * sigma
+    residuals = rng.normal(0.0, 1.0, len(sigma)) * sigma
+    if detector.shape == "tails":
+        outliers = rng.random(len(sigma)) < detector.outlier_fraction
+        residuals[outliers] *= detector.outlier_scale
+    return residuals
+
+
+def generate(rng, detector: Detector, n_rows: int, first_row: int = 0) -> dict:
+    """Generate the branches for a number of rows
+
+    Returns a dictionary of numpy arrays, the jagged channel branches are
+    given as (offsets, content) tuples.
+    """
+
+    columns = {}
+    rows = np.arange(first_row, first_row + n_rows)
+    columns["event_nr"] = rows // detector.hits_per_event
+    columns["volume_id"] = rng.choice(detector.volumes, n_rows)
+    columns["layer_id"] = rng.choice(detector.layers, n_rows)
+    columns["surface_id"] = rng.integers(1, 1000, n_rows)
+    columns["extra_id"] = rng.choice(detector.extras, n_rows)
+
+    # cluster sizes and channels
+    cluster_sizes = [
+        rng.geometric(1.0 / max(mean, 1.0), n_rows) for mean in detector.cluster_size_mean
+    ]
+    columns["clus_size_loc0"], columns["clus_size_loc1"] = cluster_sizes
+    columns["clus_size"] = cluster_sizes[0] * cluster_sizes[1]
+    n_channels = columns["clus_size"]
+    offsets = np.concatenate([[0], np.cumsum(n_channels)])
+    for ic, pitch in enumerate(detector.pitch):
+        first_channel = rng.integers(0, int(20.0 / pitch), n_rows)
+        # the channels of a cluster are consecutive in this direction
+        local = np.arange(offsets[-1]) - np.repeat(offsets[:-1], n_channels)
+        divisor = cluster_sizes[1] if ic == 0 else np.ones(n_rows, dtype=np.int64)
+        steps = (local // np.repeat(divisor, n_channels)) % np.repeat(
+            cluster_sizes[ic], n_channels
+        )
+        columns[f"channel_loc{ic}"] = (
+            offsets,
+            np.repeat(first_channel, n_channels) + steps,
+        )
+    columns["channel_value"] = (offsets, rng.exponential(1.0, offsets[-1]))
+
+    # truth
+    columns["true_loc0"] = rng.uniform(-10.0, 10.0, n_rows)
+    columns["true_loc1"] = rng.uniform(-30.0, 30.0, n_rows)
+    columns["true_phi"] = rng.uniform(-np.pi, np.pi, n_rows)
+    columns["true_theta"] = rng.uniform(0.1, np.pi - 0.1, n_rows)
+    columns["true_qop"] = rng.choice([-1.0, 1.0], n_rows) / rng.uniform(0.5, 100.0, n_rows)
+    columns["true_time"] = rng.normal(0.0, 1.0, n_rows)
+    radius = 30.0 + 50.0 * columns["layer_id"]
+    columns["true_x"] = radius * np.cos(columns["true_phi"])
+    columns["true_y"] = radius * np.sin(columns["true_phi"])
+    columns["true_z"] = radius / np.tan(columns["true_theta"])
+    columns["true_incident_phi"] = rng.uniform(-0.5, 0.5, n_rows)
+    columns["true_incident_theta"] = rng.uniform(-0.5, 0.5, n_rows)
+
+    # reconstructed, residuals and pulls
+    for iv, var in enumerate(["loc0", "loc1", "time"]):
+        sigma = np.full(n_rows, detector.resolution[iv])
+        if iv < 2:
+            sigma /= np.sqrt(cluster_sizes[iv])
+        residuals = _residuals(rng, detector, sigma)
+        columns["rec_" + var] = columns["true_" + var] + residuals
+        columns["var_" + var] = sigma**2
+        columns["residual_" + var] = residuals
+        columns["pull_" + var] = residuals / sigma
+
+    return columns
+
+
+def write(
+    file_name: str,
+    n_rows: int,
+    detector: Detector = None,
+    tree: str = "measurements",
+    chunk_rows: int = 1000000,
+    seed: int = 42,
+) -> None:
+    """Write a synthetic measurement tree, chunk by chunk"""
+
+    # uproot is only needed for the writing
+    import awkward as ak  # pylint: disable=import-outside-toplevel
+    import uproot  # pylint: disable=import-outside-toplevel
+
+    detector = detector if detector is not None else Detector()
+    rng = np.random.default_rng(seed)
+    with uproot.recreate(file_name) as output:
+        output.mktree(tree, SCHEMA)
+        for first_row in range(0, n_rows, chunk_rows):
+            columns = generate(rng, detector, min(chunk_rows, n_rows - first_row), first_row)
+            chunk = {}
+            for branch, dtype in SCHEMA.items():
+                if dtype.startswith("var"):
+                    offsets, content = columns[branch]
+                    chunk[branch] = ak.unflatten(
+                        content.astype(dtype.split()[-1]), np.diff(offsets)
+                    )
+                else:
+                    chunk[branch] = columns[branch].astype(dtype)
+            output[tree].extend(chunk)
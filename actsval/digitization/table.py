@@ -0,0 +1,114 @@
+""" This module stores the full parameterisation as a compact binary table
+
+    One row per (volume, layer, extra, variable, cluster size) histogram
+    with its count, mean, width and quantiles. The table is a structured
+    numpy array, sorted by the packed geometry key, written as .npy such
+    that it can be loaded memory-mapped and queried without re-running
+    the histogramming.
+"""
+
+import numpy as np
+
+from digitization import estimators
+from digitization import partition
+
+# The quantiles stored per row
+QUANTILES = (0.025, estimators.CENTRAL68[0], 0.5, estimators.CENTRAL68[1], 0.975)
+
+# The row layout of the table
+DTYPE = np.dtype(
+    [
+        ("key", np.int64),
+        ("volume", np.int32),
+        ("layer", np.int32),
+        ("extra", np.int32),
+        ("variable", "U16"),
+        ("cluster_size", np.int32),
+        ("count", np.float64),
+        ("mean", np.float64),
+        ("rms", np.float64),
+        ("quantiles", np.float64, (len(QUANTILES),)),
+    ]
+)
+
+
+def build(records: list, hists: list, widths: list) -> np.ndarray:
+    """Build the table from the histograms and their widths
+
+    The records are (variable, volume, layer, extra, cluster_size) tuples,
+    one per histogram, cluster size 0 stands for all cluster sizes. The
+    count, mean and quantiles are taken from the entries in range.
+    """
+
+    table = np.zeros(len(records), dtype=DTYPE)
+    if len(records) == 0:
+        return table
+    variables, volumes, layers, extras, cluster_sizes = zip(*records)
+    table["volume"] = volumes
+    table["layer"] = layers
+    table["extra"] = extras
+    table["variable"] = variables
+    table["cluster_size"] = cluster_sizes
+    table["key"] = partition.pack(table["volume"], table["layer"], table["extra"])
+    table["rms"] = widths
+
+    # the histogram statistics, stacked by number of bins
+    groups = {}
+    for ih, h in enumerate(hists):
+        groups.setdefault(h.axes[0].size, []).append(ih)
+    for indices in groups.values():
+        counts, edges = estimators.stack([hists[ih] for ih in indices])
+        centers = 0.5 * (edges[:, :-1] + edges[:, 1:])
+        totals = np.sum(counts, axis=1)
+        table["count"][indices] = totals
+        with np.errstate(divide="ignore", invalid="ignore"):
+            table["mean"][indices] = np.sum(counts * centers, axis=1) / totals
+        table["quantiles"][indices] = estimators.quantiles(
+            counts, edges, list(QUANTILES)
+        ).T
+
+    order = np.lexsort((table["cluster_size"], table["variable"], table["key"]))
+    return table[order]
+
+
+def save(file_name: str, table: np.ndarray) -> None:
+    """Write the table as .npy file"""
+
+    with open(file_name, "wb") as stream:
+        np.save(stream, table, allow_pickle=False)
+
+
+def load(file_name: str, mmap: bool = True) -> np.ndarray:
+    """Read a table, memory-mapped by default"""
+
+    table = np.load(file_name, mmap_mode="r" if mmap else None, allow_pickle=False)
+    if table.dtype != DTYPE:
+        raise ValueError(f"File '{file_name}' is not a parameterisation table")
+    return table
+
+
+def query(
+    table: np.ndarray,
+    volume_id: int,
+    layer_id: int = -1,
+    extra_id: int = -1,
+    variable: str = None,
+    cluster_size: int = None,
+) -> np.ndarray:
+    """The rows of one geometry key, optionally for a variable and cluster size
+
+    The rows of a key are found by bisection on the sorted keys, so only
+    these rows are read from a memory-mapped table.
+    """
+
+    key = partition.pack(volume_id, layer_id, extra_id)
+    rows = table[
+        np.searchsorted(table["key"], key, side="left") : np.searchsorted(
+            table["key"], key, side="right"
+        )
+    ]
+    if variable is not None:
+        rows = rows[rows["variable"] == variable]
+    if cluster_size is not None:
+        rows = rows[rows["cluster_size"] == cluster_size]
+    return rows
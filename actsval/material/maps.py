@@ -0,0 +1,247 @@
+""" This module reads and combines material maps in the ACTS json format
+
+    The binned surface material is given per bin as a material slab, its
+    thickness and the material parameters (x0, l0, ar, z, rho), with rho
+    the molar density. Maps of the same surfaces are combined per bin by
+    adding the weighted thickness-proportional quantities, the thickness in
+    radiation and interaction lengths and the molar amount, as the
+    averaging of slabs in ACTS does. The weight of a bin is the number of
+    tracks that were averaged in it.
+"""
+
+import copy
+import re
+
+import numpy as np
+
+from common import jsonio
+
+# The material parameters of a slab, in the order of the json map
+PARAMETERS = ["x0", "l0", "ar", "z", "rho"]
+
+# The local coordinates of the binning, no binning is the last code
+AXES = ["phi", "z", "r"]
+
+
+def load(file_name: str) -> dict:
+    """Load a json material map"""
+    return jsonio.load(file_name)
+
+
+def entry_key(entry: dict) -> tuple:
+    """The identifying (volume, boundary, layer, ...) key of a map entry"""
+    return tuple(sorted((key, value) for key, value in entry.items() if key != "value"))
+
+
+def surface_entries(material_map: dict) -> dict:
+    """The surface entries of a map by their key"""
+
+    return {
+        entry_key(entry): entry
+        for entry in material_map.get("Surfaces", {}).get("entries", [])
+    }
+
+
+def is_binned(entry: dict) -> bool:
+    """Whether the entry carries binned surface material"""
+
+    material = entry.get("value", {}).get("material", {})
+    return material.get("type") == "binned" and "data" in material
+
+
+def axis_code(value: str) -> int:
+    """The code of a binning value, e.g. binPhi or AxisZ, None if not supported"""
+
+    name = re.sub(r"^(axisdirection::)?(bin|axis)", "", value.lower())
+    return AXES.index(name) if name in AXES else None
+
+
+def binning(material: dict, shape: tuple) -> list:
+    """The (code, min, max, bins, closed) of both axes, None if not equidistant
+
+    Homogeneous material has one bin and no binning.
+    """
+
+    axes = []
+    for data in material.get("binUtility", {}).get("binningdata", []):
+        code = axis_code(data.get("value", ""))
+        if code is None or data.get("type", "equidistant") != "equidistant":
+            return None
+        axes.append((code, data["min"], data["max"], data["bins"], data.get("option") == "closed"))
+    axes += [(len(AXES), 0.0, 1.0, 1, False)] * (2 - len(axes))
+    if len(axes) != 2 or (axes[1][3], axes[0][3]) != shape:
+        return None
+    return axes
+
+
+def binning_arrays(binnings: list) -> dict:
+    """The code, min, max, bins and closed flag of a list of binnings, shaped (binnings, 2)"""
+
+    values = np.asarray(binnings, dtype=np.float64).reshape(-1, 2, 5)
+    return {
+        "code": values[:, :, 0].astype(np.int64),
+        "min": values[:, :, 1],
+        "max": values[:, :, 2],
+        "bins": values[:, :, 3].astype(np.int64),
+        "closed": values[:, :, 4] > 0.0,
+    }
+
+
+def locate(axes: dict, local: np.ndarray) -> np.ndarray:
+    """The flat bin index of points on their surfaces
+
+    The code, min, max, bins and closed flag of both axes are given per
+    point, shaped (points, 2). The rows of the local coordinates follow
+    AXES, with a last row of zeros for no binning.
+    """
+
+    point = np.arange(local.shape[1])
+    index = np.zeros(local.shape[1], dtype=np.int64)
+    stride = 1
+    for axis in range(2):
+        value = local[axes["code"][:, axis], point]
+        low = axes["min"][:, axis]
+        high = axes["max"][:, axis]
+        bins = axes["bins"][:, axis]
+        position = np.floor((value - low) / (high - low) * bins).astype(np.int64)
+        # closed axes wrap around, open axes extend their first and last bin
+        closed = axes["closed"][:, axis]
+        position = np.where(closed, position % bins, np.clip(position, 0, bins - 1))
+        index += position * stride
+        stride = stride * bins
+    return index
+
+
+def _parameters(material) -> list:
+    """The material parameters of a slab, vacuum is an empty list"""
+
+    if isinstance(material, dict):
+        material = material.get("data", [])
+    return list(material) if material is not None else []
+
+
+def _slab(slab: dict) -> tuple:
+    """The thickness and material parameters of a bin, zeros for vacuum"""
+
+    parameters = _parameters(slab.get("material"))
+    thickness = slab.get("thickness", 0.0)
+    if len(parameters) < len(PARAMETERS) or thickness <= 0.0:
+        return _VACUUM
+    return (thickness, *parameters[: len(PARAMETERS)])
+
+
+_VACUUM = (0.0,) * (len(PARAMETERS) + 1)
+
+
+def slabs(data: list) -> dict:
+    """The thickness and material parameters of the bins as arrays
+
+    Vacuum bins have zero thickness and zero parameters. The bins are
+    converted in one pass over the flattened rows.
+    """
+
+    shape = (len(data), len(data[0]) if len(data) > 0 else 0)
+    values = np.array(
+        [_slab(slab) for row in data for slab in row], dtype=np.float64
+    ).reshape(shape + (len(PARAMETERS) + 1,))
+    return {
+        name: np.ascontiguousarray(values[..., index])
+        for index, name in enumerate(["thickness"] + PARAMETERS)
+    }
+
+
+def to_data(arrays: dict, template: list) -> list:
+    """The bins in the json layout, following the layout of the template"""
+
+    data = copy.deepcopy(template)
+    for i1, row in enumerate(data):
+        for i0, slab in enumerate(row):
+            thickness = float(arrays["thickness"][i1, i0])
+            parameters = [float(arrays[name][i1, i0]) for name in PARAMETERS]
+            if thickness <= 0.0:
+                parameters = []
+                thickness = 0.0
+            if isinstance(slab.get("material"), dict):
+                slab["material"]["data"] = parameters
+            else:
+                slab["material"] = parameters
+            slab["thickness"] = thickness
+    return data
+
+
+def combine(slab_arrays: list, weights: list) -> dict:
+    """Combine the bins of several maps with the given weights per bin
+
+    The weights, e.g. the number of tracks averaged in every bin of each
+    map, are normalised per bin. Bins with weight and without material
+    contribute vacuum. Thickness, thickness over x0 and l0 and the molar
+    amount are averaged, ar and z are averaged with the molar amount.
+    """
+
+    thickness = np.stack([arrays["thickness"] for arrays in slab_arrays])
+    weights = np.stack(
+        [
+            np.broadcast_to(np.asarray(weight, dtype=np.float64), thickness.shape[1:])
+            for weight in weights
+        ]
+    )
+    norm = weights.sum(axis=0)
+    weights = np.divide(weights, norm, out=np.zeros_like(weights), where=norm > 0.0)
+
+    def average(values):
+        return (weights * values).sum(axis=0)
+
+    def ratio(numerator, denominator):
+        return np.divide(
+            numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0.0
+        )
+
+    def inverse(name):
+        values = np.stack([arrays[name] for arrays in slab_arrays])
+        return ratio(thickness, values)
+
+    combined = {"thickness": average(thickness)}
+    combined["x0"] = ratio(combined["thickness"], average(inverse("x0")))
+    combined["l0"] = ratio(combined["thickness"], average(inverse("l0")))
+    amount = thickness * np.stack([arrays["rho"] for arrays in slab_arrays])
+    combined["rho"] = ratio(average(amount), combined["thickness"])
+    for name in ["ar", "z"]:
+        values = np.stack([arrays[name] for arrays in slab_arrays])
+        combined[name] = ratio(average(amount * values), average(amount))
+    return combined
+
+
+def merge(material_maps: list, counts: list) -> dict:
+    """Merge maps of the same surfaces, e.g. mapped from parts of a sample
+
+    The binned surface material is combined per bin with the number of
+    tracks of each map in the bin, given per map as arrays by entry key.
+    Surfaces without counts have no weight. Everything else is taken from
+    the first map that has the entry.
+    """
+
+    merged = copy.deepcopy(material_maps[0])
+    merged_entries = surface_entries(merged)
+    all_entries = [surface_entries(material_map) for material_map in material_maps]
+    for entries in all_entries[1:]:
+        for key, entry in entries.items():
+            if key not in merged_entries:
+                merged_entries[key] = copy.deepcopy(entry)
+                merged.setdefault("Surfaces", {}).setdefault("entries", []).append(
+                    merged_entries[key]
+                )
+    for key, entry in merged_entries.items():
+        if not is_binned(entry):
+            continue
+        template = entry["value"]["material"]["data"]
+        parts = [
+            (slabs(entries[key]["value"]["material"]["data"]), map_counts.get(key, 0.0))
+            for entries, map_counts in zip(all_entries, counts)
+            if key in entries and is_binned(entries[key])
+        ]
+        shapes = {arrays["thickness"].shape for arrays, _ in parts}
+        if len(shapes) != 1:
+            raise ValueError(f"Different binning of the surface {dict(key)}")
+        combined = combine([arrays for arrays, _ in parts], [weight for _, weight in parts])
+        entry["value"]["material"]["data"] = to_data(combined, template)
+    return merged
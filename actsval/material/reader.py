@@ -0,0 +1,271 @@
+""" This module reads the surface material of maps without ACTS
+
+    Maps in the json format of the JsonMaterialWriter and in the root format
+    of the RootMaterialWriter are read into arrays per surface, shaped as
+    the bins of the surface. The surfaces are identified by their
+    (volume, boundary, layer, approach, sensitive, extra) key in both
+    formats. The json surface entries are located by a vectorised scan of
+    the brackets and parsed only for the requested volumes, the root file
+    reads only the histograms of the requested volumes. Identical json
+    entries are recognised by their text and skipped in the differences.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+import uproot
+
+from common import jsonio
+from material import maps
+
+# The identifiers of a surface, missing identifiers are zero
+KEYS = ["volume", "boundary", "layer", "approach", "sensitive", "extra"]
+
+# The tags of the identifiers in the root directory names
+ROOT_TAGS = {
+    "vol": "volume",
+    "bou": "boundary",
+    "lay": "layer",
+    "app": "approach",
+    "sen": "sensitive",
+    "ext": "extra",
+}
+
+# The histograms of the root format per array
+ROOT_HISTOGRAMS = {"thickness": "t", "x0": "x0", "l0": "l0", "ar": "A", "z": "Z", "rho": "rho"}
+
+
+def budget(arrays: dict) -> dict:
+    """The thickness in radiation and interaction lengths per bin"""
+
+    def ratio(name):
+        return np.divide(
+            arrays["thickness"],
+            arrays[name],
+            out=np.zeros_like(arrays["thickness"]),
+            where=arrays[name] > 0.0,
+        )
+
+    return {"t_x0": ratio("x0"), "t_l0": ratio("l0")}
+
+
+def _json_entries(data: bytes) -> list:
+    """The surface entries of a json map as (entry, start, end), None if not scannable
+
+    The brackets outside of strings give the nesting depth, the entries are
+    the objects one level below the surface entries array. The nested
+    objects of an entry are replaced by null, such that only its identifiers
+    are parsed. Strings with escaped characters are not supported.
+    """
+
+    if b"\\" in data:
+        return None
+    surfaces = data.find(b'"Surfaces"')
+    entries = data.find(b'"entries"', surfaces)
+    if surfaces < 0 or entries < 0:
+        return []
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    # '[' and '{' or ']' and '}' differ by one bit
+    folded = buffer | np.uint8(32)
+    positions = np.flatnonzero((folded == ord("{")) | (folded == ord("}")))
+    outside = np.searchsorted(np.flatnonzero(buffer == ord('"')), positions) % 2 == 0
+    positions = positions[outside]
+    opening = folded[positions] == ord("{")
+    depth = np.cumsum(np.where(opening, 1, -1), dtype=np.int32)
+
+    # the surface entries array, up to its closing bracket
+    first = np.searchsorted(positions, entries)
+    array_depth = depth[first]
+    last = first + np.argmax(depth[first:] < array_depth)
+    positions = positions[first + 1 : last]
+    opening = opening[first + 1 : last]
+    depth = depth[first + 1 : last]
+    starts = positions[opening & (depth == array_depth + 1)]
+    ends = positions[~opening & (depth == array_depth)] + 1
+    nested_starts = positions[opening & (depth == array_depth + 2)]
+    nested_ends = positions[~opening & (depth == array_depth + 1)] + 1
+    splits = np.searchsorted(nested_starts, starts).tolist() + [len(nested_starts)]
+
+    scanned = []
+    for index, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        identifiers = []
+        cursor = start
+        for nested in range(splits[index], splits[index + 1]):
+            identifiers += [data[cursor : nested_starts[nested]], b"null"]
+            cursor = nested_ends[nested]
+        identifiers.append(data[cursor:end])
+        scanned.append((jsonio.loads(b"".join(identifiers)), start, end))
+    return scanned
+
+
+def json_key(entry: dict) -> tuple:
+    """The surface key of a json map entry"""
+    return tuple(int(entry.get(name, 0)) for name in KEYS)
+
+
+def root_key(directory: str) -> tuple:
+    """The surface key of a root map directory, e.g. SurfaceMaterial_vol16_bou0_lay2"""
+
+    ids = {ROOT_TAGS[tag]: int(value) for tag, value in re.findall(r"_([a-z]{3})(\d+)", directory)}
+    return tuple(ids.get(name, 0) for name in KEYS)
+
+
+class MaterialMap:
+    """The surface material of a json or root map, converted per volume on demand"""
+
+    def __init__(self, file_name: str) -> None:
+        """constructor, indexing the surfaces by volume"""
+        self.file_name = file_name
+        self.is_root = file_name.endswith(".root")
+        # volume -> key -> raw json entry or root directory
+        self.index = {}
+        # key -> arrays
+        self.converted = {}
+        if self.is_root:
+            with uproot.open(file_name) as root_file:
+                for directory in root_file.keys(recursive=False, cycle=False):
+                    if directory.startswith("SurfaceMaterial"):
+                        key = root_key(directory)
+                        self.index.setdefault(key[0], {})[key] = directory
+        else:
+            with open(file_name, "rb") as map_file:
+                data = map_file.read()
+            scanned = _json_entries(data)
+            if scanned is None:
+                # parsed at once, the entries are kept as objects
+                scanned = [
+                    (entry, None, None)
+                    for entry in jsonio.loads(data).get("Surfaces", {}).get("entries", [])
+                ]
+            for entry, start, end in scanned:
+                key = json_key(entry)
+                self.index.setdefault(key[0], {})[key] = (
+                    data[start:end] if start is not None else entry
+                )
+
+    def volumes(self) -> list:
+        """The volumes with surface material"""
+        return sorted(self.index.keys())
+
+    def keys(self, volumes: list = None) -> list:
+        """The surface keys, of all or of the given volumes"""
+
+        volumes = self.volumes() if volumes is None else volumes
+        return [key for volume in volumes for key in sorted(self.index.get(volume, {}))]
+
+    def raw(self, key: tuple):
+        """The json entry text (or object) or the root directory of a surface"""
+        return self.index[key[0]][key]
+
+    def entry(self, key: tuple) -> dict:
+        """The parsed json entry of a surface, with its bounds and binning"""
+
+        raw = self.raw(key)
+        return jsonio.loads(raw) if isinstance(raw, bytes) else raw
+
+    def surface(self, key: tuple) -> dict:
+        """The arrays of one surface, converted at the first call"""
+
+        if key not in self.converted:
+            raw = self.raw(key)
+            if self.is_root:
+                with uproot.open(self.file_name) as root_file:
+                    self.converted[key] = self._read_root(root_file, raw)
+            else:
+                self.converted[key] = maps.slabs(
+                    self.entry(key).get("value", {}).get("material", {}).get("data", [])
+                )
+        return self.converted[key]
+
+    def volume(self, volume: int) -> dict:
+        """The arrays of the surfaces of a volume"""
+
+        if self.is_root:
+            # the file is opened once for the volume
+            with uproot.open(self.file_name) as root_file:
+                for key, directory in self.index.get(volume, {}).items():
+                    if key not in self.converted:
+                        self.converted[key] = self._read_root(root_file, directory)
+        return {key: self.surface(key) for key in self.keys([volume])}
+
+    @staticmethod
+    def _read_root(root_file, directory: str) -> dict:
+        """The histograms of a surface, transposed to the (bin1, bin0) json layout"""
+
+        arrays = {}
+        for name, histogram in ROOT_HISTOGRAMS.items():
+            values = np.asarray(root_file[f"{directory}/{histogram}"].values(), dtype=np.float64)
+            arrays[name] = np.ascontiguousarray(values.reshape(values.shape[0], -1).T)
+        return arrays
+
+
+def summary(material_map: MaterialMap, volumes: list = None) -> pd.DataFrame:
+    """The binning and the material budget of every surface
+
+    The mean is taken over the bins with material.
+    """
+
+    rows = []
+    for key in material_map.keys(volumes):
+        arrays = material_map.surface(key)
+        thickness = budget(arrays)
+        filled = arrays["thickness"] > 0.0
+        row = dict(zip(KEYS, key))
+        row["bins0"] = arrays["thickness"].shape[1]
+        row["bins1"] = arrays["thickness"].shape[0]
+        row["filled"] = int(filled.sum())
+        for name, values in thickness.items():
+            row[name + "_mean"] = float(values[filled].mean()) if row["filled"] > 0 else 0.0
+            row[name + "_max"] = float(values.max()) if values.size > 0 else 0.0
+        rows.append(row)
+    return pd.DataFrame(rows, columns=KEYS + ["bins0", "bins1", "filled"] + [
+        f"{name}_{stat}" for name in ["t_x0", "t_l0"] for stat in ["mean", "max"]
+    ])
+
+
+def diff(
+    reference: MaterialMap, target: MaterialMap, tolerance: float = 0.0, volumes: list = None
+) -> pd.DataFrame:
+    """The differences of two maps surface by surface
+
+    Every surface of either map gets a status: added, removed, binning (for
+    different bins), changed or unchanged. Changed surfaces have the number
+    of bins whose thickness in X0 or L0 differs by more than the relative
+    tolerance, and the largest absolute differences.
+    """
+
+    rows = []
+    reference_keys = set(reference.keys(volumes))
+    target_keys = set(target.keys(volumes))
+    same_format = reference.is_root == target.is_root
+    for key in sorted(reference_keys | target_keys):
+        row = dict(zip(KEYS, key), status="unchanged", bins=0, changed_bins=0, dt_x0=0.0, dt_l0=0.0)
+        rows.append(row)
+        if key not in target_keys:
+            row["status"] = "removed"
+            continue
+        if key not in reference_keys:
+            row["status"] = "added"
+            continue
+        # identical json entries need no conversion
+        if same_format and not reference.is_root and reference.raw(key) == target.raw(key):
+            continue
+        reference_budget = budget(reference.surface(key))
+        target_budget = budget(target.surface(key))
+        row["bins"] = reference_budget["t_x0"].size
+        if reference_budget["t_x0"].shape != target_budget["t_x0"].shape:
+            row["status"] = "binning"
+            continue
+        changed = np.zeros(reference_budget["t_x0"].shape, dtype=bool)
+        for name in ["t_x0", "t_l0"]:
+            difference = np.abs(target_budget[name] - reference_budget[name])
+            scale = np.maximum(np.abs(target_budget[name]), np.abs(reference_budget[name]))
+            changed |= difference > tolerance * scale
+            row["d" + name] = float(difference.max()) if difference.size > 0 else 0.0
+        row["changed_bins"] = int(changed.sum())
+        if row["changed_bins"] > 0:
+            row["status"] = "changed"
+    return pd.DataFrame(
+        rows, columns=KEYS + ["status", "bins", "changed_bins", "dt_x0", "dt_l0"]
+    )
@@ -0,0 +1,184 @@
+""" This module scans the material budget of a map along straight lines
+
+    The binned surface material of a json map is integrated along straight
+    lines from the origin in (eta, phi), without running the propagation.
+    The cylinder and disc surfaces aligned with the z axis are intersected
+    with a batch of lines at once, the bins are looked up in the material
+    grids of all surfaces, concatenated into one flat array, and weighted
+    with the path correction of the incidence angle. The bounds and
+    positions are taken from the map entries, or from the surfaces of the
+    geometry build for maps written without them.
+"""
+
+import numpy as np
+
+from common import jsonio
+from material import maps
+from material import reader
+from material import surfaces
+
+# The surface types that are scanned
+KINDS = {"CylinderSurface": "cylinder", "DiscSurface": "disc"}
+
+# The bounds of the surface types
+BOUNDS = {"cylinder": "CylinderBounds", "disc": "RadialBounds"}
+
+
+def load_geometry(file_name: str) -> dict:
+    """The surfaces of the geometry build by geometry identifier
+
+    Either a list of surfaces with their geo_id, or a geometry hierarchy
+    map with the identifiers in the entries.
+    """
+
+    content = jsonio.load(file_name)
+    if isinstance(content, dict):
+        entries = content.get("Surfaces", content).get("entries", [])
+        return {
+            surfaces.encode(reader.json_key(entry)): entry.get("value", {}) for entry in entries
+        }
+    return {int(surface["geo_id"]): surface for surface in content if "geo_id" in surface}
+
+
+def _placement(value: dict) -> dict:
+    """The extent of a cylinder or disc surface aligned with the z axis, None otherwise"""
+
+    kind = KINDS.get(value.get("type"))
+    bounds = value.get("bounds", {})
+    if kind is None or bounds.get("type") != BOUNDS[kind]:
+        return None
+    transform = value.get("transform") or {}
+    translation = transform.get("translation") or [0.0, 0.0, 0.0]
+    rotation = transform.get("rotation")
+    if rotation is not None and not np.allclose(rotation, np.eye(3).flatten()):
+        return None
+    if abs(translation[0]) > 1e-6 or abs(translation[1]) > 1e-6:
+        return None
+    values = list(bounds.get("values", [])) + [np.pi, 0.0]
+    z = translation[2]
+    if kind == "cylinder":
+        placement = {"r_min": values[0], "r_max": values[0]}
+        placement.update(z_min=z - values[1], z_max=z + values[1])
+        placement.update(phi_half=values[2], phi_avg=values[3])
+    else:
+        placement = {"r_min": values[0], "r_max": values[1], "z_min": z, "z_max": z}
+        placement.update(phi_half=values[2], phi_avg=values[3])
+    placement["kind"] = kind
+    return placement
+
+
+def build(material_map: reader.MaterialMap, geometry: dict = None, volumes: list = None) -> tuple:
+    """The scanned surfaces of a json map, per kind, and the number of skipped ones
+
+    Per kind the extent, the binning and the offset of every surface into
+    the flat thickness in X0 and L0 of all bins are given as arrays.
+    """
+
+    columns = ["r_min", "r_max", "z_min", "z_max", "phi_half", "phi_avg", "binning", "offset"]
+    model = {kind: {name: [] for name in columns + ["t_x0", "t_l0"]} for kind in BOUNDS}
+    skipped = 0
+    for key in material_map.keys(volumes):
+        value = material_map.entry(key).get("value", {})
+        if "bounds" not in value and geometry is not None:
+            value = dict(geometry.get(surfaces.encode(key), {}), material=value.get("material", {}))
+        material = value.get("material", {})
+        arrays = reader.budget(maps.slabs(material.get("data", [])))
+        placement = _placement(value)
+        binning = maps.binning(material, arrays["t_x0"].shape) if placement is not None else None
+        if binning is None:
+            skipped += 1
+            continue
+        surfaces_of_kind = model[placement.pop("kind")]
+        for name, number in placement.items():
+            surfaces_of_kind[name].append(number)
+        surfaces_of_kind["binning"].append(binning)
+        surfaces_of_kind["offset"].append(sum(len(t) for t in surfaces_of_kind["t_x0"]))
+        surfaces_of_kind["t_x0"].append(arrays["t_x0"].ravel())
+        surfaces_of_kind["t_l0"].append(arrays["t_l0"].ravel())
+    for surfaces_of_kind in model.values():
+        for name in ["t_x0", "t_l0"]:
+            surfaces_of_kind[name] = np.concatenate(surfaces_of_kind[name] + [np.zeros(0)])
+        surfaces_of_kind.update(maps.binning_arrays(surfaces_of_kind.pop("binning")))
+        for name in columns[:-2]:
+            surfaces_of_kind[name] = np.asarray(surfaces_of_kind[name], dtype=np.float64)
+        surfaces_of_kind["offset"] = np.asarray(surfaces_of_kind["offset"], dtype=np.int64)
+    return model, skipped
+
+
+def _crossings(surfaces_of_kind: dict, kind: str, eta: np.ndarray, phi: np.ndarray) -> tuple:
+    """The line, flat bin index and path correction of every crossing
+
+    The lines are intersected with all surfaces at once, the bins are only
+    looked up for the crossings.
+    """
+
+    sinh = np.sinh(eta)
+    if kind == "cylinder":
+        z = surfaces_of_kind["r_min"][None, :] * sinh[:, None]
+        inside = (z >= surfaces_of_kind["z_min"] - 1e-9) & (z <= surfaces_of_kind["z_max"] + 1e-9)
+    else:
+        # lines on the other side have a negative radius
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = surfaces_of_kind["z_min"][None, :] / sinh[:, None]
+        inside = (r >= surfaces_of_kind["r_min"] - 1e-9) & (r <= surfaces_of_kind["r_max"] + 1e-9)
+    line, surface = np.nonzero(inside)
+    delta_phi = (phi[line] - surfaces_of_kind["phi_avg"][surface] + np.pi) % (2 * np.pi) - np.pi
+    within = np.abs(delta_phi) <= surfaces_of_kind["phi_half"][surface] + 1e-9
+    line, surface = line[within], surface[within]
+
+    cosh = np.cosh(eta[line])
+    if kind == "cylinder":
+        r = surfaces_of_kind["r_min"][surface]
+        z = r * sinh[line]
+        correction = cosh
+    else:
+        z = surfaces_of_kind["z_min"][surface]
+        r = z / sinh[line]
+        correction = cosh / np.abs(sinh[line])
+
+    # the local coordinates, the last one for no binning
+    local = np.stack([phi[line], z, r, np.zeros(len(line))])
+    axes = {
+        name: surfaces_of_kind[name][surface] for name in ["code", "min", "max", "bins", "closed"]
+    }
+    index = surfaces_of_kind["offset"][surface] + maps.locate(axes, local)
+    return line, index, correction
+
+
+def scan(model: dict, eta: np.ndarray, phi: np.ndarray, batch_size: int = 10000) -> dict:
+    """The thickness in X0 and L0 and the number of crossed surfaces along
+    straight lines from the origin
+
+    The lines are processed in batches, with all surfaces at once.
+    """
+
+    eta = np.asarray(eta, dtype=np.float64)
+    phi = np.asarray(phi, dtype=np.float64)
+    budget = {name: np.zeros(len(eta)) for name in ["t_x0", "t_l0"]}
+    budget["crossed"] = np.zeros(len(eta), dtype=np.int64)
+    for start in range(0, len(eta), batch_size):
+        lines = slice(start, start + batch_size)
+        n_lines = len(eta[lines])
+        for kind, surfaces_of_kind in model.items():
+            if len(surfaces_of_kind["offset"]) == 0:
+                continue
+            line, index, correction = _crossings(surfaces_of_kind, kind, eta[lines], phi[lines])
+            for name in ["t_x0", "t_l0"]:
+                budget[name][lines] += np.bincount(
+                    line, weights=surfaces_of_kind[name][index] * correction, minlength=n_lines
+                )
+            budget["crossed"][lines] += np.bincount(line, minlength=n_lines)
+    return budget
+
+
+def grid(eta_range: tuple, eta_bins: int, phi_bins: int) -> tuple:
+    """The eta and phi of lines through the bin centres of an (eta, phi) grid"""
+
+    eta_edges = np.linspace(eta_range[0], eta_range[1], eta_bins + 1)
+    phi_edges = np.linspace(-np.pi, np.pi, phi_bins + 1)
+    eta, phi = np.meshgrid(
+        0.5 * (eta_edges[1:] + eta_edges[:-1]),
+        0.5 * (phi_edges[1:] + phi_edges[:-1]),
+        indexing="ij",
+    )
+    return eta.ravel(), phi.ravel()
@@ -0,0 +1,260 @@
+""" This module accumulates the mapped material per surface
+
+    The steps of mapped material tracks carry the geometry identifier of
+    the surface they were assigned to and the assignment position on it.
+    The steps of every chunk are sorted by identifier and reduced per
+    surface at once, the partial sums of the chunks are added up. Per
+    surface the number of assigned steps, the mapped material in X0 and L0,
+    the distance between the steps and their assignment positions and the
+    mean surface position are given, to be ranked to find badly mapped
+    surfaces. The tracks with material in every bin of a map are counted
+    from the assignment positions, to weight the bins when maps are merged.
+"""
+
+import awkward as ak
+import numpy as np
+import pandas as pd
+import uproot
+
+from material import maps
+
+# The bit masks of the ACTS geometry identifier
+GEOMETRY_ID_MASKS = {
+    "volume": 0xFF00000000000000,
+    "boundary": 0x00FF000000000000,
+    "layer": 0x0000FFF000000000,
+    "approach": 0x0000000FF0000000,
+    "sensitive": 0x000000000FFFFF00,
+    "extra": 0x00000000000000FF,
+}
+
+# The branches of the mapped material tracks that are read
+BRANCHES = [
+    "sur_id",
+    "sur_x",
+    "sur_y",
+    "sur_z",
+    "mat_x",
+    "mat_y",
+    "mat_z",
+    "mat_step_length",
+    "mat_X0",
+    "mat_L0",
+]
+
+# The branches of the mapped material tracks that locate the bins
+BIN_BRANCHES = ["sur_id", "sur_x", "sur_y", "sur_z"]
+
+# The summed columns per surface, the maximum distance is taken as maximum
+SUMS = ["hits", "x0", "l0", "distance", "z", "r"]
+
+
+def decode(geo_ids: np.ndarray) -> dict:
+    """The volume, boundary, layer, approach, sensitive and extra ids"""
+
+    geo_ids = np.asarray(geo_ids, dtype=np.uint64)
+    decoded = {}
+    for name, mask in GEOMETRY_ID_MASKS.items():
+        shift = (mask & -mask).bit_length() - 1
+        decoded[name] = ((geo_ids & np.uint64(mask)) >> np.uint64(shift)).astype(np.int64)
+    return decoded
+
+
+def encode(ids: tuple) -> int:
+    """The geometry identifier of (volume, boundary, layer, approach, sensitive, extra) ids"""
+
+    geo_id = 0
+    for value, mask in zip(ids, GEOMETRY_ID_MASKS.values()):
+        shift = (mask & -mask).bit_length() - 1
+        geo_id |= (int(value) << shift) & mask
+    return geo_id
+
+
+def _flat(batch, branch: str) -> np.ndarray:
+    """The steps of all tracks of a batch as a flat array"""
+    return np.asarray(ak.to_numpy(ak.flatten(batch[branch])))
+
+
+def _accumulate_batch(batch) -> pd.DataFrame:
+    """The per surface sums of a batch, the steps sorted and reduced per surface"""
+
+    geo_ids = _flat(batch, "sur_id").astype(np.uint64)
+    length = _flat(batch, "mat_step_length").astype(np.float64)
+    values = {}
+    for name in ["X0", "L0"]:
+        path = _flat(batch, "mat_" + name).astype(np.float64)
+        values[name.lower()] = np.divide(
+            length, path, out=np.zeros_like(length), where=path > 0.0
+        )
+    surface = [_flat(batch, "sur_" + c).astype(np.float64) for c in ["x", "y", "z"]]
+    step = [_flat(batch, "mat_" + c).astype(np.float64) for c in ["x", "y", "z"]]
+    values["distance"] = np.sqrt(sum((s - m) ** 2 for s, m in zip(surface, step)))
+    values["z"] = surface[2]
+    values["r"] = np.hypot(surface[0], surface[1])
+
+    # unassigned steps have no surface
+    assigned = geo_ids != 0
+    geo_ids = geo_ids[assigned]
+    order = np.argsort(geo_ids, kind="stable")
+    geo_ids = geo_ids[order]
+    if len(geo_ids) == 0:
+        return pd.DataFrame(columns=["geo_id"] + SUMS + ["distance_max"])
+    starts = np.flatnonzero(np.concatenate([[True], geo_ids[1:] != geo_ids[:-1]]))
+    sums = {"geo_id": geo_ids[starts], "hits": np.diff(np.append(starts, len(geo_ids)))}
+    for name, value in values.items():
+        sums[name] = np.add.reduceat(value[assigned][order], starts)
+    sums["distance_max"] = np.maximum.reduceat(values["distance"][assigned][order], starts)
+    return pd.DataFrame(sums)
+
+
+def accumulate(
+    file_name: str,
+    tree: str = "material-tracks",
+    step_size: str = "100 MB",
+) -> pd.DataFrame:
+    """The mapped material per surface of a mapped material track file
+
+    Returns a frame per surface with the geometry identifier and its
+    decoded ids, the number of assigned steps, the material in X0 and L0
+    in total and per step, the mean and maximum assignment distance and
+    the mean z and r of the assignment positions.
+    """
+
+    partials = []
+    with uproot.open(file_name) as root_file:
+        for batch in root_file[tree].iterate(BRANCHES, step_size=step_size, library="ak"):
+            partials.append(_accumulate_batch(batch))
+    # a tree without entries has no batches
+    if len(partials) == 0:
+        partials.append(pd.DataFrame(columns=["geo_id"] + SUMS + ["distance_max"]))
+    combined = (
+        pd.concat(partials)
+        .groupby("geo_id", sort=True)
+        .agg(dict({name: "sum" for name in SUMS}, distance_max="max"))
+        .reset_index()
+    )
+    for name in ["x0", "l0", "distance", "z", "r"]:
+        combined[name + ("_mean" if name == "distance" else "_per_hit")] = (
+            combined[name] / combined["hits"]
+        )
+    combined["z"] = combined.pop("z_per_hit")
+    combined["r"] = combined.pop("r_per_hit")
+    combined = combined.drop(columns=["distance"])
+    decoded = decode(combined["geo_id"].to_numpy())
+    for position, (name, ids) in enumerate(decoded.items()):
+        combined.insert(1 + position, name, ids)
+    return combined
+
+
+def _binned_surfaces(material_map: dict) -> tuple:
+    """The entry keys, geometry identifiers, shapes and binnings of the binned surfaces
+
+    Surfaces whose bins can not be located by the assignment position, e.g.
+    binned in local x and y, are not located and get one bin.
+    """
+
+    keys, geo_ids, shapes, binnings, located = [], [], [], [], []
+    for key, entry in maps.surface_entries(material_map).items():
+        if not maps.is_binned(entry):
+            continue
+        data = entry["value"]["material"]["data"]
+        shape = (len(data), len(data[0]) if len(data) > 0 else 0)
+        binning = maps.binning(entry["value"]["material"], shape)
+        keys.append(key)
+        geo_ids.append(encode(tuple(entry.get(name, 0) for name in GEOMETRY_ID_MASKS)))
+        shapes.append(shape)
+        located.append(binning is not None)
+        # not located surfaces have one bin without binning
+        binnings.append(binning or [(len(maps.AXES), 0.0, 1.0, 1, False)] * 2)
+    return keys, np.asarray(geo_ids, dtype=np.uint64), shapes, binnings, located
+
+
+def _count_batch(batch, sorted_ids: np.ndarray, order: np.ndarray, axes: dict, offsets: np.ndarray):
+    """The flat bins of a batch that have material of a track, once per track"""
+
+    ids = _flat(batch, "sur_id").astype(np.uint64)
+    track = np.repeat(np.arange(len(batch)), ak.to_numpy(ak.num(batch["sur_id"])))
+    position = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    known = sorted_ids[position] == ids
+    surface = order[position[known]]
+    x, y, z = (_flat(batch, "sur_" + c).astype(np.float64)[known] for c in ["x", "y", "z"])
+    # the local coordinates, the last one for no binning
+    local = np.stack([np.arctan2(y, x), z, np.hypot(x, y), np.zeros(len(z))])
+    bins = offsets[surface] + maps.locate(
+        {name: values[surface] for name, values in axes.items()}, local
+    )
+    return np.unique(track[known] * offsets[-1] + bins) % offsets[-1]
+
+
+def bin_counts(
+    file_name: str,
+    material_map: dict,
+    tree: str = "material-tracks",
+    step_size: str = "100 MB",
+) -> dict:
+    """The number of mapped tracks in every bin of the binned surfaces of a map
+
+    A track counts once in every bin it has material in, as it is averaged
+    once there by the mapping. The bins are located by the assignment
+    positions, surfaces that can not be located count their tracks in all
+    bins. Tracks that cross a bin without material, counted as vacuum by
+    the empty bin correction of the mapping, are not in the mapped tracks.
+    Returns the counts shaped as the bins by entry key.
+    """
+
+    keys, geo_ids, shapes, binnings, located = _binned_surfaces(material_map)
+    if len(keys) == 0:
+        return {}
+    axes = maps.binning_arrays(binnings)
+    sizes = [shape[0] * shape[1] if is_located else 1 for shape, is_located in zip(shapes, located)]
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    order = np.argsort(geo_ids)
+    counts = np.zeros(offsets[-1], dtype=np.int64)
+    with uproot.open(file_name) as root_file:
+        for batch in root_file[tree].iterate(BIN_BRANCHES, step_size=step_size, library="ak"):
+            bins = _count_batch(batch, geo_ids[order], order, axes, offsets)
+            counts += np.bincount(bins, minlength=offsets[-1])
+    return {
+        key: (
+            counts[offsets[index] : offsets[index + 1]].reshape(shape)
+            if located[index]
+            else np.full(shape, counts[offsets[index]])
+        )
+        for index, (key, shape) in enumerate(zip(keys, shapes))
+    }
+
+
+def compare(reference: pd.DataFrame, target: pd.DataFrame) -> pd.DataFrame:
+    """Compare the material per step of two accumulations surface by surface
+
+    Surfaces of only one of them have no ratio.
+    """
+
+    ids = ["geo_id"] + list(GEOMETRY_ID_MASKS.keys())
+    compared = reference.merge(target, on=ids, how="outer", suffixes=("_reference", "_target"))
+    compared["x0_ratio"] = compared["x0_per_hit_target"] / compared["x0_per_hit_reference"]
+    compared["x0_deviation"] = np.abs(compared["x0_ratio"] - 1.0)
+    return compared
+
+
+def rank(frame: pd.DataFrame, by: str, top: int = None, ascending: bool = False) -> pd.DataFrame:
+    """The surfaces ranked by a column, the largest first"""
+
+    ranked = frame.sort_values(by, ascending=ascending, na_position="last")
+    return ranked.head(top) if top is not None else ranked
+
+
+def table(frame: pd.DataFrame, columns: list, float_format: str = "{:.4g}") -> str:
+    """A fixed width text table of the given columns"""
+
+    cells = [columns] + [
+        [
+            float_format.format(value) if isinstance(value, float) else str(value)
+            for value in row
+        ]
+        for row in frame[columns].itertuples(index=False)
+    ]
+    widths = [max(len(row[ic]) for row in cells) for ic in range(len(columns))]
+    lines = ["  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in cells]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
@@ -0,0 +1,109 @@
+""" This module integrates the material along the tracks of material track files
+
+    The files of the ACTS material track writer, e.g. a Geant4 recording and
+    a material validation, are streamed chunk by chunk with uproot. The
+    material in X0 and L0 is integrated per track as a vectorised sum over
+    the jagged step arrays, only the per track results are kept. Tracks of
+    two files can be matched by event, position in the event and direction
+    to compare the material track by track, or compared in profiles.
+"""
+
+import awkward as ak
+import numpy as np
+import pandas as pd
+import uproot
+
+# The branches that are read, per track and per step
+TRACK_BRANCHES = ["event_id", "v_eta", "v_phi"]
+STEP_BRANCHES = ["mat_step_length", "mat_X0", "mat_L0"]
+
+
+def _integrate_batch(batch) -> dict:
+    """The per track material of a batch of tracks"""
+
+    # the steps of all tracks as flat arrays, the sums per track are
+    # differences of the cumulative sum at the track boundaries
+    steps = ak.to_numpy(ak.num(batch["mat_step_length"], axis=1))
+    boundaries = np.concatenate([[0], np.cumsum(steps)])
+    length = np.asarray(ak.to_numpy(ak.flatten(batch["mat_step_length"])), dtype=np.float64)
+    columns = {"steps": steps}
+    for name in ["X0", "L0"]:
+        path = np.asarray(ak.to_numpy(ak.flatten(batch["mat_" + name])), dtype=np.float64)
+        # steps without material have no radiation or interaction length
+        fraction = np.divide(length, path, out=np.zeros_like(length), where=path > 0.0)
+        cumulative = np.concatenate([[0.0], np.cumsum(fraction)])
+        columns[name.lower()] = cumulative[boundaries[1:]] - cumulative[boundaries[:-1]]
+    for branch in TRACK_BRANCHES:
+        columns[branch.removeprefix("v_")] = ak.to_numpy(batch[branch])
+    return columns
+
+
+def integrate(
+    file_name: str,
+    tree: str = "material-tracks",
+    step_size: str = "100 MB",
+    entry_start: int = None,
+    entry_stop: int = None,
+) -> pd.DataFrame:
+    """The integrated material per track of a material track file
+
+    Returns a frame with the event_id, the index of the track in its event,
+    eta, phi, the number of steps and the material in x0 and l0.
+    """
+
+    chunks = []
+    with uproot.open(file_name) as root_file:
+        for batch in root_file[tree].iterate(
+            TRACK_BRANCHES + STEP_BRANCHES,
+            step_size=step_size,
+            entry_start=entry_start,
+            entry_stop=entry_stop,
+            library="ak",
+        ):
+            chunks.append(_integrate_batch(batch))
+    columns = {
+        name: np.concatenate([chunk[name] for chunk in chunks]) if len(chunks) > 0 else np.array([])
+        for name in ["event_id", "eta", "phi", "steps", "x0", "l0"]
+    }
+    frame = pd.DataFrame(columns)
+    frame.insert(1, "index", index_in_event(frame["event_id"].to_numpy()))
+    return frame
+
+
+def index_in_event(event_ids: np.ndarray) -> np.ndarray:
+    """The position of every track within its (consecutive) event"""
+
+    if len(event_ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate([[True], event_ids[1:] != event_ids[:-1]]))
+    counts = np.diff(np.concatenate([starts, [len(event_ids)]]))
+    return np.arange(len(event_ids)) - np.repeat(starts, counts)
+
+
+def match(reference: pd.DataFrame, target: pd.DataFrame, tolerance: float = 1e-4) -> pd.DataFrame:
+    """Match the tracks of two files track by track
+
+    Tracks are matched by event and index in the event, and kept if their
+    directions agree within the tolerance in eta and phi. Returns a frame
+    with eta, phi, the material of both and their differences.
+    """
+
+    keys = ["event_id", "index"]
+    merged = reference.merge(target, on=keys, suffixes=("_reference", "_target"))
+    dphi = np.abs(merged["phi_reference"] - merged["phi_target"])
+    dphi = np.minimum(dphi, 2 * np.pi - dphi)
+    same = (np.abs(merged["eta_reference"] - merged["eta_target"]) < tolerance) & (
+        dphi < tolerance
+    )
+    matched = merged[same]
+    result = pd.DataFrame(
+        {
+            "eta": matched["eta_reference"].to_numpy(),
+            "phi": matched["phi_reference"].to_numpy(),
+        }
+    )
+    for name in ["x0", "l0"]:
+        result[name + "_reference"] = matched[name + "_reference"].to_numpy()
+        result[name + "_target"] = matched[name + "_target"].to_numpy()
+        result["d" + name] = result[name + "_target"] - result[name + "_reference"]
+    return result
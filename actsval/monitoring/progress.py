@@ -0,0 +1,172 @@
+""" This module reports the progress and throughput of long iterations
+
+    The entries and bytes processed are accumulated in a counter in shared
+    memory, so that the workers of a process pool add to the same numbers
+    as the main process. A thread of the main process polls the counter and
+    shows a progress bar with alive_progress, or logs the progress at a
+    fixed interval when there is no terminal. Adding to the counter is a
+    single locked addition, cheap enough to be done for every batch.
+"""
+
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+
+try:
+    from alive_progress import alive_bar
+except ImportError:
+    alive_bar = None
+
+MODES = ["auto", "bar", "log", "none"]
+
+# The counter of this worker process, see init_worker
+_worker_counter = None
+
+
+class Counter:
+    """Entries and bytes processed, shared between processes
+
+    The counter is handed to the workers at their start, e.g. through the
+    initializer arguments of a process pool, see init_worker.
+    """
+
+    def __init__(self) -> None:
+        """constructor with zero entries and bytes"""
+        self._values = multiprocessing.Array("q", 2)
+
+    def add(self, entries: int, nbytes: int = 0) -> None:
+        """Add processed entries and bytes"""
+
+        with self._values.get_lock():
+            self._values[0] += int(entries)
+            self._values[1] += int(nbytes)
+
+    def values(self) -> tuple:
+        """The entries and bytes processed so far"""
+
+        with self._values.get_lock():
+            return self._values[0], self._values[1]
+
+
+def init_worker(counter: Counter) -> None:
+    """Process pool initializer: the counter that add() reports to"""
+
+    global _worker_counter  # pylint: disable=global-statement
+    _worker_counter = counter
+
+
+def add(entries: int, nbytes: int = 0) -> None:
+    """Add processed entries and bytes from a worker, if it has a counter"""
+
+    if _worker_counter is not None:
+        _worker_counter.add(entries, nbytes)
+
+
+def entry_range(num_entries: int, entry_start: int = None, entry_stop: int = None) -> int:
+    """The number of entries in a range, clipped as in uproot"""
+
+    return len(range(num_entries)[entry_start:entry_stop])
+
+
+def status(entries: int, nbytes: int, elapsed: float, total: int = None) -> str:
+    """One line with the entries, bytes, rates and the remaining time"""
+
+    rate = entries / elapsed if elapsed > 0.0 else 0.0
+    text = f"{entries}"
+    if total is not None and total > 0:
+        text += f"/{total} entries ({100.0 * entries / total:.1f}%)"
+    else:
+        text += " entries"
+    text += f", {nbytes / (1 << 20):.1f} MB, {rate:.0f} entries/s"
+    text += f", {nbytes / (1 << 20) / elapsed if elapsed > 0.0 else 0.0:.1f} MB/s"
+    if total is not None and rate > 0.0:
+        text += f", ETA {max(total - entries, 0) / rate:.0f} s"
+    return text
+
+
+class Progress:
+    """Shows the progress of the counter while the context is entered
+
+    auto: a progress bar on a terminal if alive_progress is available,
+          logging otherwise
+    bar: the alive_progress bar
+    log: a log line every log_interval seconds and at the end
+    none: nothing is shown, the counter is still filled
+    """
+
+    def __init__(
+        self,
+        total: int = None,
+        title: str = "",
+        mode: str = "auto",
+        counter: Counter = None,
+        interval: float = 0.2,
+        log_interval: float = 30.0,
+    ) -> None:
+        """constructor, total is the expected number of entries if known"""
+
+        if mode not in MODES:
+            raise ValueError(f"Unknown progress mode '{mode}'")
+        if mode == "auto":
+            mode = "bar" if alive_bar is not None and sys.stdout.isatty() else "log"
+        if mode == "bar" and alive_bar is None:
+            logging.warning("alive_progress is not available, logging the progress")
+            mode = "log"
+        self.total = total
+        self.title = title
+        self.mode = mode
+        self.counter = counter if counter is not None else Counter()
+        self.interval = interval
+        self.log_interval = log_interval
+        self._start = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._bar_context = None
+        self._bar = None
+        self._shown = 0
+        self._logged = 0.0
+
+    def add(self, entries: int, nbytes: int = 0) -> None:
+        """Add processed entries and bytes from the main process"""
+        self.counter.add(entries, nbytes)
+
+    def _update(self, final: bool = False) -> None:
+        """Show the current values of the counter"""
+
+        entries, nbytes = self.counter.values()
+        elapsed = time.perf_counter() - self._start
+        if self.mode == "bar":
+            self._bar(entries - self._shown)
+            self._shown = entries
+            self._bar.text(f"{nbytes / (1 << 20):.1f} MB")
+        elif self.mode == "log" and (final or elapsed - self._logged >= self.log_interval):
+            self._logged = elapsed
+            logging.info(f"{self.title}: {status(entries, nbytes, elapsed, self.total)}")
+
+    def _poll(self) -> None:
+        """Update the display until the context is left"""
+
+        while not self._stop.wait(self.interval):
+            self._update()
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        if self.mode == "none":
+            return self
+        if self.mode == "bar":
+            self._bar_context = alive_bar(self.total, title=self.title, enrich_print=False)
+            self._bar = self._bar_context.__enter__()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._update(final=True)
+        if self._bar_context is not None:
+            self._bar_context.__exit__(exc_type, exc_value, traceback)
@@ -0,0 +1,113 @@
+""" This module evaluates the timing of sequencer runs
+
+    The start and end of every event are stamped by the run, the first
+    completed events are discarded as warm-up. From the remaining ones the
+    throughput and the latency percentiles are derived, and the scaling
+    efficiency of runs with different numbers of threads is given with
+    respect to the run with the fewest threads. The per algorithm timing
+    file of the ACTS sequencer can be read in addition, and the wall time
+    of the event loop from the summary the sequencer logs.
+"""
+
+import csv
+import re
+
+import numpy as np
+
+# The latency percentiles that are reported
+PERCENTILES = [50, 90, 99]
+
+# The units of the durations logged by the sequencer, in seconds
+DURATION_UNITS = {"s": 1.0, "ms": 1e-3, "us": 1e-6, "ns": 1e-9}
+
+# The summary line of the event loop logged by the sequencer
+EVENT_LOOP = re.compile(
+    r"Processed\s+(\d+)\s+events\s+in\s+([0-9.eE+-]+)\s*(s|ms|us|ns)\s+\(wall clock\)"
+)
+
+
+def evaluate(
+    starts: list, ends: list, warmup: int = 0, tracks_per_event: int = 1
+) -> dict:
+    """The throughput and latencies of one run from the event time stamps
+
+    The events are ordered by their completion, the first warmup ones are
+    discarded. The throughput is taken between the completion of the last
+    warm-up event, or the first start, and the last completion.
+    """
+
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    order = np.argsort(ends)
+    starts, ends = starts[order], ends[order]
+    warmup = min(warmup, len(ends) - 1) if len(ends) > 0 else 0
+    begin = ends[warmup - 1] if warmup > 0 else (starts.min() if len(starts) > 0 else 0.0)
+    starts, ends = starts[warmup:], ends[warmup:]
+    window = ends[-1] - begin if len(ends) > 0 else 0.0
+    events = len(ends)
+    latencies = ends - starts
+    result = {
+        "events": events,
+        "warmup": warmup,
+        "time": float(window),
+        "events_per_second": events / window if window > 0.0 else 0.0,
+        "tracks_per_second": events * tracks_per_event / window if window > 0.0 else 0.0,
+        "latency_mean": float(latencies.mean()) if events > 0 else 0.0,
+    }
+    for percentile in PERCENTILES:
+        result[f"latency_p{percentile}"] = (
+            float(np.percentile(latencies, percentile)) if events > 0 else 0.0
+        )
+    return result
+
+
+def scaling(results: list, key: str = "tracks_per_second") -> list:
+    """Add the speedup and efficiency to runs of one workload
+
+    The runs carry their number of threads, the reference is the run with
+    the fewest threads, its efficiency is 1.
+    """
+
+    if len(results) == 0:
+        return results
+    reference = min(results, key=lambda result: result["threads"])
+    for result in results:
+        speedup = result[key] / reference[key] if reference[key] > 0.0 else 0.0
+        result["speedup"] = speedup
+        result["efficiency"] = speedup * reference["threads"] / result["threads"]
+    return results
+
+
+def read_sequencer_timing(file_name: str) -> dict:
+    """The total and per event time in seconds per algorithm identifier
+
+    The ACTS sequencer writes them as csv or tsv, depending on the version.
+    """
+
+    with open(file_name, "r", newline="") as timing_file:
+        header = timing_file.readline()
+        timing_file.seek(0)
+        delimiter = "\t" if "\t" in header else ","
+        return {
+            row["identifier"]: {
+                "total": float(row["time_total_s"]),
+                "per_event": float(row["time_perevent_s"]),
+            }
+            for row in csv.DictReader(timing_file, delimiter=delimiter)
+        }
+
+
+def read_event_loop(file_name: str) -> dict:
+    """The number of events and the wall time of the event loop in seconds
+
+    Taken from the summary of the ACTS sequencer in the log of a run, None
+    if the log has no summary. The per algorithm times of the timing file
+    are summed over the threads and do not give the wall time.
+    """
+
+    with open(file_name, "r", errors="replace") as log_file:
+        matches = EVENT_LOOP.findall(log_file.read())
+    if len(matches) == 0:
+        return None
+    events, duration, unit = matches[-1]
+    return {"events": int(events), "time": float(duration) * DURATION_UNITS[unit]}
@@ -6,8 +6,10 @@ import argparse
 import math
 import uproot
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
+from monitoring import progress
 from plotting import style
 from plotting import profile
 
@@ -87,6 +89,21 @@ def add_argumens(p: argparse.ArgumentParser):
         "-o", "--output", type=str, default="", help="Output file (core) name"
     )
 
+    p.add_argument(
+        "--step-size",
+        type=str,
+        default="100 MB",
+        help="Chunk size of the loading, the progress is reported per chunk",
+    )
+
+    p.add_argument(
+        "--progress",
+        type=str,
+        default="auto",
+        choices=progress.MODES,
+        help="Progress of the loading: bar, log lines or none",
+    )
+
 
 def run_comparison(args: argparse.Namespace):
     """Body of the script, taking the main arguments"""
@@ -113,30 +130,45 @@ def run_comparison(args: argparse.Namespace):
     dstyles = {}
     ddecos = {}
 
-    # Loop to load the data
-    for i, (input_file, color) in enumerate(zip(args.input, args.color)):
-        urf = uproot.open(input_file + ":" + args.tree)
-        print(">> Loading data from", input_file)
-        ddict = {}
-        for x in args.x_variables:
-            ddict[x] = urf[x].array(library="np")
-        for y in args.y_variables:
-            ddict[y] = urf[y].array(library="np")
-
-        # Load the data as dataframe and append
-        df = pd.DataFrame(ddict)
-        df.name = args.legends[i] if i < len(args.legends) else ""
-        dframes.append(df)
-
-        dstyles[i] = style.Style(color=color, marker=args.marker[i])
-        decos = {}
-        for d in args.decorators:
-            if d == "range":
-                decos[d] = style.Style(alpha=0.2, color=color)
-            elif d == "scatter":
-                decos[d] = style.Style(alpha=0.1, color=color)
-        if len(decos) > 0:
-            ddecos[i] = decos
+    # Open the inputs, their entries give the remaining time of the loading
+    urfs = [
+        uproot.open(input_file + ":" + args.tree)
+        for input_file, _ in zip(args.input, args.color)
+    ]
+    with progress.Progress(
+        sum(urf.num_entries for urf in urfs), "Loading", args.progress
+    ) as load_progress:
+        # Loop to load the data
+        for i, (input_file, color) in enumerate(zip(args.input, args.color)):
+            urf = urfs[i]
+            print(">> Loading data from", input_file)
+            branches = list(dict.fromkeys(list(args.x_variables) + list(args.y_variables)))
+            chunks = {branch: [] for branch in branches}
+            for chunk in urf.iterate(branches, step_size=args.step_size, library="np"):
+                for branch in branches:
+                    chunks[branch].append(chunk[branch])
+                load_progress.add(
+                    len(chunk[branches[0]]), sum(chunk[branch].nbytes for branch in branches)
+                )
+            ddict = {
+                branch: np.concatenate(chunks[branch]) if len(chunks[branch]) > 0 else np.zeros(0)
+                for branch in branches
+            }
+
+            # Load the data as dataframe and append
+            df = pd.DataFrame(ddict)
+            df.name = args.legends[i] if i < len(args.legends) else ""
+            dframes.append(df)
+
+            dstyles[i] = style.Style(color=color, marker=args.marker[i])
+            decos = {}
+            for d in args.decorators:
+                if d == "range":
+                    decos[d] = style.Style(alpha=0.2, color=color)
+                elif d == "scatter":
+                    decos[d] = style.Style(alpha=0.1, color=color)
+            if len(decos) > 0:
+                ddecos[i] = decos
 
     # The plots
     for ix, x in enumerate(args.x_variables):
@@ -0,0 +1,155 @@
+""" This module renders many histograms into single files or a gallery
+
+    Rendering is done with the non-interactive Agg backend, optionally
+    distributed over a process pool, and every figure is closed right
+    after it has been saved. The rendered plots are counted in a progress
+    counter that the workers of the pool share.
+"""
+
+import base64
+import html
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+# pylint: disable=wrong-import-position
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+from monitoring import progress
+
+FORMATS = ["png", "pdf", "html"]
+
+
+class PlotJob:
+    """A histogram together with its name and decorations"""
+
+    def __init__(self, name: str, hist, title: str = "", xlabel: str = "",
+                 ylabel: str = "") -> None:
+        """constructor with default arguments"""
+        self.name = name
+        self.hist = hist
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+
+
+def draw(job: PlotJob):
+    """Draw a single plot job into a new figure, the caller closes it"""
+
+    fig, ax = plt.subplots()
+    job.hist.plot(ax=ax)
+    if job.title != "":
+        ax.set_title(job.title)
+    if job.xlabel != "":
+        ax.set_xlabel(job.xlabel)
+    if job.ylabel != "":
+        ax.set_ylabel(job.ylabel)
+    return fig
+
+
+def _init_worker(counter: progress.Counter) -> None:
+    """Make sure the worker processes use the Agg backend, and report to the counter"""
+
+    matplotlib.use("Agg")
+    progress.init_worker(counter)
+
+
+def _render_png(job_dir: tuple) -> str:
+    """Render a job into a png file in the given directory"""
+
+    job, output_dir = job_dir
+    fig = draw(job)
+    file_name = os.path.join(output_dir, job.name + ".png")
+    fig.savefig(file_name)
+    plt.close(fig)
+    progress.add(1)
+    return file_name
+
+
+def _render_encoded(job: PlotJob) -> tuple:
+    """Render a job into a base64 encoded png for embedding"""
+
+    fig = draw(job)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    progress.add(1)
+    return job.name, base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _map(function, items: list, workers: int, counter: progress.Counter) -> list:
+    """Map the function over the items, in a process pool if requested
+
+    The workers of the pool add to the counter themselves, sequentially the
+    items are counted here.
+    """
+
+    if workers <= 1 or len(items) <= 1:
+        results = []
+        for item in items:
+            results.append(function(item))
+            counter.add(1)
+        return results
+    chunksize = max(1, len(items) // (4 * workers))
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(counter,)
+    ) as pool:
+        return list(pool.map(function, items, chunksize=chunksize))
+
+
+def render(
+    jobs: list,
+    output_dir: str,
+    fmt: str = "png",
+    workers: int = 1,
+    name: str = "gallery",
+    progress_mode: str = "none",
+) -> list:
+    """Render the plot jobs and return the list of written files
+
+    png: one file per job, rendered in parallel
+    pdf: one multi-page file, rendered sequentially as pages are appended
+    html: one self-contained gallery page, images rendered in parallel
+
+    The progress of the rendered plots is shown in the given mode.
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown plot format '{fmt}'")
+    os.makedirs(output_dir, exist_ok=True)
+    if len(jobs) == 0:
+        return []
+
+    file_name = os.path.join(output_dir, name + "." + fmt)
+    with progress.Progress(len(jobs), "Plotting", progress_mode) as plot_progress:
+        if fmt == "png":
+            return _map(
+                _render_png, [(job, output_dir) for job in jobs], workers, plot_progress.counter
+            )
+        if fmt == "pdf":
+            with PdfPages(file_name) as pdf:
+                for job in jobs:
+                    fig = draw(job)
+                    pdf.savefig(fig)
+                    plt.close(fig)
+                    plot_progress.add(1)
+            return [file_name]
+        encoded = _map(_render_encoded, jobs, workers, plot_progress.counter)
+
+    with open(file_name, "w", encoding="utf-8") as page:
+        page.write("<!DOCTYPE html>\n<html>\n<head>\n")
+        page.write(f"<meta charset=\"utf-8\">\n<title>{html.escape(name)}</title>\n")
+        page.write("</head>\n<body>\n")
+        for job_name, image in encoded:
+            page.write(
+                f"<figure id=\"{html.escape(job_name)}\">"
+                f"<img src=\"data:image/png;base64,{image}\">"
+                f"<figcaption>{html.escape(job_name)}</figcaption></figure>\n"
+            )
+        page.write("</body>\n</html>\n")
+    return [file_name]
@@ -0,0 +1,71 @@
+""" This module plots the thread scaling of a workload
+
+    The speedup is drawn against the number of threads together with the
+    ideal linear scaling, the time per event of the individual algorithms
+    is drawn as stacked bars per number of threads, which shows where the
+    time per event grows instead of staying constant.
+"""
+
+import numpy as np
+from plotting import style
+
+
+def speedup(
+    ax,
+    threads: list,
+    speedups: list,
+    pstyle: style.Style = style.Style(),
+    label: str = "",
+    ideal: bool = True,
+) -> None:
+    """Plot the speedup against the number of threads"""
+
+    if ideal:
+        ax.plot(threads, threads, linestyle="dotted", color="gray", label="ideal")
+    ax.plot(
+        threads,
+        speedups,
+        marker=pstyle.get_marker(),
+        markersize=pstyle.get_markersize(),
+        linestyle=pstyle.get_linestyle(),
+        linewidth=pstyle.get_linewidth(),
+        color=pstyle.get_color(),
+        alpha=pstyle.get_alpha(),
+        label=label,
+    )
+    ax.set_xlabel("Number of threads")
+    ax.set_ylabel("Speedup")
+    ax.set_xticks(threads)
+
+
+def breakdown(ax, threads: list, algorithms: list, max_algorithms: int = 8) -> list:
+    """Plot the time per event per algorithm as stacked bars per number of threads
+
+    The algorithms are given as dictionaries of identifier to time per event
+    in seconds, one per number of threads. The ones with the largest time
+    are shown, the others are summed up. Returns the identifiers shown.
+    """
+
+    # The largest contributions over all thread numbers
+    totals = {}
+    for timings in algorithms:
+        for identifier, per_event in timings.items():
+            totals[identifier] = totals.get(identifier, 0.0) + per_event
+    shown = sorted(totals, key=totals.get, reverse=True)[:max_algorithms]
+
+    positions = np.arange(len(threads))
+    bottom = np.zeros(len(threads))
+    for identifier in shown:
+        values = np.array([timings.get(identifier, 0.0) for timings in algorithms])
+        ax.bar(positions, values, bottom=bottom, label=identifier)
+        bottom += values
+    others = np.array(
+        [sum(v for k, v in timings.items() if k not in shown) for timings in algorithms]
+    )
+    if np.any(others > 0.0):
+        ax.bar(positions, others, bottom=bottom, label="others", color="lightgray")
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(n) for n in threads])
+    ax.set_xlabel("Number of threads")
+    ax.set_ylabel("Time per event [s]")
+    return shown
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shlex
+import time
+
+import uproot
+
+import digitization_parameterisation as parameterisation
+from digitization import instrument
+from digitization import state
+from digitization import synthetic
+
+
+def generator_key(args) -> str:
+    """A hash of the parameters of the synthetic detector and the seed"""
+
+    parameters = {
+        "volumes": args.volumes,
+        "layers": args.layers,
+        "extras": args.extras,
+        "cluster_size_mean": list(args.cluster_size_mean),
+        "shape": args.shape,
+        "seed": args.seed,
+    }
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def generate_file(args, n_rows: int) -> str:
+    """Write the synthetic measurement tree for a number of rows, if needed
+
+    The file name carries the generator parameters, a file is only reused
+    if it was generated with the same ones.
+    """
+
+    file_name = os.path.join(args.work_dir, f"measurements_{n_rows}_{generator_key(args)}.root")
+    if args.reuse and os.path.isfile(file_name):
+        logging.info(f"Reusing {file_name}")
+        return file_name
+    detector = synthetic.Detector(
+        volumes=args.volumes,
+        layers=args.layers,
+        extras=args.extras,
+        cluster_size_mean=tuple(args.cluster_size_mean),
+        shape=args.shape,
+    )
+    logging.info(f"Generating {n_rows} rows into {file_name}")
+    start = time.perf_counter()
+    synthetic.write(file_name, n_rows, detector, seed=args.seed)
+    logging.info(f"-> generated in {time.perf_counter() - start:.2f} s")
+    return file_name
+
+
+def benchmark_booking(pargs, measurements, repeat: int) -> float:
+    """Best time of booking the histograms for the first batch"""
+
+    branches = parameterisation.required_branches(pargs)
+    batch = next(
+        measurements.iterate(
+            branches, step_size=pargs.batch_size, library="ak"
+        )
+    )
+    batch_partition, columns, channels = parameterisation.prepare_batch(
+        pargs, batch, branches
+    )
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parameterisation.book_histograms(pargs, columns, channels, batch_partition)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_run(pargs, measurements, repeat: int) -> dict:
+    """Best time of the full parameterisation, with the phases of that run"""
+
+    best = None
+    for _ in range(repeat):
+        recorder = instrument.Recorder()
+        fill_state = state.State(parameterisation.state_config(pargs))
+        start = time.perf_counter()
+        parameterisation.fill_histograms(pargs, measurements, fill_state, recorder)
+        parameterisation.run_parametrisation(pargs, fill_state, recorder)
+        duration = time.perf_counter() - start
+        if best is None or duration < best["time"]:
+            best = {
+                "time": duration,
+                "histograms": len(fill_state),
+                "phases": recorder.summary(),
+            }
+    return best
+
+
+# Main function
+if "__main__" == __name__:
+    # Parse the command line arguments
+    p = argparse.ArgumentParser(description="Benchmark of the hit parameterisation")
+    p.add_argument(
+        "--rows",
+        default=[1e5, 1e6],
+        nargs="+",
+        type=float,
+        help="Number of rows of the synthetic measurement trees, e.g. 1e5 1e6 1e7 1e8",
+    )
+    p.add_argument(
+        "--work-dir",
+        default="benchmark",
+        type=str,
+        help="Directory for the synthetic measurement files, created if needed.",
+    )
+    p.add_argument(
+        "--reuse",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Reuse existing synthetic files of the same size, detector parameters and seed.",
+    )
+    p.add_argument(
+        "--volumes",
+        default=[8, 9, 16],
+        nargs="+",
+        type=int,
+        help="Volume ids of the synthetic detector.",
+    )
+    p.add_argument(
+        "--layers", default=3, type=int, help="Number of layers per volume."
+    )
+    p.add_argument(
+        "--extras", default=0, type=int, help="Number of extra ids per layer."
+    )
+    p.add_argument(
+        "--cluster-size-mean",
+        default=[1.5, 2.0],
+        nargs=2,
+        type=float,
+        help="Mean cluster size in loc0 and loc1.",
+    )
+    p.add_argument(
+        "--shape",
+        default="tails",
+        type=str,
+        choices=synthetic.SHAPES,
+        help="Shape of the residual distributions.",
+    )
+    p.add_argument(
+        "--seed", default=42, type=int, help="Random seed for the generation."
+    )
+    p.add_argument(
+        "--repeat", default=1, type=int, help="Repetitions, the best time is taken."
+    )
+    p.add_argument(
+        "--parameterisation-args",
+        default="--plots none",
+        type=str,
+        help="Options passed to the parameterisation, e.g. '--plots none --batch-size 500000'.",
+    )
+    p.add_argument(
+        "--output", type=str, help="JSON file with the benchmark results."
+    )
+
+    args = p.parse_args()
+
+    # Logging configuration
+    logging.basicConfig(encoding="utf-8", level=logging.INFO)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    pargs = parameterisation.argument_parser().parse_args(
+        shlex.split(args.parameterisation_args)
+    )
+
+    results = []
+    for n_rows in [int(rows) for rows in args.rows]:
+        file_name = generate_file(args, n_rows)
+        measurements = uproot.open(file_name + ":measurements")
+        # The logging of the parameterisation itself is muted
+        logging.getLogger().setLevel(logging.WARNING)
+        booking = benchmark_booking(pargs, measurements, args.repeat)
+        run = benchmark_run(pargs, measurements, args.repeat)
+        logging.getLogger().setLevel(logging.INFO)
+        result = dict(
+            run,
+            rows=n_rows,
+            booking=booking,
+            rows_per_second=n_rows / run["time"],
+            peak_rss_mb=instrument.peak_rss_mb(),
+        )
+        logging.info(
+            f"{n_rows} rows: booking {booking:.3f} s, run {run['time']:.3f} s, "
+            f"{result['rows_per_second']:.0f} rows/s, {run['histograms']} histograms, "
+            f"peak RSS {result['peak_rss_mb']:.0f} MB"
+        )
+        results.append(result)
+
+    if args.output is not None:
+        with open(args.output, "w") as outfile:
+            json.dump(
+                {"options": vars(args), "parameterisation": vars(pargs), "results": results},
+                outfile,
+                indent=4,
+            )
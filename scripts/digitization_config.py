@@ -1,14 +1,68 @@
 #!/usr/bin/env python3
 import argparse
-import json
+import copy
 import logging
 
+from digitization import config
+from digitization import diff
+from common import jsonio
+
 # This script allows to update the digitization configuration file.
 #
+# update mode: one input file, the binning of the selected entries is updated
+# merge mode: multiple input files, the entries are merged by their
+#             (volume, layer, extra) key, the latter overwrites the prior one,
+#             the binning of the selected entries is updated afterwards
 #
+# Volumes, layers and extra bits are selected by glob patterns, e.g. "1?"
 #
-#
-#
+# The changes with respect to the (first) input file are summarised, in
+# dry-run mode they are reported entry by entry and nothing is written
+
+
+def update_binning(digi_entry, args):
+    """Update the binning of a single entry according to the arguments"""
+
+    layer = digi_entry["layer"] if "layer" in digi_entry else "all"
+    extra = digi_entry["extra"] if "extra" in digi_entry else "all"
+    logging.info(
+        f"Updating volume {digi_entry['volume']}, layer: {layer}, extra: {extra}"
+    )
+    # Get the parameterisation
+    digi_entry_value = digi_entry["value"]
+    if "geometric" not in digi_entry_value:
+        return
+    digi_entry_value = digi_entry_value["geometric"]
+    digi_entry_segmentation = digi_entry_value["segmentation"]
+    digi_entry_binning = digi_entry_segmentation["binningdata"]
+    for single_binningvalue in digi_entry_binning:
+        # Update x
+        if single_binningvalue["value"] == "binX":
+            if args.bins_x is not None:
+                logging.info(
+                    f"-> Update number of bins in x from {single_binningvalue['bins']} to {args.bins_x}"
+                )
+                single_binningvalue["bins"] = args.bins_x
+            if args.range_x is not None:
+                logging.info(
+                    f"-> Update range in x from [{single_binningvalue['min']}, {single_binningvalue['max']}] to {args.range_x}"
+                )
+                single_binningvalue["min"] = args.range_x[0]
+                single_binningvalue["max"] = args.range_x[1]
+        # Update y
+        if single_binningvalue["value"] == "binY":
+            if args.bins_y is not None:
+                logging.info(
+                    f"-> Update number of bins in y from {single_binningvalue['bins']} to {args.bins_y}"
+                )
+                single_binningvalue["bins"] = args.bins_y
+            if args.range_y is not None:
+                logging.info(
+                    f"-> Update range in y from [{single_binningvalue['min']}, {single_binningvalue['max']}] to {args.range_y}"
+                )
+                single_binningvalue["min"] = args.range_y[0]
+                single_binningvalue["max"] = args.range_y[1]
+
 
 # Main function
 if "__main__" == __name__:
@@ -30,23 +84,51 @@ if "__main__" == __name__:
 
     p.add_argument(
         "--volumes",
-        type=int,
+        type=str,
         nargs="+",
-        help="List of volumes to be updated.",
+        help="List of volumes (glob patterns) to be updated or merged.",
     )
 
     p.add_argument(
         "--layers",
-        type=int,
+        type=str,
         nargs="+",
-        help="List of layers to be updated.",
+        help="List of layers (glob patterns) to be updated or merged.",
     )
 
     p.add_argument(
         "--extra-bits",
-        type=int,
+        type=str,
         nargs="+",
-        help="List of extra bits to be updated.",
+        help="List of extra bits (glob patterns) to be updated or merged.",
+    )
+
+    p.add_argument(
+        "--compact",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Write compact instead of pretty printed JSON.",
+    )
+
+    p.add_argument(
+        "--merge-hierarchical",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Merged entries also replace the finer entries below them, e.g. a volume entry all its layer entries.",
+    )
+
+    p.add_argument(
+        "--dry-run",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Report the added, removed and changed entries without writing.",
+    )
+
+    p.add_argument(
+        "--diff-tolerance",
+        default=0.0,
+        type=float,
+        help="Relative tolerance below which numbers are reported as unchanged.",
     )
 
     p.add_argument(
@@ -80,65 +162,79 @@ if "__main__" == __name__:
     # Logging configuration
     logging.basicConfig(encoding="utf-8", level=logging.INFO)
 
+    # The entry selection by glob patterns
+    def selector(digi_entry):
+        return config.matches(digi_entry, args.volumes, args.layers, args.extra_bits)
+
+    # The binning update, only applied to the selected entries
+    update = (
+        args.bins_x is not None
+        or args.range_x is not None
+        or args.bins_y is not None
+        or args.range_y is not None
+    )
+
+    # The changes with respect to the input, collected entry by entry in update mode
+    report = diff.Report()
+
+    def patcher(digi_entry):
+        if update and selector(digi_entry):
+            original = copy.deepcopy(digi_entry)
+            update_binning(digi_entry, args)
+            report.add_entry(original, digi_entry, args.diff_tolerance)
+        else:
+            report.add_entry(digi_entry, digi_entry)
+
+    indent = None if args.compact else 4
+    write = args.digi_config_out is not None and not args.dry_run
+
     if len(args.digi_config_in) == 1:
         print("*** only one input file: update mode ")
-        # Read the digitization configuration file
+        # Stream the entries through, the document is never held as a whole
         with open(args.digi_config_in[0], "r") as f:
-            digi_config = json.load(f)
-            digi_entries = digi_config["entries"]
-
-            for digi_entry in digi_entries:
-                if digi_entry["volume"] in args.volumes:
-                    if args.layers is None or (
-                        "layer" in digi_entry and digi_entry["layer"] in args.layers
-                    ):
-                        layer = digi_entry["layer"] if "layer" in digi_entry else "all"
-                        if args.extra_bits is None or (
-                           "extra" in digi_entry and digi_entry["extra"] in args.extra_bits
-                        ):
-                            extra = digi_entry["extra"] if "extra" in digi_entry else "all"
-                            logging.info(
-                                f"Updating volume {digi_entry['volume']}, layer: {layer}, extra: {extra}"
-                            )
-                            # Get the parameterisation
-                            digi_entry_value = digi_entry["value"]
-                            if "geometric" in digi_entry_value:
-                                digi_entry_value = digi_entry_value["geometric"]
-                                digi_entry_segmentation = digi_entry_value["segmentation"]
-                                digi_entry_binning = digi_entry_segmentation["binningdata"]
-                                if (
-                                    args.bins_x is not None
-                                    or args.range_x is not None
-                                    or args.bins_y is not None
-                                    or args.range_y is not None
-                                ):
-                                    for single_binningvalue in digi_entry_binning:
-                                        # Update x
-                                        if single_binningvalue["value"] == "binX":
-                                            if args.bins_x is not None:
-                                                logging.info(
-                                                    f"-> Update number of bins in x from {single_binningvalue["bins"]} to {args.bins_x}"
-                                                )
-                                                single_binningvalue["bins"] = args.bins_x
-                                            if args.range_x is not None:
-                                                logging.info(
-                                                    f"-> Update range in x from [{single_binningvalue["min"]}, {single_binningvalue["max"]} to {args.range_x}"
-                                                )
-                                                single_binningvalue["min"] = args.range_x[0]
-                                                single_binningvalue["max"] = args.range_x[1]
-                                        # Update y
-                                        if single_binningvalue["value"] == "binY":
-                                            if args.bins_y is not None:
-                                                logging.info(
-                                                    f"-> Update number of bins in y from {single_binningvalue["bins"]} to {args.bins_y}"
-                                                )
-                                                single_binningvalue["bins"] = args.bins_y
-                                            if args.range_y is not None:
-                                                logging.info(
-                                                    f"-> Update range in y from [{single_binningvalue["min"]}, {single_binningvalue["max"]}] to {args.range_y}"
-                                                )
-                                                single_binningvalue["min"] = args.range_y[0]
-                                                single_binningvalue["max"] = args.range_y[1]
-    elif len(args.digi_config_in) > 1:
+            if write:
+                logging.info(
+                    f"Writing the digitization configuration to {args.digi_config_out}"
+                )
+                with open(args.digi_config_out, "w") as fout:
+                    jsonio.patch(f, fout, patcher, indent)
+            else:
+                for key, value in jsonio.iterate(f):
+                    if key == "entries":
+                        patcher(value)
+    else:
         print("*** multiple input files: merge mode ")
-
+        digi_configs = [jsonio.load(digi_config_in) for digi_config_in in args.digi_config_in]
+        # The base entries are replaced or updated in place, the updated ones are copied before
+        reference = diff.Snapshot(digi_configs[0]["entries"])
+        digi_config = config.merge(
+            digi_configs, selector=selector, hierarchical=args.merge_hierarchical
+        )
+        logging.info(
+            f"Merged {len(digi_configs)} files into {len(digi_config['entries'])} entries"
+        )
+
+        # Update the binning of the selected entries
+        if update:
+            for digi_entry in digi_config["entries"]:
+                if selector(digi_entry):
+                    reference.keep(digi_entry)
+                    update_binning(digi_entry, args)
+
+        report = diff.diff(reference.entries, digi_config["entries"], args.diff_tolerance)
+
+        # Write the result
+        if write:
+            logging.info(
+                f"Writing the digitization configuration to {args.digi_config_out}"
+            )
+            with open(args.digi_config_out, "w") as f:
+                config.dump(digi_config, f, indent)
+
+    # Report the changes
+    if args.dry_run:
+        print("*** dry run: nothing is written")
+        for line in report.lines():
+            print(line)
+    else:
+        logging.info(f"Changes: {report.summary()}")
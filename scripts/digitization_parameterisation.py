@@ -1,20 +1,28 @@
 #!/usr/bin/env python3
 from datetime import datetime
 import uproot
-import pandas as pd
+import awkward as ak
 import numpy as np
 import logging
 import argparse
 import hist
 from hist import Hist
-import matplotlib
-import matplotlib.pyplot as plt
-import json
 import os
-import copy
 
 from pathlib import Path
 
+from digitization import config
+from digitization import diff
+from digitization import estimators
+from digitization import instrument
+from common import jsonio
+from digitization import partition
+from digitization import state
+from digitization import store
+from digitization import table
+from monitoring import progress
+from plotting import gallery
+
 
 # OBJ: TLeafI	event_nr	event_nr
 # OBJ: TLeafI	volume_id	volume_id
@@ -84,26 +92,50 @@ def decode(volkey):
     return vtype + "_" + var, volume_id, layer_id, extra_id, cluster_size
 
 
-def book_histograms(args, batch):
+def process_keys(args, volume_ids, layer_ids, extra_ids):
+    """Packed (volume, layer, extra) keys per row, respecting the splitting"""
 
-    batch["volume_layer_extra_id"] = list(
-        zip(batch.volume_id, batch.layer_id, batch.extra_id)
+    # layers and extra bits are only kept for the volumes that are split
+    layer_ids = np.where(
+        np.isin(volume_ids, args.volumes_with_layersplit), layer_ids, -1
     )
+    extra_ids = np.where(np.isin(volume_ids, args.volumes_with_extrabit), extra_ids, -1)
+    return partition.pack(volume_ids, layer_ids, extra_ids)
+
+
+def required_branches(args) -> list:
+    """The branches needed for the requested outputs"""
+
+    branches = ["volume_id", "layer_id", "extra_id"]
+    # Residual and pull histograms per cluster size
+    if args.residuals or args.pulls:
+        branches += ["clus_size_loc0", "clus_size_loc1"]
+    if args.residuals:
+        branches += ["residual_loc0", "residual_loc1", "residual_time"]
+    if args.pulls:
+        branches += ["pull_loc0", "pull_loc1", "pull_time"]
+    # Overall 2D histograms
+    if args.overview:
+        branches += ["rec_loc0", "rec_loc1"]
+    # The jagged channel branches are the most expensive to read
+    if args.channel_maps:
+        branches += ["channel_loc0", "channel_loc1"]
+    return branches
+
+
+def book_histograms(args, columns, channels, batch_partition):
 
     # the unique volume/layer ids
-    unique_ids = np.unique(batch["volume_layer_extra_id"])
-    process_unique_ids = np.unique(batch["volume_layer_extra_id"])
+    unique_ids = partition.unpack(
+        np.unique(
+            partition.pack(
+                columns["volume_id"], columns["layer_id"], columns["extra_id"]
+            )
+        )
+    )
     num_unique_ids = len(unique_ids)
-    # post processing with respecting the layer split
-    for i, (volume_id, layer_id, extra_id) in enumerate(unique_ids):
-        unique_ids[i] = (volume_id, layer_id, extra_id)
-        # now set
-        layer_id = layer_id if volume_id in args.volumes_with_layersplit else -1
-        extra_id = extra_id if volume_id in args.volumes_with_extrabit else -1
-        process_unique_ids[i] = (volume_id, layer_id, extra_id)
-    # Make them unique again
-    process_unique_ids = np.unique(process_unique_ids)
-    unique_ids = np.unique(unique_ids)
+    # post processing with respecting the layer split, given by the partition
+    process_unique_ids = partition.unpack(batch_partition.keys)
 
     logging.info(f"Found {num_unique_ids} unique volume IDs: {unique_ids}")
     logging.info(
@@ -115,216 +147,310 @@ def book_histograms(args, batch):
 
     residuals = ["loc0", "loc1", "time"]
 
-    for i, (volume_id, layer_id, extra_id) in enumerate(process_unique_ids):
-        # In two steps avoids reindexing warning
-        vbatch = batch[batch["volume_id"] == volume_id]
-        if layer_id > 0:
-            vbatch = vbatch[vbatch["layer_id"] == layer_id]
-        if extra_id > 0:
-            vbatch = vbatch[vbatch["extra_id"] == extra_id]
-        # Get Min/Max  values for residuals
-        hist_ranges = {
-            res: vbatch["residual_" + res].agg(["min", "max"]) for res in residuals
-        }
-
-        local_ranges = {
-            res: (vbatch["rec_" + res].min(), vbatch["rec_" + res].max())
-            for res in residuals
-        }
-
-        channel_ranges = {
-            "loc0" : (0, vbatch["channel_loc0"].max())
-        }
-
-        channel_ranges = {
-            "loc1" : (0, vbatch["channel_loc1"].max())
-        }
+    # Min/Max values per key at once for the columns that are read, NaN values are ignored
+    minima = {
+        column: batch_partition.reduce(np.fmin, columns[column])
+        for column in ["residual_" + res for res in residuals]
+        + ["pull_" + res for res in residuals]
+        + ["rec_loc0", "rec_loc1", "clus_size_loc0", "clus_size_loc1"]
+        if column in columns
+    }
+    maxima = {
+        column: batch_partition.reduce(np.fmax, columns[column])
+        for column in minima
+    }
 
-        # Get the max cluster sizes
-        cluster_sizes = {
-            "loc0": vbatch["clus_size_loc0"].max(),
-            "loc1": (
-                vbatch["clus_size_loc1"].max()
-                if args.max_clustersize is None
-                else (
-                    args.max_clustersize
-                    if args.max_clustersize < vbatch["clus_size_loc1"].max()
-                    else vbatch["clus_size_loc1"].max()
-                )
-            ),
-            "time": 0,
-        }
+    for i, (volume_id, layer_id, extra_id) in enumerate(process_unique_ids):
 
         # Book the histograms: loc0_vs_loc1
-        loc_2D_name = encode("loc0_vs_loc1", volume_id, layer_id, extra_id, 0)
-        logging.info(f"Booking 2D histogram {loc_2D_name}")
-        histograms_overview[loc_2D_name] = [
-            Hist(
-                hist.axis.Regular(
-                    bins=args.bins,
-                    start=local_ranges["loc0"][0],
-                    stop=local_ranges["loc0"][1],
-                    name="loc0",
-                ),
-                hist.axis.Regular(
-                    bins=args.bins,
-                    start=local_ranges["loc1"][0],
-                    stop=local_ranges["loc1"][1],
-                    name="loc1",
+        if args.overview:
+            loc_2D_name = encode("loc0_vs_loc1", volume_id, layer_id, extra_id, 0)
+            logging.info(f"Booking 2D histogram {loc_2D_name}")
+            histograms_overview[loc_2D_name] = [
+                Hist(
+                    *[
+                        hist.axis.Regular(
+                            bins=args.bins,
+                            start=minima["rec_" + res][i],
+                            stop=maxima["rec_" + res][i],
+                            name=res,
+                        )
+                        for res in ["loc0", "loc1"]
+                    ]
                 ),
-            ),
-            0.0,
-        ]
+                0.0,
+            ]
 
         # Book the histograms: channel_loc0 and channel_loc1
-        #for res in ["loc0", "loc1"]:
-        #    hist_channel_name = encode(
-        #        "channel_" + res, volume_id, layer_id, extra_id, 0
-        #    )
-        #    logging.debug(f"Booking histogram {hist_channel_name}")
-        #    histograms[hist_channel_name] = [
-        #        Hist(
-        #            hist.axis.Regular(
-        #                bins=args.bins,
-        #                start=channel_ranges[res][0],
-        #                stop=channel_ranges[res][1],
-        #                name=res,
-        #            )
-        #        ),
-        #        0.0,
-        #    ]
-
-        # Create the histograms
+        if args.channel_maps:
+            rows = batch_partition.rows(partition.pack(volume_id, layer_id, extra_id))
+            for res in ["loc0", "loc1"]:
+                hist_channel_name = encode(
+                    "channel_" + res, volume_id, layer_id, extra_id, 0
+                )
+                logging.debug(f"Booking histogram {hist_channel_name}")
+                max_channel = ak.max(channels["channel_" + res][rows], axis=None)
+                max_channel = 0 if max_channel is None else int(max_channel)
+                histograms_overview[hist_channel_name] = [
+                    Hist(
+                        hist.axis.Regular(
+                            bins=max_channel + 1,
+                            start=-0.5,
+                            stop=max_channel + 0.5,
+                            name="channel (" + res + ")",
+                        )
+                    ),
+                    0.0,
+                ]
+
+        if not args.residuals and not args.pulls:
+            continue
+
+        # Create the histograms, all cluster sizes in one histogram
         for res in residuals:
-            hrange = hist_ranges[res]
+            # Get Min/Max values for residuals, or check the pulls only
+            column = "residual_" + res if args.residuals else "pull_" + res
+            hrange = {"min": minima[column][i], "max": maxima[column][i]}
             # Check if the histogram ranges are not NaN
             if not np.isnan(hrange["min"]) and not np.isnan(hrange["max"]):
-                # Now do the loop over the cluster sizes
-                for c_size in range(0, cluster_sizes[res] + 1):
 
+                if args.residuals:
                     hist_residual_name = encode(
-                        "residual_" + res, volume_id, layer_id, extra_id, c_size
+                        "residual_" + res, volume_id, layer_id, extra_id, 0
                     )
                     logging.debug(f"Booking histogram {hist_residual_name}")
+                    histograms[hist_residual_name] = store.book(
+                        args.bins, hrange["min"], hrange["max"], res
+                    )
 
-                    # Book the histogram
-                    histograms[hist_residual_name] = [
-                        Hist(
-                            hist.axis.Regular(
-                                bins=args.bins,
-                                start=hrange["min"],
-                                stop=hrange["max"],
-                                name=res,
-                            )
-                        ),
-                        0.0,
-                    ]
-
-                    # Book the pull histograms if configured
-                    if args.pulls:
-                        hist_pull_name = encode(
-                            "pull_" + res, volume_id, layer_id, extra_id, c_size
-                        )
-                        logging.debug(f"Booking histogram {hist_pull_name}")
-
-                        # Book the histogram
-                        histograms[hist_pull_name] = [
-                            Hist(
-                                hist.axis.Regular(
-                                    bins=args.bins,
-                                    start=-5,
-                                    stop=5,
-                                    name="pull (" + res + ")",
-                                )
-                            ),
-                            0.0,
-                        ]
-        # Clear the histogram ranges
-        hist_ranges.clear()
+                # Book the pull histograms if configured
+                if args.pulls:
+                    hist_pull_name = encode(
+                        "pull_" + res, volume_id, layer_id, extra_id, 0
+                    )
+                    logging.debug(f"Booking histogram {hist_pull_name}")
+                    histograms[hist_pull_name] = store.book(
+                        args.bins, -5, 5, "pull (" + res + ")"
+                    )
 
     return histograms, histograms_overview, unique_ids, process_unique_ids
 
 
-def run_parametrisation(args, measurements):
+def state_config(args) -> dict:
+    """The options the histograms are booked with, a resumed state must match"""
+
+    return {
+        "bins": args.bins,
+        "max_clustersize": args.max_clustersize,
+        "volumes_with_layersplit": sorted(args.volumes_with_layersplit),
+        "volumes_with_extrabit": sorted(args.volumes_with_extrabit),
+        "residuals": args.residuals,
+        "pulls": args.pulls,
+        "overview": args.overview,
+        "channel_maps": args.channel_maps,
+    }
+
+
+def prepare_batch(args, batch, branches) -> tuple:
+    """Partition a batch by key, returns the partition, columns and channels
+
+    The flat branches are taken as plain numpy arrays (views of the awkward
+    buffers) and sorted once, all selections by key are then contiguous
+    views. The jagged channel branches stay awkward arrays.
+    """
+
+    flat = {
+        branch: ak.to_numpy(batch[branch])
+        for branch in branches
+        if not branch.startswith("channel_")
+    }
+    batch_partition = partition.Partition(
+        process_keys(args, flat["volume_id"], flat["layer_id"], flat["extra_id"])
+    )
+    columns = {branch: batch_partition.sort(column) for branch, column in flat.items()}
+    channels = {
+        branch: batch[branch][batch_partition.order]
+        for branch in branches
+        if branch.startswith("channel_")
+    }
+    return batch_partition, columns, channels
+
+
+def fill_histograms(
+    args,
+    measurements,
+    fill_state,
+    recorder,
+    entry_start=None,
+    entry_stop=None,
+    fill_progress=None,
+):
+    """Fill the histograms of the state from one measurement tree
+
+    The first batch books the histograms of the keys that are not yet in
+    the state, the existing histograms keep their binning. The phases of
+    every batch are timed by the recorder, the rows and bytes are added to
+    the progress if given.
+    """
+
+    # Only the branches for the requested outputs are read
+    branches = required_branches(args)
+
+    histograms = fill_state.histograms
+    histograms_overview = fill_state.histograms_overview
+
+    # The decompression is timed separately from the reading
+    decompression = instrument.TimingExecutor()
+
+    # histogram filling per batch
+    for ib, batch in enumerate(
+        recorder.timed(
+            "read",
+            measurements.iterate(
+                branches,
+                step_size=args.batch_size,
+                entry_start=entry_start,
+                entry_stop=entry_stop,
+                library="ak",
+                decompression_executor=decompression,
+            ),
+        )
+    ):
+        fill_state.n_batches += 1
+        recorder.split_last("decompress", decompression.take())
+        n_rows = len(batch)
+        if fill_progress is not None:
+            fill_progress.add(n_rows, batch.nbytes)
+
+        with recorder.phase("partition", n_rows, batch=recorder.batch):
+            batch_partition, columns, channels = prepare_batch(args, batch, branches)
+
+        # In batch 0 we create the reference histograms for the new keys
+        if ib == 0:
+            with recorder.phase("book", n_rows, batch=recorder.batch):
+                booked, booked_overview, unique_ids, process_unique_ids = book_histograms(
+                    args, columns, channels, batch_partition
+                )
+            fill_state.add_ids(unique_ids, process_unique_ids)
+            n_booked = fill_state.book(booked, booked_overview)
+            logging.info(f"Booked {n_booked} new histograms")
+
+        with recorder.phase("fill", n_rows, batch=recorder.batch):
+            # Fill the 2D histograms and the channel maps
+            for (volume_id, layer_id, extra_id) in fill_state.process_unique_ids:
+                rows = batch_partition.rows(partition.pack(volume_id, layer_id, extra_id))
+                if args.overview:
+                    loc_2D_name = encode("loc0_vs_loc1", volume_id, layer_id, extra_id, 0)
+                    hist_2D = histograms_overview[loc_2D_name]
+                    hist_2D[0].fill(columns["rec_loc0"][rows], columns["rec_loc1"][rows])
+                for branch, channel in channels.items():
+                    hist_channel_name = encode(branch, volume_id, layer_id, extra_id, 0)
+                    histograms_overview[hist_channel_name][0].fill(
+                        ak.to_numpy(ak.flatten(channel[rows], axis=None))
+                    )
+
+            # Fill the histograms per batch, all cluster sizes at once
+            for volkey, entry in histograms.items():
+                vartype, volume_id, layer_id, extra_id, _ = decode(volkey)
+                logging.debug(f"Filling histogram {volkey}")
+                rows = batch_partition.rows(partition.pack(volume_id, layer_id, extra_id))
+                vlpars = columns[vartype][rows]
+                if len(vlpars) == 0:
+                    continue
+                varname = vartype.split("_")[1]
+                # the time is not split by cluster size
+                sizes = (
+                    columns["clus_size_" + varname][rows]
+                    if varname != "time"
+                    else np.zeros(len(vlpars), dtype=np.int32)
+                )
+                store.fill(entry, sizes, vlpars)
+
+        recorder.log_batch(recorder.batch)
+
+
+def expand_histograms(args, histograms) -> dict:
+    """The histogram and rms sum per cluster size, 0 for all cluster sizes
+
+    Cluster sizes without entries are given as empty histograms, such that
+    the variances keep their position, loc1 is limited to the maximum
+    cluster size.
+    """
+
+    expanded = {}
+    for volkey, entry in histograms.items():
+        vartype, volume_id, layer_id, extra_id, _ = decode(volkey)
+        varname = vartype.split("_")[1]
+        max_cluster_size = {"loc0": None, "loc1": args.max_clustersize, "time": 0}[varname]
+        for cluster_size, hist_rms in store.expand(entry, max_cluster_size).items():
+            expanded[encode(vartype, volume_id, layer_id, extra_id, cluster_size)] = hist_rms
+    return expanded
+
+
+def run_parametrisation(args, fill_state, recorder):
 
     logging.info("*** Measurement error parameterisation ***")
 
     # Open the json to be updated
     digi_cfg = None
+    reference = None
     if (
         args.digi_config_in is not None
         and os.path.isfile(args.digi_config_in)
         and os.access(args.digi_config_in, os.R_OK)
     ):
-        jfile = open(args.digi_config_in, "r")
-        digi_cfg = json.load(jfile)
-
-    # Define the branches to be plotted
-    branches = ["volume_id", "layer_id", "extra_id", "clus_size_loc0", "clus_size_loc1"]
-    # Overall 2D histograms
-    branches += ["rec_loc0", "rec_loc1", "channel_loc0", "channel_loc1", "rec_time"]
-    if args.residuals:
-        branches += ["residual_loc0", "residual_loc1", "residual_time"]
-    if args.pulls:
-        branches += ["pull_loc0", "pull_loc1", "pull_time"]
-
-    histograms = None
-    unique_ids = None
-    process_unique_ids = None
-    n_batches = 0
-
-    # histogram filling per batch
-    for ib, batch in enumerate(
-        measurements.iterate(
-            branches,
-            step_size=args.batch_size,
-            library="pd",
-        )
-    ):
-        n_batches += 1
-        # In batch 0 we create the reference histograms
-        if ib == 0:
-            histograms, histograms_overview, unique_ids, process_unique_ids = book_histograms(
-                args, batch
+        with recorder.phase("json-read"):
+            digi_cfg = jsonio.load(args.digi_config_in)
+        # The entries are updated in place, the changed ones are copied before
+        reference = diff.Snapshot(digi_cfg["entries"])
+
+    histograms = expand_histograms(args, fill_state.histograms)
+    histograms_overview = fill_state.histograms_overview
+    unique_ids = fill_state.unique_ids
+    n_batches = fill_state.n_batches
+
+    # The width per histogram: plain rms averaged over the batches
+    widths = {volkey: rms / n_batches for volkey, (hist, rms) in histograms.items()}
+
+    # Robust width estimation from the filled histograms, all keys at once
+    if args.width_estimator != "rms":
+        logging.info(f"Estimating widths with the {args.width_estimator} estimator")
+        estimator_args = {}
+        if args.width_estimator == "truncated-rms":
+            estimator_args["fraction"] = args.truncation_fraction
+        volkeys = list(histograms.keys())
+        with recorder.phase("estimate"):
+            estimated = estimators.widths(
+                [histograms[volkey][0] for volkey in volkeys],
+                args.width_estimator,
+                **estimator_args,
+            )
+        for volkey, width in zip(volkeys, estimated):
+            # Keep the plain rms for empty histograms
+            if not np.isnan(width):
+                widths[volkey] = width
+
+    # Write the full parameterisation table
+    if args.table_out is not None:
+        logging.info(f"Writing the parameterisation table to {args.table_out}")
+        volkeys = list(histograms.keys())
+        with recorder.phase("table"):
+            table.save(
+                args.table_out,
+                table.build(
+                    [decode(volkey) for volkey in volkeys],
+                    [histograms[volkey][0] for volkey in volkeys],
+                    [widths[volkey] for volkey in volkeys],
+                ),
             )
 
-        # Fill the 2D histograms
-        for (volume_id, layer_id, extra_id) in process_unique_ids:
-            loc_2D_name = encode("loc0_vs_loc1", volume_id, layer_id, extra_id, 0)
-            hist_2D = histograms_overview[loc_2D_name]
-            vbatch = batch[batch["volume_id"] == volume_id]
-            if layer_id > 0:
-                vbatch = vbatch[vbatch["layer_id"] == layer_id]
-            if extra_id > 0:
-                vbatch = vbatch[vbatch["extra_id"] == extra_id]
-            hist_2D[0].fill(vbatch["rec_loc0"], vbatch["rec_loc1"])
-
-        # Fill the histograms per batch
-        for volkey, hist_rms in histograms.items():
-            hist, rms = hist_rms
-            vartype, volume_id, layer_id, extra_id, cluster_size = decode(volkey)
-            logging.debug(f"Filling histogram {volkey}")
-            # In two steps avoids reindexing warning
-            vbatch = batch[batch["volume_id"] == volume_id]
-            if layer_id > 0:
-                vbatch = vbatch[vbatch["layer_id"] == layer_id]
-            if extra_id > 0:
-                vbatch = vbatch[vbatch["extra_id"] == extra_id]
-            if cluster_size > 0:
-                varname = "loc0" if "loc0" in vartype else "loc1"
-                vbatch = vbatch[vbatch["clus_size_" + varname] == cluster_size]
-            vlpars = vbatch[vartype]
-            vlrms = np.sqrt(np.mean(np.square(vlpars)))
-            if not np.isnan(vlrms):
-                hist.fill(vlpars)
-                hist_rms[1] = rms + vlrms
-
-    # Draw the histograms and save them, fill also the rms dictionary
+    # Collect the histograms to be drawn, fill also the rms dictionary
     rms_dict = {}
+    plot_jobs = []
     for volkey, hist_rms in histograms.items():
-        # Get histogram and rms
-        hist, rms = hist_rms
-        rms /= n_batches
+        # Get histogram and width
+        hist = hist_rms[0]
+        rms = widths[volkey]
         vartype, volume_id, layer_id, extra_id, cluster_size = decode(volkey)
 
         # Variable type
@@ -341,17 +467,18 @@ def run_parametrisation(args, measurements):
             rms_dict[volume_id][layer_id][extra_id][varname] = {}
         rms_dict[volume_id][layer_id][extra_id][varname][cluster_size] = rms
 
+        # Only the cluster size inclusive histograms for the summary
+        if args.plots == "none" or (args.plots == "summary" and cluster_size > 0):
+            continue
+
         # Coninue if there are no entries
         if hist.sum() < args.min_entries:
             logging.info(
                 f"Skipping histogram {volkey} with less than {args.min_entries} entries"
             )
             continue
-        logging.debug(f"Drawing histogram {volkey}")
+        logging.debug(f"Booking plot for histogram {volkey}")
 
-        # Plotting and saving
-        plt.figure()
-        hist.plot()
         # Prepare the hist ttile
         htitle = f"volume {volume_id}"
         if layer_id > 0:
@@ -362,17 +489,46 @@ def run_parametrisation(args, measurements):
             htitle += f", extra id {extra_id}"
         if cluster_size > 0:
             htitle += f", cluster size {cluster_size}"
-        plt.title(f"{htitle}, rms : {rms}")
-        plt.xlabel(vartype)
-        plt.ylabel("Entries")
-        plt.savefig(f"png/hist_{volkey}.png")
+        plot_jobs.append(
+            gallery.PlotJob(
+                f"hist_{volkey}",
+                hist,
+                title=f"{htitle}, rms : {rms}",
+                xlabel=vartype,
+                ylabel="Entries",
+            )
+        )
+
+    # Control histograms
+    if args.plots != "none":
+        for key, (hist, value) in histograms_overview.items():
+            prefix = "hist2d" if hist.ndim == 2 else "hist"
+            plot_jobs.append(gallery.PlotJob(f"{prefix}_{key}", hist))
+
+    # Render the plots, figures are closed after saving
+    if len(plot_jobs) > 0:
+        logging.info(
+            f"Rendering {len(plot_jobs)} plots as {args.plot_format} into {args.plot_dir}"
+        )
+        with recorder.phase("render"):
+            gallery.render(
+                plot_jobs,
+                args.plot_dir,
+                fmt=args.plot_format,
+                workers=args.plot_workers,
+                name="digitization_parameterisation",
+                progress_mode=args.progress,
+            )
 
     # Update the digi_cfg to include the rms values, this should
     if digi_cfg is not None:
         logging.info("Updating the digitization configuration JSON File")
-        digi_entries = digi_cfg["entries"]
-        # make a dictionary of the entries
-        # digi_dict = {}
+        # Index the entries once by (volume, layer, extra)
+        config_index = config.ConfigIndex(digi_cfg["entries"])
+        # The layers found per volume
+        volume_layers = {}
+        for v_l_s_id in unique_ids:
+            volume_layers.setdefault(v_l_s_id[0], []).append(v_l_s_id[1])
         for volume_id in rms_dict:
             logging.info(f"Processing volume {volume_id}")
             # If the volume had extra bit information, we need to enforce layer splitting
@@ -387,9 +543,7 @@ def run_parametrisation(args, measurements):
                 logging.info(
                     f"Volume {volume_id} has extra bits or layer split, enforcing layer split"
                 )
-                for v_l_s_id in unique_ids:
-                    if v_l_s_id[0] == volume_id:
-                        layers.append(v_l_s_id[1])
+                layers = volume_layers.get(volume_id, [])
             if len(layers) > 0:
                 layers = np.unique(layers)
                 logging.info(f"-> layers found for this volume: {layers}")
@@ -397,96 +551,71 @@ def run_parametrisation(args, measurements):
             for layer_id in rms_dict[volume_id]:
                 logging.info(f"Processing layer: {layer_id if layer_id > 0 else 'all'}")
                 for extra_id in rms_dict[volume_id][layer_id]:
-                    # Process and change the entry
-                    config_entry = None
-                    # Start with a volume entry
-                    for entry in digi_entries:
-                        current_volume_id = entry["volume"]
-                        if current_volume_id == volume_id:
-                            config_entry = entry
-                            break
-                    # If we have a layer entry, update this one
-                    if layer_id > 0 and "layer" in entry:
-                        for entry in digi_entries:
-                            current_volume_id = entry["volume"]
-                            current_layer_id = entry["layer"]
-                            if (
-                                current_volume_id == volume_id
-                                and current_layer_id == layer_id
-                            ):
-                                config_entry = entry
-                                break
-                        # Make sure the layer_id is set even if the entry didn't have one
-                        config_entry["layer"] = layer_id
-                    if extra_id > 0 and "layer" in entry and "extra" in entry:
-                        for entry in digi_entries:
-                            current_volume_id = entry["volume"]
-                            current_layer_id = entry["layer"]
-                            current_extra_id = entry["extra"]
-                            if (
-                                current_volume_id == volume_id
-                                and current_extra_id == extra_id
-                            ):
-                                config_entry = entry
-                                break
-                        # Make sure the extra_id is set even if the entry didn't have one
-                        config_entry["extra"] = extra_id
+                    # Check that there is at least a volume entry to start from
+                    if config_index.find(volume_id, layer_id, extra_id) is None:
+                        logging.warning(
+                            f"No configuration entry found for volume {volume_id}"
+                        )
+                        continue
                     # Update the rms values
-                    if config_entry is not None:
-                        variances = []
-                        for iv, varname in enumerate(
-                            ["loc0", "loc1", "phi", "theta", "qOverP", "time"]
-                        ):
-                            if varname in rms_dict[volume_id][layer_id][extra_id]:
-                                rms_dict_values = rms_dict[volume_id][layer_id][
-                                    extra_id
-                                ][varname]
-                                # Skip the first
-                                rms_local_values = {"index": iv}
-                                rms_local_data = []
-                                for key in sorted(rms_dict_values.keys()):
-                                    if key > 0:
-                                        rms_local_data.append(
-                                            np.float64(rms_dict_values[key] ** 2)
-                                        )
-                                # Now add the values
-                                rms_local_values["rms"] = rms_local_data
-                                variances.append(rms_local_values)
-                        # If there is no extra bit set or if layer_id is sensefule, overwrite the variances
-                        if len(layers) == 0 or layer_id > 0:
-                            config_entry["value"]["geometric"]["variances"] = variances
-                        elif len(layers) > 0:
-                            logging.info(f"Splitting into layers {layers}")
-                            # first make a deep copy of the entry
-                            for lid in layers:
-                                new_entry = copy.deepcopy(config_entry)
-                                new_entry["layer"] = int(lid)
-                                if extra_id > 0:
-                                    new_entry["extra"] = extra_id
-                                new_entry["value"]["geometric"]["variances"] = variances
-                                digi_entries.append(new_entry)
-
-        # Control histograms
-        for key, (hist, value) in histograms_overview.items():
-            plt.figure()
-            hist.plot()
-            plt.savefig(f"png/hist2d_{key}.png")
+                    variances = []
+                    for iv, varname in enumerate(
+                        ["loc0", "loc1", "phi", "theta", "qOverP", "time"]
+                    ):
+                        if varname in rms_dict[volume_id][layer_id][extra_id]:
+                            rms_dict_values = rms_dict[volume_id][layer_id][extra_id][
+                                varname
+                            ]
+                            # Skip the first
+                            rms_local_values = {"index": iv}
+                            rms_local_data = []
+                            for key in sorted(rms_dict_values.keys()):
+                                if key > 0:
+                                    rms_local_data.append(
+                                        np.float64(rms_dict_values[key] ** 2)
+                                    )
+                            # Now add the values
+                            rms_local_values["rms"] = rms_local_data
+                            variances.append(rms_local_values)
+                    # If there is no extra bit set or if layer_id is sensefule, overwrite the variances
+                    if len(layers) == 0 or layer_id > 0:
+                        # The entry for this key, derived from the closest one if needed
+                        config_entry = config_index.derive(volume_id, layer_id, extra_id)
+                        reference.keep(config_entry)
+                        config_entry["value"]["geometric"]["variances"] = variances
+                    elif len(layers) > 0:
+                        logging.info(f"Splitting into layers {layers}")
+                        for lid in layers:
+                            layer_entry = config_index.derive(volume_id, int(lid), extra_id)
+                            reference.keep(layer_entry)
+                            layer_entry["value"]["geometric"]["variances"] = variances
+
+        # Report the changes
+        report = diff.diff(reference.entries, digi_cfg["entries"])
+        if args.dry_run:
+            print("*** dry run: the configuration is not written")
+            for line in report.lines():
+                print(line)
+        else:
+            logging.info(f"Changes: {report.summary()}")
 
         # Update the json
-        if args.digi_config_out is not None:
-            with open(args.digi_config_out, "w") as outfile:
-                json.dump(digi_cfg, outfile, indent=4)
+        if args.digi_config_out is not None and not args.dry_run:
+            with recorder.phase("json-write"), open(args.digi_config_out, "w") as outfile:
+                config.dump(digi_cfg, outfile, None if args.compact else 4)
 
 
-# Main function
-if "__main__" == __name__:
-    # Parse the command line arguments
+# Command line options
+def argument_parser() -> argparse.ArgumentParser:
+    """The command line options, also used by the benchmark"""
+
     p = argparse.ArgumentParser(description="Hit parameterisation")
     p.add_argument(
         "--root",
-        default="measurements.root",
+        default=["measurements.root"],
+        nargs="+",
         type=str,
-        help="Root input file from the root measurement writer in ACTS.",
+        help="Root input file(s) from the root measurement writer in ACTS.",
     )
     p.add_argument(
         "--tree", default="measurements", type=str, help="Tree name in the root file."
@@ -494,6 +623,22 @@ if "__main__" == __name__:
     p.add_argument(
         "--batch-size", default=100000, type=int, help="Batch size for the iteration."
     )
+    p.add_argument(
+        "--entry-start", type=int, help="First entry to be processed per input file."
+    )
+    p.add_argument(
+        "--entry-stop", type=int, help="Entry to stop before per input file."
+    )
+    p.add_argument(
+        "--state-in",
+        type=str,
+        help="Saved histogram state (npz) to resume from, new inputs are added.",
+    )
+    p.add_argument(
+        "--state-out",
+        type=str,
+        help="Histogram state (npz) to be saved for a later resumed run.",
+    )
     p.add_argument(
         "--digi-config-in", type=str, help="Digitization configuration file location."
     )
@@ -503,6 +648,20 @@ if "__main__" == __name__:
         help="(Patched) Digitization configuration file location.",
     )
 
+    p.add_argument(
+        "--compact",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Write compact instead of pretty printed JSON.",
+    )
+
+    p.add_argument(
+        "--dry-run",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Report the changes to the digitization configuration without writing it.",
+    )
+
     p.add_argument(
         "--volumes-with-layersplit",
         default=[],
@@ -539,6 +698,57 @@ if "__main__" == __name__:
         help="Number of bins for the histograms.",
     )
 
+    p.add_argument(
+        "--plots",
+        default="all",
+        type=str,
+        choices=["none", "summary", "all"],
+        help="Plots to be drawn, summary: cluster size inclusive and 2D overview.",
+    )
+
+    p.add_argument(
+        "--plot-dir",
+        default="png",
+        type=str,
+        help="Output directory for the plots, created if needed.",
+    )
+
+    p.add_argument(
+        "--plot-format",
+        default="png",
+        type=str,
+        choices=gallery.FORMATS,
+        help="Single png files, or one multi-page pdf or html gallery.",
+    )
+
+    p.add_argument(
+        "--plot-workers",
+        default=1,
+        type=int,
+        help="Number of processes for the plot rendering.",
+    )
+
+    p.add_argument(
+        "--width-estimator",
+        default="rms",
+        type=str,
+        choices=list(estimators.ESTIMATORS.keys()),
+        help="Estimator for the width that is written as variance.",
+    )
+
+    p.add_argument(
+        "--truncation-fraction",
+        default=0.95,
+        type=float,
+        help="Central fraction of entries kept by the truncated rms estimator.",
+    )
+
+    p.add_argument(
+        "--table-out",
+        type=str,
+        help="Binary (.npy) table with count, mean, width and quantiles per histogram.",
+    )
+
     p.add_argument(
         "--residuals",
         default=True,
@@ -553,12 +763,117 @@ if "__main__" == __name__:
         help="Plot the pulls",
     )
 
-    args = p.parse_args()
+    p.add_argument(
+        "--overview",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Fill the loc0 vs loc1 overview histograms",
+    )
+
+    p.add_argument(
+        "--trace-out",
+        type=str,
+        help="File for the time and memory trace per phase and batch.",
+    )
+
+    p.add_argument(
+        "--trace-format",
+        default="json",
+        type=str,
+        choices=instrument.FORMATS,
+        help="Plain JSON records or Chrome trace events (chrome://tracing, Perfetto).",
+    )
+
+    p.add_argument(
+        "--progress",
+        default="auto",
+        type=str,
+        choices=progress.MODES,
+        help="Progress of the filling and the plotting: bar on a terminal (auto, bar), log lines (log) or nothing (none).",
+    )
+
+    p.add_argument(
+        "--channel-maps",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Fill the channel maps, this reads the jagged channel branches",
+    )
+
+    return p
+
+
+# Main function
+if "__main__" == __name__:
+    # Parse the command line arguments
+    args = argument_parser().parse_args()
 
     # Logging configuration
     logging.basicConfig(encoding="utf-8", level=logging.INFO)
 
-    # Open the root file
-    measurements = uproot.open(args.root + ":" + args.tree)
+    # Time and memory per phase
+    recorder = instrument.Recorder()
+
+    # Resume from a saved state or start from scratch
+    if args.state_in is not None:
+        with recorder.phase("state-read"):
+            fill_state = state.load(args.state_in)
+        if fill_state.config != state_config(args):
+            raise ValueError(
+                f"State {args.state_in} was booked with {fill_state.config}, "
+                f"not with {state_config(args)}"
+            )
+        logging.info(
+            f"Resuming from {args.state_in} with {len(fill_state.inputs)} inputs "
+            f"and {fill_state.n_batches} batches"
+        )
+    else:
+        fill_state = state.State(state_config(args))
+
+    # The inputs that were not processed yet
+    inputs = []
+    for root_file in args.root:
+        input_range = {
+            "file": os.path.abspath(root_file),
+            "tree": args.tree,
+            "entry_start": args.entry_start,
+            "entry_stop": args.entry_stop,
+        }
+        if fill_state.processed(input_range):
+            logging.warning(f"Skipping {root_file}, the entries are already filled")
+            continue
+        # Open the root file
+        inputs.append((input_range, uproot.open(root_file + ":" + args.tree)))
+
+    # Fill them, the expected entries give the remaining time
+    total = sum(
+        progress.entry_range(measurements.num_entries, args.entry_start, args.entry_stop)
+        for _, measurements in inputs
+    )
+    with progress.Progress(total, "Filling", args.progress) as fill_progress:
+        for input_range, measurements in inputs:
+            fill_histograms(
+                args,
+                measurements,
+                fill_state,
+                recorder,
+                args.entry_start,
+                args.entry_stop,
+                fill_progress,
+            )
+            fill_state.inputs.append(input_range)
+
+    if args.state_out is not None:
+        logging.info(f"Saving the histogram state to {args.state_out}")
+        with recorder.phase("state-write"):
+            state.save(args.state_out, fill_state)
+
+    if fill_state.n_batches == 0:
+        raise ValueError("No measurements have been filled")
+
+    run_parametrisation(args, fill_state, recorder)
 
-    run_parametrisation(args, measurements)
+    # Report the time and memory per phase
+    recorder.log_summary()
+    if args.trace_out is not None:
+        logging.info(f"Writing the {args.trace_format} trace to {args.trace_out}")
+        recorder.write(args.trace_out, args.trace_format)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from material import reader
+from material import scan
+from material import tracks
+from plotting import profile
+from plotting import style
+
+
+def plot_map(args, eta, phi, values: np.ndarray, label: str, name: str) -> None:
+    """The material budget of the scan grid in eta and phi"""
+
+    fig, ax = plt.subplots(figsize=args.figsize)
+    mesh = ax.pcolormesh(
+        eta.reshape(args.eta_bins, args.phi_bins),
+        phi.reshape(args.eta_bins, args.phi_bins),
+        values.reshape(args.eta_bins, args.phi_bins),
+        shading="nearest",
+        cmap="viridis",
+    )
+    fig.colorbar(mesh, ax=ax, label=label)
+    ax.set_xlabel("$\\eta$")
+    ax.set_ylabel("$\\phi$")
+    fig.savefig(f"{args.output}_{name}_map.{args.plot_format}")
+    plt.close(fig)
+
+
+def plot_profiles(args, frames: list) -> None:
+    """The material budget versus eta, of the scan and the reference tracks"""
+
+    for y in ["x0", "l0"]:
+        fig, axs = plt.subplots(
+            2 if len(frames) > 1 else 1,
+            1,
+            figsize=args.figsize,
+            sharex=True,
+            squeeze=False,
+            gridspec_kw={"height_ratios": [2, 1] if len(frames) > 1 else [1]},
+        )
+        profile.overlay(
+            ax=axs[0][0],
+            dframes=frames,
+            xval="eta",
+            yval=y,
+            bins=args.profile_bins,
+            brange=args.eta_range,
+            dstyles={0: style.Style(color="blue"), 1: style.Style(color="red", marker="*")},
+            rax=axs[1][0] if len(frames) > 1 else None,
+        )
+        axs[0][0].set_ylabel(f"Material [{y.upper()}]")
+        axs[0][0].legend(loc="best")
+        axs[0][0].grid(axis="x", linestyle="dotted")
+        fig.savefig(f"{args.output}_{y}_vs_eta.{args.plot_format}")
+        plt.close(fig)
+
+
+# Main function
+if "__main__" == __name__:
+    # Parse the command line arguments
+    p = argparse.ArgumentParser(description="Material budget scan of a json material map")
+    p.add_argument("-i", "--input", type=str, required=True, help="Material map (json)")
+    p.add_argument(
+        "-g",
+        "--geometry",
+        type=str,
+        default="",
+        help="Surfaces of the geometry build (json), for maps without bounds and transforms",
+    )
+    p.add_argument(
+        "--volumes", nargs="+", type=int, default=None, help="Restrict to these volumes"
+    )
+    p.add_argument(
+        "--eta-range", nargs=2, type=float, default=(-4.0, 4.0), help="Eta range"
+    )
+    p.add_argument("--eta-bins", type=int, default=400, help="Number of lines in eta")
+    p.add_argument("--phi-bins", type=int, default=360, help="Number of lines in phi")
+    p.add_argument(
+        "--batch-size", type=int, default=10000, help="Number of lines intersected at once"
+    )
+    p.add_argument(
+        "-r",
+        "--reference",
+        type=str,
+        default="",
+        help="Material track file to compare with, e.g. from the material validation",
+    )
+    p.add_argument(
+        "-t", "--tree", type=str, default="material-tracks", help="Tree of the reference"
+    )
+    p.add_argument(
+        "-l", "--labels", nargs=2, type=str, default=["Scan", "Validation"], help="Labels"
+    )
+    p.add_argument("--profile-bins", type=int, default=80, help="Number of bins of the profiles")
+    p.add_argument(
+        "--figsize", nargs=2, type=float, default=(8, 6), help="Figure size"
+    )
+    p.add_argument(
+        "--plot-format", default="png", type=str, help="Format of the plots."
+    )
+    p.add_argument(
+        "-o", "--output", type=str, default="material_budget", help="Output file (core) name"
+    )
+
+    args = p.parse_args()
+
+    # Logging configuration
+    logging.basicConfig(encoding="utf-8", level=logging.INFO)
+
+    # The surfaces and their material grids
+    start = time.perf_counter()
+    geometry = scan.load_geometry(args.geometry) if args.geometry != "" else None
+    model, skipped = scan.build(reader.MaterialMap(args.input), geometry, args.volumes)
+    logging.info(
+        f"{len(model['cylinder']['offset'])} cylinders and {len(model['disc']['offset'])} discs, "
+        f"{skipped} surfaces skipped, in {time.perf_counter() - start:.1f} s"
+    )
+
+    # The scan along the lines through the grid
+    start = time.perf_counter()
+    eta, phi = scan.grid(args.eta_range, args.eta_bins, args.phi_bins)
+    budget = scan.scan(model, eta, phi, args.batch_size)
+    logging.info(f"{len(eta)} lines scanned in {time.perf_counter() - start:.1f} s")
+
+    scanned = pd.DataFrame(
+        {"eta": eta, "phi": phi, "x0": budget["t_x0"], "l0": budget["t_l0"], "crossed": budget["crossed"]}
+    )
+    scanned.to_csv(args.output + ".csv", index=False)
+    plot_map(args, eta, phi, budget["t_x0"], "Material [X0]", "x0")
+    plot_map(args, eta, phi, budget["t_l0"], "Material [L0]", "l0")
+
+    # The comparison with the material tracks, e.g. of the full validation
+    scanned.name = args.labels[0]
+    frames = [scanned]
+    if args.reference != "":
+        reference = tracks.integrate(args.reference, args.tree)
+        reference = reference[
+            (reference["eta"] >= args.eta_range[0]) & (reference["eta"] < args.eta_range[1])
+        ].copy()
+        reference.name = args.labels[1]
+        frames.append(reference)
+        logging.info(f"{len(reference)} reference tracks")
+    plot_profiles(args, frames)
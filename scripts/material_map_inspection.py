@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import time
+
+from material import reader
+from material import surfaces
+
+
+def inspect_map(args, material_map) -> None:
+    """The per volume summary of a map, the per surface summary as csv"""
+
+    summary = reader.summary(material_map, args.volumes)
+    per_volume = (
+        summary.assign(surfaces=1, bins=summary["bins0"] * summary["bins1"])
+        .groupby("volume")
+        .agg(
+            surfaces=("surfaces", "sum"),
+            bins=("bins", "sum"),
+            filled=("filled", "sum"),
+            t_x0_mean=("t_x0_mean", "mean"),
+            t_x0_max=("t_x0_max", "max"),
+            t_l0_max=("t_l0_max", "max"),
+        )
+        .reset_index()
+    )
+    print(surfaces.table(per_volume, list(per_volume.columns)))
+    summary.to_csv(args.output + "_summary.csv", index=False)
+
+
+def diff_maps(args, reference, target) -> None:
+    """The surfaces that differ between two maps, the largest differences first"""
+
+    differences = reader.diff(reference, target, args.tolerance, args.volumes)
+    counts = differences["status"].value_counts()
+    logging.info(", ".join(f"{count} {status}" for status, count in counts.items()))
+    differing = surfaces.rank(differences[differences["status"] != "unchanged"], "dt_x0")
+    if len(differing) > 0:
+        print(surfaces.table(differing.head(args.top), list(differing.columns)))
+    differences.to_csv(args.output + "_diff.csv", index=False)
+
+
+# Main function
+if "__main__" == __name__:
+    # Parse the command line arguments
+    p = argparse.ArgumentParser(description="Inspection and comparison of material maps without ACTS")
+    p.add_argument(
+        "-i",
+        "--input",
+        nargs="+",
+        type=str,
+        required=True,
+        help="Material map (json or root), an optional second one is compared to the first",
+    )
+    p.add_argument(
+        "--volumes", nargs="+", type=int, default=None, help="Restrict to these volumes"
+    )
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.0,
+        help="Relative tolerance of the thickness in X0 and L0 per bin",
+    )
+    p.add_argument("--top", type=int, default=20, help="Number of differing surfaces shown")
+    p.add_argument(
+        "-o", "--output", type=str, default="material_map", help="Output file (core) name"
+    )
+
+    args = p.parse_args()
+    if len(args.input) > 2:
+        p.error(f"at most two inputs can be compared, {len(args.input)} were given")
+
+    # Logging configuration
+    logging.basicConfig(encoding="utf-8", level=logging.INFO)
+
+    start = time.perf_counter()
+    material_maps = []
+    for input_file in args.input:
+        material_maps.append(reader.MaterialMap(input_file))
+        logging.info(
+            f"{input_file}: {len(material_maps[-1].keys())} surfaces "
+            f"in {len(material_maps[-1].volumes())} volumes"
+        )
+
+    if len(material_maps) == 1:
+        inspect_map(args, material_maps[0])
+    else:
+        diff_maps(args, material_maps[0], material_maps[1])
+    logging.info(f"Done in {time.perf_counter() - start:.1f} s")
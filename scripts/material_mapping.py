@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 import argparse
+import os
+import subprocess
+import sys
 
 import acts
 from acts import (
@@ -29,11 +32,16 @@ from acts.examples import (
 from acts.examples.odd import getOpenDataDetector, getOpenDataDetectorDirectory
 
 
-def runMaterialMapping(surfaces, inputFile, outputFile, outputMap, loglevel):
+def runMaterialMapping(surfaces, inputFiles, outputFile, outputMap, loglevel, eventRange=None):
     # Create a sequencer
     print("Creating the sequencer with 1 thread (inter event information needed)")
 
-    s = Sequencer(numThreads=1)
+    # Optionally only a range of events is mapped
+    sequencerOptions = {"numThreads": 1}
+    if eventRange is not None:
+        sequencerOptions["skip"] = eventRange[0]
+        sequencerOptions["events"] = eventRange[1] - eventRange[0]
+    s = Sequencer(**sequencerOptions)
 
     # IO for material tracks reading
     wb = WhiteBoard(acts.logging.INFO)
@@ -43,7 +51,7 @@ def runMaterialMapping(surfaces, inputFile, outputFile, outputMap, loglevel):
         RootMaterialTrackReader(
             level=acts.logging.INFO,
             outputMaterialTracks="material-tracks",
-            fileList=[inputFile],
+            fileList=inputFiles,
             readCachedSurfaceInformation=False,
         )
     )
@@ -123,14 +131,81 @@ def runMaterialMapping(surfaces, inputFile, outputFile, outputMap, loglevel):
     return s
 
 
+def runParallelMaterialMapping(args, loglevel):
+    """Map event ranges in separate processes and merge the json maps
+
+    Every job runs this script on its range of events and writes its own
+    map and mapped/unmapped tracks. The binned surface material of the jobs
+    is combined per bin with the number of mapped tracks of each job in the
+    bin as weight.
+    """
+    import numpy as np
+    import uproot
+    from common import jsonio
+    from material import maps
+    from material import surfaces
+
+    # The events of the input
+    eventIds = np.concatenate(
+        [
+            uproot.open(inputFile + ":material-tracks")["event_id"].array(library="np")
+            for inputFile in args.input
+        ]
+    )
+    events = np.unique(eventIds)
+    bounds = np.linspace(0, len(events), args.jobs + 1).astype(int)
+
+    jobs = []
+    for ij, (first, last) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if last <= first:
+            continue
+        jobMap = f"{args.map}_job{ij}"
+        jobOutput = f"{args.output}_job{ij}"
+        command = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:]
+        command += ["--jobs", "1", "--event-range", str(first), str(last)]
+        command += ["-m", jobMap, "-o", jobOutput]
+        print(f">>> Mapping events [{first}, {last}) in job {ij}")
+        jobs.append((subprocess.Popen(command), jobMap, jobOutput))
+
+    for process, jobMap, _ in jobs:
+        if process.wait() != 0:
+            raise RuntimeError(f"Mapping job for {jobMap} failed")
+
+    # Merge the maps of the jobs, weighted by their tracks per bin
+    print(">>> Merging the material maps of", len(jobs), "jobs")
+    jobMaps = [maps.load(jobMap + ".json") for _, jobMap, _ in jobs]
+    counts = [
+        surfaces.bin_counts(jobOutput + "_mapped.root", jobMap)
+        for (_, _, jobOutput), jobMap in zip(jobs, jobMaps)
+    ]
+    merged = maps.merge(jobMaps, counts)
+    with open(args.map + ".json", "w") as mapFile:
+        mapFile.write(jsonio.dumps(merged, indent=4))
+
+    # The ROOT map is written from the merged map through the tracking geometry
+    if args.experimental:
+        print(">>> The ROOT map is only written for the tracking geometry, use the json map")
+        return
+    detector = getOpenDataDetector(acts.IMaterialDecorator.fromFile(args.map + ".json"))
+    RootMaterialWriter(level=loglevel, filePath=args.map + ".root").write(
+        detector.trackingGeometry()
+    )
+
+
 if "__main__" == __name__:
-    p = argparse.ArgumentParser()
+    # A list of input files can be given as -i @file_list.txt, one file per line
+    p = argparse.ArgumentParser(fromfile_prefix_chars="@")
 
     p.add_argument(
         "-n", "--events", type=int, default=1000, help="Number of events to process"
     )
     p.add_argument(
-        "-i", "--input", type=str, default="", help="Input file with material tracks"
+        "-i",
+        "--input",
+        type=str,
+        nargs="+",
+        default=[],
+        help="Input file(s) with material tracks, or @file_list.txt",
     )
     p.add_argument(
         "-o", "--output", type=str, default="", help="Output file (core) name"
@@ -201,10 +276,30 @@ if "__main__" == __name__:
         help="Queries for published GeoModel nodes",
     )
 
+    p.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of parallel mapping jobs on ranges of events, the maps are merged",
+    )
+
+    p.add_argument(
+        "--event-range",
+        nargs=2,
+        type=int,
+        help="Range of events [first, last) to be mapped, used by the parallel jobs",
+    )
+
     args = p.parse_args()
     gContext = GeometryContext()
     logLevel = logging.INFO
 
+    # The parallel mode runs this script per range of events
+    if args.jobs > 1:
+        runParallelMaterialMapping(args, logLevel)
+        sys.exit(0)
+
     if args.experimental:
         if len(args.geomodel_input) > 0:
             from acts import geomodel as gm
@@ -306,5 +401,5 @@ if "__main__" == __name__:
         materialSurfaces = trackingGeometry.extractMaterialSurfaces()
 
     runMaterialMapping(
-        materialSurfaces, args.input, args.output, args.map, logLevel
+        materialSurfaces, args.input, args.output, args.map, logLevel, args.event_range
     ).run()
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 
 import os
+import subprocess
+import sys
 import warnings
 import argparse
 
+import numpy as np
+
 import acts
 from acts.examples import (
     GaussianVertexGenerator,
@@ -34,13 +38,15 @@ def runMaterialRecording(
     tracksPerEvent=10000,
     s=None,
     etaRange=(-4, 4),
+    seed=228,
+    outputFile="geant4_material_tracks.root",
 ):
     global _material_recording_executed
     if _material_recording_executed:
         warnings.warn("Material recording already ran in this process. Expect crashes")
     _material_recording_executed = True
 
-    rnd = RandomNumbers(seed=228)
+    rnd = RandomNumbers(seed=seed)
 
     evGen = EventGenerator(
         level=acts.logging.INFO,
@@ -85,7 +91,7 @@ def runMaterialRecording(
             prePostStep=True,
             recalculateTotals=True,
             inputMaterialTracks="material-tracks",
-            filePath=os.path.join(outputDir, "geant4_material_tracks.root"),
+            filePath=os.path.join(outputDir, outputFile),
             level=acts.logging.INFO,
         )
     )
@@ -93,6 +99,43 @@ def runMaterialRecording(
     return s
 
 
+def shardSeed(seed, shard):
+    """A distinct seed per shard, derived from the seed"""
+    return int(np.random.SeedSequence([seed, shard]).generate_state(1)[0])
+
+
+def runShardedRecording(args):
+    """Record ranges of events in parallel processes, one output file per shard
+
+    Geant4 can only be run once per process, so every shard runs this
+    script on its own range of events. The event numbers of the shards do
+    not overlap, the file list can be given to material_mapping.py as
+    '-i @geant4_material_tracks.txt'.
+    """
+    bounds = np.linspace(0, args.events, args.shards + 1).astype(int)
+    shards = []
+    for shard, (first, last) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if last <= first:
+            continue
+        seed = shardSeed(args.seed, shard) if args.derive_seeds else args.seed
+        outputFile = f"geant4_material_tracks_{shard}.root"
+        command = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:]
+        command += ["--shards", "1", "--event-range", str(first), str(last)]
+        command += ["--seed", str(seed), "--output-file", outputFile]
+        print(f">>> Recording events [{first}, {last}) with seed {seed} in shard {shard}")
+        shards.append((subprocess.Popen(command), outputFile))
+
+    for process, outputFile in shards:
+        if process.wait() != 0:
+            raise RuntimeError(f"Recording of {outputFile} failed")
+
+    # The list of the recorded files, one per line
+    with open("geant4_material_tracks.txt", "w") as fileList:
+        for _, outputFile in shards:
+            fileList.write(os.path.join(os.getcwd(), outputFile) + "\n")
+    print(">>> Recorded", len(shards), "shards, file list in geant4_material_tracks.txt")
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument(
@@ -104,9 +147,41 @@ def main():
     p.add_argument(
         "-i", "--input", type=str, default="", help="input (GDML/SQL) file (optional)"
     )
+    p.add_argument(
+        "-s", "--seed", type=int, default=228, help="Random number seed"
+    )
+    p.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Number of parallel processes recording ranges of events",
+    )
+    p.add_argument(
+        "--derive-seeds",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Derive a distinct seed per shard, otherwise the shards reproduce a single run",
+    )
+    p.add_argument(
+        "--event-range",
+        nargs=2,
+        type=int,
+        help="Range of events [first, last) to be recorded, used by the shards",
+    )
+    p.add_argument(
+        "--output-file",
+        type=str,
+        default="geant4_material_tracks.root",
+        help="Output file with the material tracks",
+    )
 
     args = p.parse_args()
 
+    # The sharded recording runs this script per range of events
+    if args.shards > 1:
+        runShardedRecording(args)
+        return
+
     detector = None
     if args.input == "":
         detector = getOpenDataDetector()
@@ -117,11 +192,19 @@ def main():
         geoModelCfg.path = args.input
         detector = acts.geomodel.GeoModelDetector(geoModelCfg)
 
+    # The events, a range of them for a shard
+    sequencerOptions = {"events": args.events, "numThreads": 1}
+    if args.event_range is not None:
+        sequencerOptions["skip"] = args.event_range[0]
+        sequencerOptions["events"] = args.event_range[1] - args.event_range[0]
+
     runMaterialRecording(
         detector=detector,
         tracksPerEvent=args.tracks,
         outputDir=os.getcwd(),
-        s=acts.examples.Sequencer(events=args.events, numThreads=1),
+        s=acts.examples.Sequencer(**sequencerOptions),
+        seed=args.seed,
+        outputFile=args.output_file,
     ).run()
 
 
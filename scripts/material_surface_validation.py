@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from material import surfaces
+
+# The columns of the ranked table
+COLUMNS = ["volume", "layer", "approach", "sensitive", "hits", "x0_per_hit"]
+
+
+def plot_overlay(args, frame, value: str, label: str) -> None:
+    """The surfaces at their mean assignment position in z-r, colored by the value
+
+    The top ranked surfaces are marked with their volume and layer.
+    """
+
+    fig, ax = plt.subplots(figsize=args.figsize)
+    shown = frame[np.isfinite(frame[value])]
+    points = ax.scatter(
+        shown["z"], shown["r"], c=shown[value], s=args.marker_size, cmap="viridis"
+    )
+    fig.colorbar(points, ax=ax, label=label)
+    top = surfaces.rank(shown, value, args.top)
+    ax.scatter(top["z"], top["r"], s=3 * args.marker_size, facecolors="none", edgecolors="red")
+    for row in top.itertuples(index=False):
+        ax.annotate(
+            f"{row.volume}/{row.layer}", (row.z, row.r), fontsize="x-small", color="red"
+        )
+    ax.set_xlabel("z [mm]")
+    ax.set_ylabel("r [mm]")
+    ax.grid(linestyle="dotted")
+    fig.savefig(f"{args.output}_{value}.svg")
+    plt.close(fig)
+
+
+# Main function
+if "__main__" == __name__:
+    # Parse the command line arguments
+    p = argparse.ArgumentParser(description="Surface by surface validation of mapped material")
+    p.add_argument(
+        "-i",
+        "--input",
+        nargs="+",
+        type=str,
+        required=True,
+        help="Mapped material track file (with surface information), optionally a second one to compare",
+    )
+    p.add_argument(
+        "-t", "--tree", type=str, default="material-tracks", help="Input tree"
+    )
+    p.add_argument(
+        "--step-size", type=str, default="100 MB", help="Chunk size of the streaming"
+    )
+    p.add_argument(
+        "--rank-by",
+        type=str,
+        default=None,
+        help="Ranking column, default: distance_max, or x0_deviation for two inputs",
+    )
+    p.add_argument("--top", type=int, default=20, help="Number of surfaces in the table")
+    p.add_argument("--marker-size", type=float, default=4.0, help="Marker size of the overlay")
+    p.add_argument(
+        "--figsize", nargs=2, type=float, default=(12, 6), help="Figure size"
+    )
+    p.add_argument(
+        "-o", "--output", type=str, default="material_surfaces", help="Output file (core) name"
+    )
+
+    args = p.parse_args()
+    if len(args.input) > 2:
+        p.error(f"at most two inputs can be compared, {len(args.input)} were given")
+
+    # Logging configuration
+    logging.basicConfig(encoding="utf-8", level=logging.INFO)
+
+    # The accumulated material per surface
+    frames = []
+    for input_file in args.input:
+        logging.info(f"Accumulating the mapped material per surface of {input_file}")
+        frames.append(surfaces.accumulate(input_file, args.tree, args.step_size))
+        logging.info(f"-> {len(frames[-1])} surfaces, {frames[-1]['hits'].sum()} steps")
+
+    if len(frames) == 1:
+        frame = frames[0]
+        rank_by = args.rank_by or "distance_max"
+        columns = COLUMNS + ["distance_mean", "distance_max"]
+        plot_overlay(args, frame, "distance_max", "maximum assignment distance [mm]")
+        plot_overlay(args, frame, "x0_per_hit", "material per step [X0]")
+    else:
+        frame = surfaces.compare(frames[0], frames[1])
+        rank_by = args.rank_by or "x0_deviation"
+        columns = COLUMNS[:4] + [
+            "hits_reference",
+            "hits_target",
+            "x0_per_hit_reference",
+            "x0_per_hit_target",
+            "x0_ratio",
+        ]
+        frame["z"] = frame["z_reference"].fillna(frame["z_target"])
+        frame["r"] = frame["r_reference"].fillna(frame["r_target"])
+        plot_overlay(args, frame, "x0_deviation", "|ratio - 1| of the material per step")
+
+    ranked = surfaces.rank(frame, rank_by)
+    if rank_by not in columns:
+        columns.append(rank_by)
+    print(surfaces.table(ranked.head(args.top), columns))
+    ranked.to_csv(args.output + ".csv", index=False)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import math
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from material import tracks
+from plotting import profile
+from plotting import style
+
+
+def plot_profiles(args, frames: list, dstyles: dict) -> None:
+    """The material of the files in profiles versus eta and phi, with ratio"""
+
+    ranges = {"eta": args.eta_range, "phi": (-math.pi, math.pi)}
+    for x in ["eta", "phi"]:
+        for y in ["x0", "l0"]:
+            fig, axs = plt.subplots(
+                2, 1, figsize=args.figsize, sharex=True, gridspec_kw={"height_ratios": [2, 1]}
+            )
+            fig.subplots_adjust(hspace=0.05)
+            # the profiles need all entries within the range
+            in_range = []
+            for frame in frames:
+                selected = frame[(frame[x] >= ranges[x][0]) & (frame[x] < ranges[x][1])].copy()
+                selected.name = frame.name
+                in_range.append(selected)
+            profile.overlay(
+                ax=axs[0],
+                dframes=in_range,
+                xval=x,
+                yval=y,
+                bins=args.bins,
+                brange=ranges[x],
+                dstyles=dstyles,
+                rax=axs[1],
+            )
+            axs[0].set_ylabel(f"Material [{y.upper()}]")
+            axs[0].legend(loc="best")
+            axs[0].grid(axis="x", linestyle="dotted")
+            axs[1].grid(axis="x", linestyle="dotted")
+            fig.savefig(f"{args.output}_{y}_vs_{x}.{args.plot_format}")
+            plt.close(fig)
+
+
+def plot_differences(args, matched) -> None:
+    """The per track material difference of the matched tracks versus eta"""
+
+    matched.name = f"{args.labels[1]} - {args.labels[0]}"
+    for y in ["dx0", "dl0"]:
+        fig, ax = plt.subplots(figsize=args.figsize)
+        profile.plot(
+            axs=[ax],
+            dframe=matched,
+            xval="eta",
+            bins=args.bins,
+            brange=args.eta_range,
+            yvals=[y],
+            pstyle=style.Style(color="black"),
+            legend=True,
+        )
+        ax.axhline(0.0, color="gray", linewidth=0.5)
+        fig.savefig(f"{args.output}_{y}_vs_eta.{args.plot_format}")
+        plt.close(fig)
+
+
+# Main function
+if "__main__" == __name__:
+    # Parse the command line arguments
+    p = argparse.ArgumentParser(description="Comparison of two material track files")
+    p.add_argument(
+        "-i",
+        "--input",
+        nargs=2,
+        type=str,
+        required=True,
+        help="Reference (e.g. Geant4 recording) and validated material track files",
+    )
+    p.add_argument(
+        "-t", "--tree", type=str, default="material-tracks", help="Input tree"
+    )
+    p.add_argument(
+        "-l", "--labels", nargs=2, type=str, default=["Geant4", "ACTS"], help="Labels"
+    )
+    p.add_argument(
+        "--step-size", type=str, default="100 MB", help="Chunk size of the streaming"
+    )
+    p.add_argument("--bins", type=int, default=80, help="Number of bins of the profiles")
+    p.add_argument(
+        "--eta-range", nargs=2, type=float, default=(-4.0, 4.0), help="Eta range"
+    )
+    p.add_argument(
+        "--match-tolerance",
+        type=float,
+        default=1e-4,
+        help="Direction tolerance for the track by track matching",
+    )
+    p.add_argument(
+        "--figsize", nargs=2, type=float, default=(8, 8), help="Figure size"
+    )
+    p.add_argument(
+        "--plot-format", default="png", type=str, help="Format of the plots."
+    )
+    p.add_argument(
+        "-o", "--output", type=str, default="material_tracks", help="Output file (core) name"
+    )
+
+    args = p.parse_args()
+
+    # Logging configuration
+    logging.basicConfig(encoding="utf-8", level=logging.INFO)
+
+    # The integrated material per track
+    frames = []
+    for input_file, label in zip(args.input, args.labels):
+        logging.info(f"Integrating the material of {input_file}")
+        frame = tracks.integrate(input_file, args.tree, args.step_size)
+        frame.name = label
+        frames.append(frame)
+        logging.info(f"-> {len(frame)} tracks")
+
+    plot_profiles(
+        args, frames, {0: style.Style(color="blue"), 1: style.Style(color="red", marker="*")}
+    )
+
+    # Track by track, if the tracks have the same directions
+    matched = tracks.match(frames[0], frames[1], args.match_tolerance)
+    logging.info(f"{len(matched)} tracks matched track by track")
+    if len(matched) > 0:
+        plot_differences(args, matched)
+        matched.to_csv(f"{args.output}_matched.csv", index=False)
@@ -0,0 +1,65 @@
+import acts
+import argparse
+import propagation_validation as propagation
+
+# This script runs several geometry modes in one sequence: the geometry is
+# built once per generation and the particle gun sample is generated once,
+# all propagators run on the same start parameters, the outputs are written
+# per mode. Geant4 can only be run once per process, so only the modes of
+# the benchmark are supported.
+
+def main():
+    p = argparse.ArgumentParser(description="Propagation comparison of several geometry modes")
+
+    propagation.add_arguments(p)
+
+    p.add_argument(
+        "--geo-modes",
+        type=str,
+        nargs="+",
+        default=["gen1", "gen2", "detray_gen2"],
+        choices=propagation.BENCHMARK_MODES,
+        help="Geometry modes to be run on the same input",
+    )
+
+    args = p.parse_args()
+
+    prfx = args.output + "_" if args.output != "" else ""
+
+    gContext = acts.GeometryContext()
+    logLevel = acts.logging.INFO
+
+    # Material decoration for reconstruction geometry
+    materialDecorator = None
+    if args.map != "":
+        print(">>> Loading a material decorator from file:", args.map)
+        materialDecorator = acts.IMaterialDecorator.fromFile(args.map)
+
+    # The geometry, once per generation
+    geometries = propagation.build_geometries(args, args.geo_modes, gContext, logLevel, materialDecorator)
+
+    # Common: the sequence, the particle gun and the start parameters
+    rnd = acts.examples.RandomNumbers(seed=args.seed)
+    s = acts.examples.Sequencer(events=args.events, numThreads=args.threads)
+    propagation.add_particle_gun(s, args, rnd)
+    propagation.add_start_parameters(s)
+
+    # Timing measurement is run if neither output in on
+    sterileRun = False
+    if not args.output_summary and not args.output_steps and not args.output_material:
+        print(">> Timing measurement is enabled, no output is written")
+        sterileRun = True
+
+    # One propagation per mode, with its own collections and output files
+    for geoMode in args.geo_modes:
+        actsGeometry, detectorStore = geometries[propagation.generation(geoMode)]
+        propagation.add_propagation(
+            s, args, geoMode, actsGeometry, detectorStore, gContext, logLevel, rnd, sterileRun, geoMode + "_"
+        )
+        propagation.add_writers(s, args, geoMode, prfx, geoMode + "_")
+
+    # Run the sequence
+    s.run()
+
+if "__main__" == __name__:
+    main()
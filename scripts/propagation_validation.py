@@ -1,5 +1,9 @@
 import acts
 import argparse
+import json
+import os
+import tempfile
+import time
 import geometry_gen1
 import geometry_gen2
 import particle_generation
@@ -9,11 +13,24 @@ from acts.examples.simulation import (
     ParticleConfig,
     MomentumConfig,
 )
+from monitoring import timing
 
 u = acts.UnitConstants
 
-def main():
-    p = argparse.ArgumentParser()
+# The geometry modes are
+# gen1: Gen1 detector with Gen1 navigator and propagator
+# gen2: Gen2 detector with Gen2 navigator and propagator
+# detray_gen2: Gen2 detector with detray navigator and propagator
+# geant4_gen1: Geant4 navigator and propagator with gen1 surface matching
+# geant4_gen2: Geant4 navigator and propagator with gen2 surface matching
+GEO_MODES = ["gen1", "gen2", "detray_gen2", "geant4_gen1", "geant4_gen2"]
+
+# The modes of the benchmark: Geant4 can only be run once per process, but
+# the benchmark runs one sequence per number of threads
+BENCHMARK_MODES = ["gen1", "gen2", "detray_gen2"]
+
+""" This adds the propagation related arguments to the parser"""
+def add_arguments(p : argparse.ArgumentParser):
 
     p.add_argument("-n", "--events", type=int, default=1000, help="Number of Events")
 
@@ -37,20 +54,6 @@ def main():
     # Add Particle generation related arguments
     particle_generation.add_arguments(p)
 
-    # The geometry modes are
-    # gen1: Gen1 detector with Gen1 navigator and propagator
-    # gen2: Gen2 detector with Gen2 navigator and propagator
-    # detray_gen2: Gen2 detector with detray navigator and propagator
-    # geant4_gen1: Geant4 navigator and propagator with gen1 surface matching
-    # geant4_gen2: Geant4 navigator and propagator with gen2 surface matching
-    p.add_argument(
-        "--geo-mode",
-        type=str,
-        default="gen2",
-        choices=["gen1", "gen2", "detray_gen2", "geant4_gen1", "geant4_gen2"],
-        help="Convert to detray detector and run detray navigation and propagation",
-    )
-
     p.add_argument("--detray-surface-grids",
         default=True,
         action=argparse.BooleanOptionalAction,
@@ -81,20 +84,87 @@ def main():
         help="Write out sim hits, only makes sense for Geant4",
     )
 
-    args = p.parse_args()
+""" Add the arguments of the single geometry mode and its benchmark"""
+def add_mode_arguments(p : argparse.ArgumentParser):
 
-    prfx = args.output + "_" if args.output != "" else ""
+    p.add_argument(
+        "--geo-mode",
+        type=str,
+        default="gen2",
+        choices=GEO_MODES,
+        help="Convert to detray detector and run detray navigation and propagation",
+    )
 
-    gContext = acts.GeometryContext()
-    logLevel = acts.logging.INFO
+    p.add_argument(
+        "--benchmark",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Time the propagation per geometry mode and number of threads, no output is written",
+    )
 
-    # Common (to all modes): Evoke the sequence
-    rnd = acts.examples.RandomNumbers(seed=args.seed)
+    p.add_argument(
+        "--benchmark-modes",
+        type=str,
+        nargs="+",
+        choices=BENCHMARK_MODES,
+        help="Geometry modes to be timed, default is the --geo-mode",
+    )
 
-    # Commom: Build the sequencer
-    s = acts.examples.Sequencer(events=args.events, numThreads=args.threads)
+    p.add_argument(
+        "--benchmark-threads",
+        type=int,
+        nargs="+",
+        help="Numbers of threads to be timed, default is the --threads",
+    )
 
-    # Common: Add the particle gun from ACTS
+    p.add_argument(
+        "--benchmark-warmup",
+        type=int,
+        default=10,
+        help="Number of first completed events that are not timed",
+    )
+
+    p.add_argument(
+        "--benchmark-report",
+        type=str,
+        default="",
+        help="Report file (json) of the benchmark, default is <output>_propagation_benchmark.json",
+    )
+
+""" Build the detector for a geometry mode"""
+def build_geometry(args : argparse.Namespace,
+                   geoMode : str,
+                   gContext : acts.GeometryContext,
+                   logLevel : acts.logging.Level,
+                   materialDecorator = None):
+    actsGeometry = None
+    detectorStore = {}
+    if "gen1" in geoMode:
+        # Build the detector for Gen1
+        actsGeometry, detectorStore = geometry_gen1.build(args, gContext, logLevel, materialDecorator)
+    elif "gen2" in geoMode:
+        # Build the detector for Gen2 (also detray)
+        actsGeometry, detectorStore = geometry_gen2.build(args, gContext, logLevel, materialDecorator)
+    return actsGeometry, detectorStore
+
+""" The detector generation of a geometry mode, detray and Geant4 use the Acts detector"""
+def generation(geoMode : str):
+    return "gen1" if "gen1" in geoMode else "gen2"
+
+""" Build the detectors for several geometry modes, once per generation"""
+def build_geometries(args : argparse.Namespace,
+                     geoModes : list,
+                     gContext : acts.GeometryContext,
+                     logLevel : acts.logging.Level,
+                     materialDecorator = None):
+    geometries = {}
+    for geoMode in geoModes:
+        if generation(geoMode) not in geometries:
+            geometries[generation(geoMode)] = build_geometry(args, geoMode, gContext, logLevel, materialDecorator)
+    return geometries
+
+""" Add the particle gun from ACTS"""
+def add_particle_gun(s, args : argparse.Namespace, rnd):
     addParticleGun(
         s,
         ParticleConfig(
@@ -107,45 +177,43 @@ def main():
         rnd=rnd,
     )
 
-    # Timing measurement is run if neither output in on
-    sterileRun = False
-    if not args.output_summary and not args.output_steps and not args.output_material:
-        print(">> Timing measurement is enabled, no output is written")
-        sterileRun = True
-
-    # Material decoration for reconstruction geometry
-    materialDecorator = None
-    if args.map != "":
-        print(">>> Loading a material decorator from file:", args.map)
-        materialDecorator = acts.IMaterialDecorator.fromFile(args.map)
-
-    # Build the acts geometry
-    actsGeometry = None
-    detectorStore = {}
-    if "gen1" in args.geo_mode:
-        # Build the detector for Gen1
-        actsGeometry, detectorStore = geometry_gen1.build(args, gContext, logLevel, materialDecorator)
-    elif "gen2" in args.geo_mode:
-        # Build the detector for Gen2 (also detray)
-        actsGeometry, detectorStore = geometry_gen2.build(args, gContext, logLevel, materialDecorator)
-
-
+""" Add the start parameters of the propagation, extracted from the generated particles"""
+def add_start_parameters(s):
+    trkParamExtractor = acts.examples.ParticleTrackParamExtractor(
+        level=acts.logging.INFO,
+        inputParticles="particles_generated",
+        outputTrackParameters="start_parameters",
+    )
+    s.addAlgorithm(trkParamExtractor)
+
+""" Add the propagation (or Geant4 simulation) of a geometry mode to the sequencer"""
+def add_propagation(s,
+                    args : argparse.Namespace,
+                    geoMode : str,
+                    actsGeometry,
+                    detectorStore : dict,
+                    gContext : acts.GeometryContext,
+                    logLevel : acts.logging.Level,
+                    rnd,
+                    sterileRun : bool,
+                    prefix : str = ""):
+    # The output collections carry the prefix, several modes can run in one sequence
     # Check the mode
-    print(">>> Test mode is :", args.geo_mode)
+    print(">>> Test mode is :", geoMode)
     # check if the mode does not contain geant4
-    if not "geant4" in args.geo_mode:
+    if not "geant4" in geoMode:
         # The propagator
         propagatorImpl = None
         stepper = acts.StraightLineStepper()
 
         # Build the detector for Gen1
-        if args.geo_mode == "gen1":
+        if geoMode == "gen1":
             # Set up the navigator - Gen1
             navigator = acts.Navigator(trackingGeometry=actsGeometry)
             propagator = acts.Propagator(stepper, navigator)
             propagatorImpl = acts.examples.ConcretePropagator(propagator)
         else:
-            if args.geo_mode == "gen2":
+            if geoMode == "gen2":
                 # Set up the navigator - Gen2
                 navigatorConfig = acts.DetectorNavigator.Config()
                 navigatorConfig.detector = actsGeometry
@@ -154,28 +222,21 @@ def main():
                 # And finally the propagtor implementation
                 propagatorImpl = acts.examples.ConcretePropagator(propagator)
 
-            elif args.geo_mode == "detray_gen2":
+            elif geoMode == "detray_gen2":
                 # Translate the Gen2 detector to detray and compare that
                 detrayOptions = acts.detray.DetrayConverter.Options()
                 detrayOptions.convertSurfaceGrids = args.detray_surface_grids
                 detrayStore = acts.examples.traccc.convertDetectorHost(gContext, actsGeometry, detrayOptions)
                 propagatorImpl = acts.examples.traccc.createSlPropagatorHost(detrayStore, sterileRun)
 
-        # Run particle smearing
-        trkParamExtractor = acts.examples.ParticleTrackParamExtractor(
-            level=acts.logging.INFO,
-            inputParticles="particles_generated",
-            outputTrackParameters="start_parameters",
-        )
-        s.addAlgorithm(trkParamExtractor)
-
+        # The start parameters are added by add_start_parameters
         propagationAlgorithm = acts.examples.PropagationAlgorithm(
             propagatorImpl=propagatorImpl,
             level=acts.logging.INFO,
             sterileLogger=sterileRun,
             inputTrackParameters="start_parameters",
-            outputSummaryCollection="propagation_summary",
-            outputMaterialCollection="material_tracks"
+            outputSummaryCollection=prefix + "propagation_summary",
+            outputMaterialCollection=prefix + "material_tracks"
         )
         s.addAlgorithm(propagationAlgorithm)
     else :
@@ -216,9 +277,9 @@ def main():
             detectorConstructionFactory=detectorConstruction,
             randomNumbers=rnd,
             inputParticles="particles_input",
-            outputParticlesInitial="particales_initial",
-            outputParticlesFinal="particles_final",
-            outputSimHits="sim_hits",
+            outputParticlesInitial=prefix + "particales_initial",
+            outputParticlesFinal=prefix + "particles_final",
+            outputSimHits=prefix + "sim_hits",
             sensitiveSurfaceMapper=sensitiveMapper,
             magneticField=bfield,
             physicsList=physicsList,
@@ -234,30 +295,32 @@ def main():
         # Convert the sim hits to propagation summary objects
         simHitsToSummary = acts.examples.SimHitToSummaryConversion(
             level=logLevel,
-            inputSimHits="sim_hits",
-            inputParticles="particales_initial",
-            outputSummaryCollection="propagation_summary",
+            inputSimHits=prefix + "sim_hits",
+            inputParticles=prefix + "particales_initial",
+            outputSummaryCollection=prefix + "propagation_summary",
             surfaceByIdentifier=detectorStore["SurfaceByIdentifier"],
         )
         s.addAlgorithm(simHitsToSummary)
 
-        # Optionally: Write the sim hits
-        if args.output_sim_hits:
-            simHits = "sim_hits"
-            s.addWriter(
-                acts.examples.RootSimHitWriter(
-                    level=logLevel,
-                    inputSimHits=simHits,
-                    filePath=prfx+args.geo_mode+"_sim_hits.root"),
-            )
+""" Add the writers of the requested outputs"""
+def add_writers(s, args : argparse.Namespace, geoMode : str, prfx : str, prefix : str = ""):
+    # Optionally: Write the sim hits, only for Geant4
+    if "geant4" in geoMode and args.output_sim_hits:
+        simHits = prefix + "sim_hits"
+        s.addWriter(
+            acts.examples.RootSimHitWriter(
+                level=acts.logging.INFO,
+                inputSimHits=simHits,
+                filePath=prfx+geoMode+"_sim_hits.root"),
+        )
 
     # Common: Write the summary
     if args.output_summary:
         s.addWriter(
             acts.examples.RootPropagationSummaryWriter(
                 level=acts.logging.INFO,
-                inputSummaryCollection="propagation_summary",
-                filePath=prfx+args.geo_mode + "_propagation_summary.root",
+                inputSummaryCollection=prefix + "propagation_summary",
+                filePath=prfx+geoMode + "_propagation_summary.root",
             )
         )
 
@@ -266,8 +329,8 @@ def main():
         s.addWriter(
             acts.examples.RootPropagationStepsWriter(
                 level=acts.logging.INFO,
-                collection="propagation_summary",
-                filePath=prfx+args.geo_mode + "_propagation_steps.root",
+                collection=prefix + "propagation_summary",
+                filePath=prfx+geoMode + "_propagation_steps.root",
             )
         )
 
@@ -276,13 +339,135 @@ def main():
         s.addWriter(
             acts.examples.RootMaterialTrackWriter(
                 level=acts.logging.INFO,
-                inputMaterialTracks="material_tracks",
-                filePath=args.geo_mode + "_material_tracks.root",
+                inputMaterialTracks=prefix + "material_tracks",
+                filePath=geoMode + "_material_tracks.root",
                 storeSurface=False,
                 storeVolume=False,
             )
         )
 
+""" Stamps the time of every event, at the start or the end of the sequence"""
+class EventClock(acts.examples.IAlgorithm):
+    def __init__(self, name : str, stamps : dict):
+        acts.examples.IAlgorithm.__init__(self, name=name, level=acts.logging.INFO)
+        self.stamps = stamps
+
+    def execute(self, context):
+        self.stamps[context.eventNumber] = time.perf_counter()
+        return acts.examples.ProcessCode.SUCCESS
+
+""" Time the propagation per geometry mode and number of threads"""
+def run_benchmark(args : argparse.Namespace,
+                  gContext : acts.GeometryContext,
+                  logLevel : acts.logging.Level,
+                  materialDecorator = None):
+    geoModes = args.benchmark_modes if args.benchmark_modes is not None else [args.geo_mode]
+    threadCounts = args.benchmark_threads if args.benchmark_threads is not None else [args.threads]
+
+    # The geometry is built once per generation
+    geometries = build_geometries(args, geoModes, gContext, logLevel, materialDecorator)
+    results = []
+    for geoMode in geoModes:
+        actsGeometry, detectorStore = geometries[generation(geoMode)]
+
+        modeResults = []
+        for threads in threadCounts:
+            starts = {}
+            ends = {}
+            with tempfile.TemporaryDirectory() as timingDir:
+                s = acts.examples.Sequencer(
+                    events=args.events,
+                    numThreads=threads,
+                    outputDir=timingDir,
+                    outputTimingFile="timing.csv",
+                )
+                rnd = acts.examples.RandomNumbers(seed=args.seed)
+                add_particle_gun(s, args, rnd)
+                if not "geant4" in geoMode:
+                    add_start_parameters(s)
+                s.addAlgorithm(EventClock("EventStart", starts))
+                add_propagation(s, args, geoMode, actsGeometry, detectorStore, gContext, logLevel, rnd, True)
+                s.addAlgorithm(EventClock("EventEnd", ends))
+
+                wallStart = time.perf_counter()
+                s.run()
+                wallTime = time.perf_counter() - wallStart
+
+                timingFile = os.path.join(timingDir, "timing.csv")
+                algorithms = timing.read_sequencer_timing(timingFile) if os.path.isfile(timingFile) else {}
+
+            events = [event for event in ends if event in starts]
+            result = timing.evaluate(
+                [starts[event] for event in events],
+                [ends[event] for event in events],
+                args.benchmark_warmup,
+                args.tracks,
+            )
+            result.update(mode=geoMode, threads=threads, wall_time=wallTime, algorithms=algorithms)
+            modeResults.append(result)
+        results += timing.scaling(modeResults)
+
+    # Report
+    for result in results:
+        print(">>> {mode} with {threads} threads: {tracks_per_second:.0f} tracks/s, latency p50 {latency_p50:.4f} s, p99 {latency_p99:.4f} s, efficiency {efficiency:.2f}".format(**result))
+
+    prfx = args.output + "_" if args.output != "" else ""
+    reportFile = args.benchmark_report if args.benchmark_report != "" else prfx + "propagation_benchmark.json"
+    print(">>> Writing the benchmark report to", reportFile)
+    with open(reportFile, "w") as report:
+        json.dump({"options": vars(args), "acts_version": str(getattr(acts, "__version__", "unknown")), "results": results}, report, indent=4)
+
+def main():
+    p = argparse.ArgumentParser()
+
+    add_arguments(p)
+    add_mode_arguments(p)
+
+    args = p.parse_args()
+
+    if args.benchmark and args.benchmark_modes is None and args.geo_mode not in BENCHMARK_MODES:
+        p.error(f"--geo-mode {args.geo_mode} can not be benchmarked, choose --benchmark-modes from {BENCHMARK_MODES}")
+
+    prfx = args.output + "_" if args.output != "" else ""
+
+    gContext = acts.GeometryContext()
+    logLevel = acts.logging.INFO
+
+    # Material decoration for reconstruction geometry
+    materialDecorator = None
+    if args.map != "":
+        print(">>> Loading a material decorator from file:", args.map)
+        materialDecorator = acts.IMaterialDecorator.fromFile(args.map)
+
+    # The benchmark mode runs its own sequences
+    if args.benchmark:
+        run_benchmark(args, gContext, logLevel, materialDecorator)
+        return
+
+    # Common (to all modes): Evoke the sequence
+    rnd = acts.examples.RandomNumbers(seed=args.seed)
+
+    # Commom: Build the sequencer
+    s = acts.examples.Sequencer(events=args.events, numThreads=args.threads)
+
+    # Common: Add the particle gun from ACTS
+    add_particle_gun(s, args, rnd)
+    if not "geant4" in args.geo_mode:
+        add_start_parameters(s)
+
+    # Timing measurement is run if neither output in on
+    sterileRun = False
+    if not args.output_summary and not args.output_steps and not args.output_material:
+        print(">> Timing measurement is enabled, no output is written")
+        sterileRun = True
+
+    # Build the acts geometry
+    actsGeometry, detectorStore = build_geometry(args, args.geo_mode, gContext, logLevel, materialDecorator)
+
+    # The propagation and the outputs
+    add_propagation(s, args, args.geo_mode, actsGeometry, detectorStore, gContext, logLevel, rnd, sterileRun)
+    add_writers(s, args, args.geo_mode, prfx)
+
     # Run the sequence
     s.run()
 
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from monitoring import timing
+from plotting import scaling
+from plotting import style
+
+
+def absolute_paths(options: list) -> list:
+    """The workload options with the paths resolved against the current directory
+
+    The runs are started in their own directories, so values that name an
+    existing file or a file in an existing directory are made absolute, also
+    in the --option=value form.
+    """
+
+    def resolve(value):
+        is_path = os.path.exists(value) or (
+            os.sep in value and os.path.isdir(os.path.dirname(value))
+        )
+        return os.path.abspath(value) if is_path else value
+
+    resolved = []
+    for option in options:
+        if option.startswith("-") and "=" in option:
+            name, value = option.split("=", 1)
+            resolved.append(f"{name}={resolve(value)}")
+        else:
+            resolved.append(option if option.startswith("-") else resolve(option))
+    return resolved
+
+
+def run_workload(args, threads: int) -> dict:
+    """Run the workload with a number of threads, best event loop time of the repetitions
+
+    Every run has its own directory, the sequencer writes its timing file
+    into the working directory. The rate is taken from the wall time of the
+    event loop in the log, the per algorithm times from the timing file.
+    """
+
+    run_dir = os.path.join(args.work_dir, f"threads_{threads}")
+    os.makedirs(run_dir, exist_ok=True)
+    command = (
+        [sys.executable, os.path.abspath(args.workload)]
+        + absolute_paths(shlex.split(args.workload_args))
+        + [args.threads_option, str(threads)]
+    )
+    best = None
+    for _ in range(args.repeat):
+        logging.info(f"Running {' '.join(command)} in {run_dir}")
+        start = time.perf_counter()
+        log_file = os.path.join(run_dir, "log.txt")
+        with open(log_file, "w") as log:
+            subprocess.run(command, cwd=run_dir, stdout=log, stderr=subprocess.STDOUT, check=True)
+        wall_time = time.perf_counter() - start
+        event_loop = timing.read_event_loop(log_file)
+        if event_loop is None or event_loop["time"] <= 0.0:
+            logging.warning(f"No event loop summary in {log_file}, the process wall time is used")
+            event_loop = {"events": 1, "time": wall_time}
+        if best is None or event_loop["time"] < best["loop_time"]:
+            timing_files = glob.glob(os.path.join(run_dir, "timing.*"))
+            best = {
+                "threads": threads,
+                "wall_time": wall_time,
+                "loop_time": event_loop["time"],
+                "events": event_loop["events"],
+                "rate": event_loop["events"] / event_loop["time"],
+                "algorithms": timing.read_sequencer_timing(timing_files[0])
+                if len(timing_files) > 0
+                else {},
+            }
+    logging.info(f"-> {threads} threads: event loop {best['loop_time']:.2f} s")
+    return best
+
+
+def plot_results(args, results: list) -> None:
+    """The speedup curve and the per algorithm breakdown"""
+
+    threads = [result["threads"] for result in results]
+    name = os.path.splitext(os.path.basename(args.workload))[0]
+
+    fig, ax = plt.subplots(figsize=args.figsize)
+    scaling.speedup(
+        ax, threads, [result["speedup"] for result in results], style.Style(color="blue"), name
+    )
+    ax.grid(linestyle="dotted")
+    ax.legend(loc="best")
+    fig.savefig(f"{args.output}_speedup.{args.plot_format}")
+    plt.close(fig)
+
+    fig, ax = plt.subplots(figsize=args.figsize)
+    scaling.breakdown(
+        ax,
+        threads,
+        [
+            {identifier: value["per_event"] for identifier, value in result["algorithms"].items()}
+            for result in results
+        ],
+        args.max_algorithms,
+    )
+    ax.legend(loc="best", fontsize="small")
+    fig.savefig(f"{args.output}_algorithms.{args.plot_format}")
+    plt.close(fig)
+
+
+# Main function
+if "__main__" == __name__:
+    # Parse the command line arguments
+    p = argparse.ArgumentParser(description="Thread scaling sweep of a validation workload")
+    p.add_argument(
+        "--workload",
+        type=str,
+        required=True,
+        help="Validation script to be run, e.g. scripts/propagation_validation.py",
+    )
+    p.add_argument(
+        "--workload-args",
+        type=str,
+        default="",
+        help="Options passed to the workload, e.g. '-n 1000 -t 100 --geo-mode gen1'.",
+    )
+    p.add_argument(
+        "--threads",
+        default=[1, 2, 4, 8],
+        nargs="+",
+        type=int,
+        help="Numbers of threads of the sweep.",
+    )
+    p.add_argument(
+        "--threads-option",
+        default="--threads",
+        type=str,
+        help="Option of the workload that sets the number of threads.",
+    )
+    p.add_argument(
+        "--repeat", default=1, type=int, help="Repetitions, the best time is taken."
+    )
+    p.add_argument(
+        "--work-dir",
+        default="thread_sweep",
+        type=str,
+        help="Directory for the runs, one sub directory per number of threads.",
+    )
+    p.add_argument(
+        "--max-algorithms",
+        default=8,
+        type=int,
+        help="Number of algorithms shown in the breakdown, the others are summed.",
+    )
+    p.add_argument(
+        "--figsize", nargs=2, type=float, default=(8, 6), help="Figure size"
+    )
+    p.add_argument(
+        "--plot-format", default="png", type=str, help="Format of the plots."
+    )
+    p.add_argument(
+        "-o", "--output", default="thread_sweep", type=str, help="Output file (core) name"
+    )
+
+    args = p.parse_args()
+
+    # Logging configuration
+    logging.basicConfig(encoding="utf-8", level=logging.INFO)
+
+    results = timing.scaling(
+        [run_workload(args, threads) for threads in sorted(args.threads)], key="rate"
+    )
+    for result in results:
+        logging.info(
+            f"{result['threads']} threads: event loop {result['loop_time']:.2f} s, "
+            f"speedup {result['speedup']:.2f}, efficiency {result['efficiency']:.2f}"
+        )
+
+    plot_results(args, results)
+    with open(args.output + ".json", "w") as outfile:
+        json.dump({"options": vars(args), "results": results}, outfile, indent=4)
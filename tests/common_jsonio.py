@@ -0,0 +1,81 @@
+""" Unit test for the JSON input/output of configurations"""
+#!/usr/bin/env python3
+import io
+import json
+import unittest
+from unittest import mock
+
+from common import jsonio
+
+header = {"acts-geometry-hierarchy-map": {"format-version": 0,
+                                          "value-identifier": "digitization-configuration"}}
+entries = [{"volume": v, "layer": l, "value": {"bins": [0.5 * b for b in range(20)]}}
+           for v in range(3) for l in range(4)]
+document = dict(header, entries=entries)
+
+class TestJsonIO(unittest.TestCase):
+    """ Test the JSON input/output with a TestCase class """
+
+    # Test the written output
+    def test_write(self):
+        """ This tests the compact and pretty output """
+
+        for indent in [None, 2, 4]:
+            stream = io.StringIO()
+            jsonio.write(stream, header, iter(entries), indent)
+            self.assertEqual(json.loads(stream.getvalue()), document)
+            if indent is not None:
+                self.assertEqual(stream.getvalue(), json.dumps(document, indent=indent))
+
+    # Test the incremental reading with different chunk sizes
+    def test_iterate(self):
+        """ This tests the incremental parsing """
+
+        for text in [json.dumps(document), json.dumps(document, indent=4)]:
+            for chunk_size in [1, 7, 1 << 20]:
+                items = list(jsonio.iterate(io.StringIO(text), chunk_size))
+                self.assertEqual(items[0], ("acts-geometry-hierarchy-map",
+                                            header["acts-geometry-hierarchy-map"]))
+                self.assertEqual([value for key, value in items if key == "entries"], entries)
+
+    # Test the streamed patching
+    def test_patch(self):
+        """ This tests patching the entries of one volume """
+
+        def patcher(entry):
+            if entry["volume"] == 1:
+                entry["value"]["bins"] = []
+
+        stream = io.StringIO()
+        n_entries = jsonio.patch(io.StringIO(json.dumps(document)), stream, patcher)
+        self.assertEqual(n_entries, len(entries))
+        patched = json.loads(stream.getvalue())
+        self.assertEqual(len([e for e in patched["entries"] if len(e["value"]["bins"]) == 0]), 4)
+
+    # Test malformed input
+    def test_malformed(self):
+        """ This tests that truncated documents are rejected """
+
+        text = json.dumps(document)
+        with self.assertRaises(ValueError):
+            list(jsonio.iterate(io.StringIO(text[:len(text) // 2]), 16))
+
+    # Test that both backends write the same non-finite numbers
+    def test_non_finite(self):
+        """ This tests that NaN and infinity are written as null """
+
+        value = {"bins": [0.5, float("nan"), float("inf"), -float("inf")], "nested": {"mean": float("nan")}}
+        backends = [jsonio.orjson, None] if jsonio.orjson is not None else [None]
+        for backend in backends:
+            with mock.patch.object(jsonio, "orjson", backend):
+                for indent in [None, 3, 4]:
+                    text = jsonio.dumps(value, indent)
+                    self.assertEqual(json.loads(text), {"bins": [0.5, None, None, None], "nested": {"mean": None}})
+                    self.assertEqual(text, json.dumps(json.loads(text), indent=indent,
+                                                      separators=(",", ":") if indent is None else None))
+                stream = io.StringIO()
+                jsonio.write(stream, header, iter([{"volume": 1, "value": value}]), 4)
+                self.assertEqual(json.loads(stream.getvalue())["entries"][0]["value"]["bins"][1:], [None] * 3)
+
+if __name__ == '__main__':
+    unittest.main()
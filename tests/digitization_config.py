@@ -0,0 +1,120 @@
+""" Unit test for the digitization configuration access"""
+#!/usr/bin/env python3
+import io
+import json
+import unittest
+
+from digitization import config
+
+def generate_entries() :
+    """ This method generates a small set of configuration entries """
+
+    return [
+        {"volume": 8, "value": {"tag": "v8"}},
+        {"volume": 9, "value": {"tag": "v9"}},
+        {"volume": 9, "layer": 2, "value": {"tag": "v9l2"}},
+        {"volume": 9, "layer": 2, "extra": 1, "value": {"tag": "v9l2e1"}},
+    ]
+
+class TestConfigIndex(unittest.TestCase):
+    """ Test the configuration index with a TestCase class """
+
+    # Test the exact lookup
+    def test_get(self):
+        """ This tests the exact lookup """
+
+        index = config.ConfigIndex(generate_entries())
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.get(9, 2)["value"]["tag"], "v9l2")
+        self.assertEqual(index.get(9, 2, 1)["value"]["tag"], "v9l2e1")
+        # ids <= 0 stand for all layers / extra bits
+        self.assertEqual(index.get(9, -1, 0)["value"]["tag"], "v9")
+        self.assertIsNone(index.get(9, 4))
+
+    # Test the hierarchical fallback
+    def test_find(self):
+        """ This tests the hierarchical fallback """
+
+        index = config.ConfigIndex(generate_entries())
+        self.assertEqual(index.find(9, 2, 3)["value"]["tag"], "v9l2")
+        self.assertEqual(index.find(9, 4, 1)["value"]["tag"], "v9")
+        self.assertEqual(index.find(9, 2, 1)["value"]["tag"], "v9l2e1")
+        self.assertIsNone(index.find(10))
+
+    # Test that derived entries are inserted and indexed
+    def test_derive(self):
+        """ This tests deriving new entries from the fallback """
+
+        entries = generate_entries()
+        index = config.ConfigIndex(entries)
+        derived = index.derive(9, 4, 2)
+        self.assertEqual(config.entry_key(derived), (9, 4, 2))
+        self.assertEqual(derived["value"]["tag"], "v9")
+        self.assertIs(index.get(9, 4, 2), derived)
+        self.assertEqual(len(entries), 5)
+        # the fallback entry is not touched
+        derived["value"]["tag"] = "v9l4e2"
+        self.assertEqual(index.get(9)["value"]["tag"], "v9")
+        # existing entries are returned, not duplicated
+        self.assertIs(index.derive(9, 4, 2), derived)
+        self.assertEqual(len(entries), 5)
+        self.assertIsNone(index.derive(10, 1))
+
+    # Test that inserting an existing key replaces the entry
+    def test_insert(self):
+        """ This tests the replacement on insertion """
+
+        entries = generate_entries()
+        index = config.ConfigIndex(entries)
+        index.insert({"volume": 9, "layer": 2, "value": {"tag": "new"}})
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(entries[2]["value"]["tag"], "new")
+
+class TestConfigMerge(unittest.TestCase):
+    """ Test the configuration merging with a TestCase class """
+
+    # Test the glob selection
+    def test_matches(self):
+        """ This tests the glob pattern selection """
+
+        entries = generate_entries()
+        self.assertTrue(config.matches(entries[0], volumes=["8"]))
+        self.assertTrue(config.matches(entries[3], volumes=["?"], layers=["2"]))
+        self.assertFalse(config.matches(entries[1], layers=["*"]))
+        self.assertEqual(
+            len([e for e in entries if config.matches(e, volumes=["9"], extras=["1"])]), 1)
+
+    # Test the overlay of a later configuration
+    def test_merge_overlay(self):
+        """ This tests overlaying a second configuration """
+
+        overlay = {"entries": [{"volume": 9, "value": {"tag": "new9"}},
+                               {"volume": 10, "value": {"tag": "new10"}}]}
+        merged = config.merge([{"entries": generate_entries()}, overlay])
+        tags = [entry["value"]["tag"] for entry in merged["entries"]]
+        self.assertEqual(tags, ["v8", "new9", "v9l2", "v9l2e1", "new10"])
+
+    # Test the hierarchical overlay with a selector
+    def test_merge_hierarchical(self):
+        """ This tests the hierarchical merge with a selection """
+
+        overlay = {"entries": [{"volume": 9, "value": {"tag": "new9"}},
+                               {"volume": 10, "value": {"tag": "new10"}}]}
+        merged = config.merge([{"entries": generate_entries()}, overlay],
+                              selector=lambda e: config.matches(e, volumes=["9"]),
+                              hierarchical=True)
+        tags = [entry["value"]["tag"] for entry in merged["entries"]]
+        self.assertEqual(tags, ["v8", "new9"])
+
+    # Test the streamed output
+    def test_dump(self):
+        """ This tests that the streamed output equals the json output """
+
+        cfg = {"acts-geometry-hierarchy-map": {"format-version": 0},
+               "entries": generate_entries()}
+        stream = io.StringIO()
+        config.dump(cfg, stream)
+        self.assertEqual(stream.getvalue(), json.dumps(cfg, indent=4))
+
+if __name__ == '__main__':
+    unittest.main()
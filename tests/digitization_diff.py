@@ -0,0 +1,78 @@
+""" Unit test for the digitization configuration diff"""
+#!/usr/bin/env python3
+import unittest
+
+from digitization import config
+from digitization import diff
+
+def generate_entry(volume_id, layer_id=None, bins=100, rms=None) :
+    """ This method generates a configuration entry """
+
+    entry = {"volume": volume_id,
+             "value": {"geometric": {"indices": [0, 1],
+                                     "segmentation": {"binningdata": [{"bins": bins, "min": -10., "max": 10.}]},
+                                     "variances": [] if rms is None else [{"index": 0, "rms": rms}]}}}
+    if layer_id is not None:
+        entry["layer"] = layer_id
+    return entry
+
+class TestDiff(unittest.TestCase):
+    """ Test the configuration diff with a TestCase class """
+
+    # Test the comparison of values
+    def test_compare(self):
+        """ This tests the changed leaves and the tolerance """
+
+        old = generate_entry(8, rms=[1.0, 2.0])["value"]
+        new = generate_entry(8, bins=50, rms=[1.0, 2.000001])["value"]
+        changes = diff.compare(old, new)
+        self.assertEqual([change[0] for change in changes],
+                         ["geometric.segmentation.binningdata[0].bins",
+                          "geometric.variances[0].rms[1]"])
+        self.assertEqual(changes[0][1:], (100, 50))
+        self.assertEqual(len(diff.compare(old, new, tolerance=1e-3)), 1)
+        # lists of different length are reported as a whole
+        changes = diff.compare(old, generate_entry(8, rms=[1.0])["value"])
+        self.assertEqual(changes, [("geometric.variances[0].rms", [1.0, 2.0], [1.0])])
+
+    # Test the report of added, removed and changed entries
+    def test_diff(self):
+        """ This tests the matching of entries by key """
+
+        old_entries = [generate_entry(8), generate_entry(9), generate_entry(16)]
+        new_entries = [generate_entry(8), generate_entry(9, rms=[1.0]),
+                       generate_entry(9, 2), generate_entry(9, 4)]
+        report = diff.diff(old_entries, new_entries)
+        self.assertEqual(len(report), 4)
+        self.assertEqual(report.added, [(9, 2, None), (9, 4, None)])
+        self.assertEqual(report.removed, [(16, None, None)])
+        self.assertEqual(list(report.changed.keys()), [(9, None, None)])
+        self.assertEqual(report.unchanged, 1)
+        lines = report.lines()
+        self.assertEqual(lines[0], "+ volume 9, layer 2")
+        self.assertIn("- volume 16", lines)
+        self.assertIn("~ volume 9: 1 changes", lines)
+        self.assertEqual(lines[-1], report.summary())
+        # identical configurations
+        self.assertEqual(len(diff.diff(old_entries, old_entries)), 0)
+
+    # Test the snapshot of entries updated in place
+    def test_snapshot(self):
+        """ This tests that only the kept entries are copied """
+
+        entries = [generate_entry(8), generate_entry(9)]
+        snapshot = diff.Snapshot(entries)
+        index = config.ConfigIndex(entries)
+        for layer_id in [None, 2]:
+            entry = index.derive(9, layer_id)
+            snapshot.keep(entry)
+            entry["value"]["geometric"]["variances"] = [{"index": 0, "rms": [1.0]}]
+        # the unchanged entry is shared, the changed one is a copy
+        self.assertIs(snapshot.entries[0], entries[0])
+        self.assertEqual(snapshot.entries[1], generate_entry(9))
+        report = diff.diff(snapshot.entries, entries)
+        self.assertEqual(report.added, [(9, 2, None)])
+        self.assertEqual(list(report.changed.keys()), [(9, None, None)])
+
+if __name__ == '__main__':
+    unittest.main()
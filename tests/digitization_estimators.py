@@ -0,0 +1,65 @@
+""" Unit test for the robust width estimators"""
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+import hist
+
+from digitization import estimators
+
+N_TESTS = 100000
+SIGMA = 0.5
+
+def generate_histogram(outlier_fraction = 0.02, outlier_scale = 20.) :
+    """ This method fills a Gaussian histogram with flat outliers """
+
+    core = np.random.normal(0, SIGMA, N_TESTS)
+    n_outliers = int(outlier_fraction * N_TESTS)
+    outliers = np.random.uniform(-outlier_scale * SIGMA, outlier_scale * SIGMA, n_outliers)
+    thist = hist.Hist(hist.axis.Regular(200, -outlier_scale * SIGMA, outlier_scale * SIGMA))
+    thist.fill(np.concatenate([core, outliers]))
+    return thist
+
+histograms = [ generate_histogram() for _ in range(10) ]
+
+class TestEstimators(unittest.TestCase):
+    """ Test the width estimators with a TestCase class """
+
+    # Test that the plain rms is inflated by the outliers
+    def test_rms_inflated(self):
+        """ This tests the plain rms against the core width """
+
+        widths = estimators.widths(histograms, "rms")
+        self.assertTrue(np.all(widths > 1.5 * SIGMA))
+
+    # Test the robust estimators
+    def test_robust_estimators(self):
+        """ This tests the robust estimators against the core width """
+
+        for estimator, tolerance in [("truncated-rms", 0.15),
+                                     ("central68", 0.05),
+                                     ("gauss-core", 0.05)]:
+            widths = estimators.widths(histograms, estimator)
+            np.testing.assert_allclose(widths, SIGMA, rtol=tolerance)
+
+    # Test the quantiles
+    def test_quantiles(self):
+        """ This tests the interpolated quantiles on a flat histogram """
+
+        counts = np.ones((1, 10))
+        edges = np.linspace(0., 10., 11)[None, :]
+        q25, q50 = estimators.quantiles(counts, edges, [0.25, 0.5])
+        self.assertAlmostEqual(q25[0], 2.5)
+        self.assertAlmostEqual(q50[0], 5.)
+
+    # Test empty histograms
+    def test_empty(self):
+        """ This tests that empty histograms yield NaN """
+
+        empty = hist.Hist(hist.axis.Regular(200, -1, 1))
+        for estimator in estimators.ESTIMATORS:
+            widths = estimators.widths([empty, histograms[0]], estimator)
+            self.assertTrue(np.isnan(widths[0]))
+            self.assertFalse(np.isnan(widths[1]))
+
+if __name__ == '__main__':
+    unittest.main()
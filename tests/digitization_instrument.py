@@ -0,0 +1,65 @@
+""" Unit test for the phase instrumentation"""
+#!/usr/bin/env python3
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from digitization import instrument
+
+def generate_records() :
+    """ This method times a reader of three batches with a fill phase each """
+
+    recorder = instrument.Recorder()
+    executor = instrument.TimingExecutor()
+
+    def read():
+        """ The decompression is part of the reading """
+        for _ in range(3):
+            executor.submit(time.sleep, 0.001)
+            yield [0] * 100
+
+    for batch in recorder.timed("read", read()):
+        recorder.split_last("decompress", executor.take())
+        with recorder.phase("fill", len(batch), batch=recorder.batch) as record:
+            record["histograms"] = 5
+    return recorder
+
+class TestInstrument(unittest.TestCase):
+    """ Test the instrumentation with a TestCase class """
+
+    # Test the records and the summary
+    def test_summary(self):
+        """ This tests the phase summary """
+
+        recorder = generate_records()
+        summary = recorder.summary()
+        self.assertEqual(list(summary.keys()), ["read", "decompress", "fill"])
+        self.assertEqual(summary["fill"]["calls"], 3)
+        self.assertEqual(summary["fill"]["rows"], 300)
+        self.assertGreater(summary["decompress"]["time"], 0.002)
+        self.assertEqual([r["name"] for r in recorder.batch_records(2)],
+                         ["read", "decompress", "fill"])
+        self.assertEqual(recorder.batch_records(1)[-1]["histograms"], 5)
+
+    # Test the trace output
+    def test_write(self):
+        """ This tests the json and chrome trace files """
+
+        recorder = generate_records()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for fmt in instrument.FORMATS:
+                file_name = os.path.join(tmp_dir, f"trace_{fmt}.json")
+                recorder.write(file_name, fmt)
+                with open(file_name) as stream:
+                    trace = json.load(stream)
+                if fmt == "json":
+                    self.assertEqual(len(trace["phases"]), 9)
+                else:
+                    durations = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+                    self.assertEqual(len(durations), 9)
+                    self.assertTrue(all(e["dur"] >= 0 for e in durations))
+
+if __name__ == '__main__':
+    unittest.main()
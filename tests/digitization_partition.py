@@ -0,0 +1,52 @@
+""" Unit test for the row partitioning by geometry key"""
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+
+from digitization import partition
+
+N_TESTS = 10000
+volume_ids = np.random.choice([8, 9, 16], N_TESTS)
+layer_ids = np.random.choice([-1, 2, 4, 6], N_TESTS)
+extra_ids = np.random.choice([-1, 0, 1], N_TESTS)
+values = np.random.normal(0, 1, N_TESTS)
+
+class TestPartition(unittest.TestCase):
+    """ Test the partitioning with a TestCase class """
+
+    # Test packing and unpacking of the keys
+    def test_pack_unpack(self):
+        """ This tests the round trip of the packed keys """
+
+        keys = partition.pack(volume_ids, layer_ids, extra_ids)
+        self.assertEqual(partition.unpack(keys),
+                         list(zip(volume_ids.tolist(), layer_ids.tolist(), extra_ids.tolist())))
+        # the order of the keys follows volume, layer, extra
+        self.assertLess(partition.pack(8, 6, 1), partition.pack(9, -1, -1))
+
+    # Test the slices against boolean masks
+    def test_rows(self):
+        """ This tests the selection of rows by key """
+
+        rows_partition = partition.Partition(partition.pack(volume_ids, layer_ids, extra_ids))
+        sorted_values = rows_partition.sort(values)
+        self.assertEqual(len(rows_partition), len(set(zip(volume_ids, layer_ids, extra_ids))))
+        for volume_id, layer_id, extra_id in partition.unpack(rows_partition.keys):
+            mask = (volume_ids == volume_id) & (layer_ids == layer_id) & (extra_ids == extra_id)
+            rows = rows_partition.rows(partition.pack(volume_id, layer_id, extra_id))
+            # the stable sort keeps the original order within a key
+            np.testing.assert_array_equal(sorted_values[rows], values[mask])
+            self.assertIsNotNone(sorted_values[rows].base)
+        self.assertEqual(len(sorted_values[rows_partition.rows(partition.pack(1, 1, 1))]), 0)
+
+    # Test the reduction per key
+    def test_reduce(self):
+        """ This tests the maximum per key """
+
+        rows_partition = partition.Partition(partition.pack(volume_ids, -1, -1))
+        maxima = rows_partition.reduce(np.fmax, rows_partition.sort(values))
+        for ik, (volume_id, _, _) in enumerate(partition.unpack(rows_partition.keys)):
+            self.assertEqual(maxima[ik], values[volume_ids == volume_id].max())
+
+if __name__ == '__main__':
+    unittest.main()
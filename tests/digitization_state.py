@@ -0,0 +1,72 @@
+""" Unit test for the saved histogram state"""
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import numpy as np
+import hist
+
+from digitization import state
+from digitization import store
+
+def generate_state() :
+    """ This method fills a small state with 1D, cluster size and 2D histograms """
+
+    fill_state = state.State({"bins": 50, "pulls": False})
+    h1 = hist.Hist(hist.axis.Regular(50, -1., 1., name="loc0"))
+    h1.fill(np.random.normal(0, 0.5, 1000))
+    h2 = hist.Hist(hist.axis.Regular(50, -10., 10., name="loc0"),
+                   hist.axis.Regular(20, -5., 5., name="loc1"))
+    h2.fill(np.random.uniform(-12, 12, 1000), np.random.uniform(-6, 6, 1000))
+    h3 = store.book(20, -1., 1., "loc1")
+    store.fill(h3, np.random.choice([1, 3], 1000), np.random.normal(0, 0.5, 1000))
+    fill_state.book({"residual_loc0_vol9": [h1, np.float32(0.25)], "residual_loc1_vol9": h3},
+                    {"loc0_vs_loc1_vol9": [h2, 0.0]})
+    fill_state.add_ids([(9, 2, -1)], [(9, -1, -1)])
+    fill_state.n_batches = 3
+    fill_state.inputs.append({"file": "measurements.root", "entry_start": None})
+    return fill_state
+
+class TestState(unittest.TestCase):
+    """ Test the histogram state with a TestCase class """
+
+    # Test that booking keeps existing histograms
+    def test_book(self):
+        """ This tests booking of known and new histograms """
+
+        fill_state = generate_state()
+        known = fill_state.histograms["residual_loc0_vol9"]
+        n_booked = fill_state.book({"residual_loc0_vol9": [hist.Hist(hist.axis.Regular(5, 0, 1)), 0.],
+                                    "residual_time_vol9": [hist.Hist(hist.axis.Regular(5, 0, 1)), 0.]},
+                                   {})
+        self.assertEqual(n_booked, 1)
+        self.assertIs(fill_state.histograms["residual_loc0_vol9"], known)
+        fill_state.add_ids([(9, 2, -1), (9, 4, -1)], [])
+        self.assertEqual(fill_state.unique_ids, [(9, 2, -1), (9, 4, -1)])
+
+    # Test the round trip through the file
+    def test_save_load(self):
+        """ This tests writing and reading the state """
+
+        fill_state = generate_state()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "state.npz")
+            state.save(file_name, fill_state)
+            loaded = state.load(file_name)
+        self.assertEqual(loaded.config, fill_state.config)
+        self.assertEqual(loaded.unique_ids, fill_state.unique_ids)
+        self.assertEqual(loaded.n_batches, 3)
+        self.assertTrue(loaded.processed({"file": "measurements.root", "entry_start": None}))
+        for name, (restored, moment) in dict(loaded.histograms,
+                                             **loaded.histograms_overview).items():
+            original = dict(fill_state.histograms, **fill_state.histograms_overview)[name]
+            self.assertEqual(restored, original[0])
+            np.testing.assert_array_equal(moment, original[1])
+        # the accumulated moment keeps its precision
+        self.assertEqual(loaded.histograms["residual_loc0_vol9"][1].dtype, np.float32)
+        # the cluster size axis keeps growing
+        store.fill(loaded.histograms["residual_loc1_vol9"], np.array([2]), np.array([0.1]))
+        self.assertEqual(store.cluster_sizes(loaded.histograms["residual_loc1_vol9"]), [1, 2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
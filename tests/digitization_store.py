@@ -0,0 +1,51 @@
+""" Unit test for the cluster size histogram store"""
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+
+from digitization import store
+
+N_TESTS = 10000
+values = np.random.normal(0, 0.5, N_TESTS)
+sizes = np.random.choice([1, 2, 4], N_TESTS)
+
+class TestStore(unittest.TestCase):
+    """ Test the histogram store with a TestCase class """
+
+    # Test the filling against single histograms per cluster size
+    def test_fill(self):
+        """ This tests the projections and the rms per cluster size """
+
+        entry = store.book(50, -2, 2, "loc0")
+        store.fill(entry, sizes[: N_TESTS // 2], values[: N_TESTS // 2])
+        store.fill(entry, sizes[N_TESTS // 2 :], values[N_TESTS // 2 :])
+        self.assertEqual(store.cluster_sizes(entry), [1, 2, 4])
+        hist_all, rms_all = store.project(entry, 0)
+        self.assertEqual(hist_all.sum(flow=True), N_TESTS)
+        for size in [1, 2, 4]:
+            hist_size, rms_size = store.project(entry, size)
+            self.assertEqual(hist_size.sum(flow=True), np.sum(sizes == size))
+            # the rms of the two batches is summed
+            expected = sum(np.sqrt(np.mean(np.square(batch[cs == size])))
+                           for batch, cs in [(values[: N_TESTS // 2], sizes[: N_TESTS // 2]),
+                                             (values[N_TESTS // 2 :], sizes[N_TESTS // 2 :])])
+            self.assertAlmostEqual(rms_size, expected)
+        self.assertAlmostEqual(rms_all, 2 * 0.5, delta=0.05)
+
+    # Test the expansion with missing cluster sizes
+    def test_expand(self):
+        """ This tests the padding and the limit of the cluster sizes """
+
+        entry = store.book(50, -2, 2, "loc0")
+        store.fill(entry, sizes, values)
+        expanded = store.expand(entry)
+        self.assertEqual(list(expanded.keys()), [0, 1, 2, 3, 4])
+        self.assertEqual(expanded[3][0].sum(flow=True), 0)
+        self.assertEqual(expanded[3][1], 0.)
+        self.assertEqual(list(store.expand(entry, 2).keys()), [0, 1, 2])
+        # NaN values are dropped
+        store.fill(entry, np.array([1, 1]), np.array([np.nan, 0.1]))
+        self.assertEqual(store.project(entry, 1)[0].sum(flow=True), np.sum(sizes == 1) + 1)
+
+if __name__ == '__main__':
+    unittest.main()
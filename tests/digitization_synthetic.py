@@ -0,0 +1,42 @@
+""" Unit test for the synthetic measurement generation"""
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+
+from digitization import synthetic
+
+N_TESTS = 100000
+
+class TestSynthetic(unittest.TestCase):
+    """ Test the synthetic measurements with a TestCase class """
+
+    # Test the schema and the geometry ids
+    def test_schema(self):
+        """ This tests that all branches are generated """
+
+        detector = synthetic.Detector(volumes=[7, 8], layers=2, extras=3)
+        columns = synthetic.generate(np.random.default_rng(1), detector, 1000)
+        self.assertEqual(set(columns.keys()), set(synthetic.SCHEMA.keys()))
+        self.assertEqual(set(np.unique(columns["volume_id"])), {7, 8})
+        self.assertEqual(set(np.unique(columns["layer_id"])), {2, 4})
+        self.assertEqual(set(np.unique(columns["extra_id"])), {1, 2, 3})
+        # one channel per pixel of the cluster
+        offsets, content = columns["channel_loc0"]
+        self.assertEqual(len(content), np.sum(columns["clus_size"]))
+        np.testing.assert_array_equal(np.diff(offsets), columns["clus_size"])
+
+    # Test the residual shapes
+    def test_residuals(self):
+        """ This tests the resolution and the cluster size dependence """
+
+        for shape in ["gauss", "box"]:
+            detector = synthetic.Detector(shape=shape, resolution=(0.01, 0.03, 0.5))
+            columns = synthetic.generate(np.random.default_rng(2), detector, N_TESTS)
+            for cluster_size in [1, 2]:
+                selected = columns["clus_size_loc0"] == cluster_size
+                self.assertAlmostEqual(np.std(columns["residual_loc0"][selected]),
+                                       0.01 / np.sqrt(cluster_size), delta=0.0005)
+            self.assertAlmostEqual(np.std(columns["pull_time"]), 1., delta=0.02)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+""" Unit test for the binary parameterisation table"""
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import numpy as np
+import hist
+
+from digitization import table
+
+SIGMA = 0.5
+
+def generate_histogram(mean = 0.) :
+    """ This method fills a Gaussian histogram """
+
+    thist = hist.Hist(hist.axis.Regular(100, -5 * SIGMA, 5 * SIGMA))
+    thist.fill(np.random.normal(mean, SIGMA, 10000))
+    return thist
+
+records = [("residual_loc0", 9, 2, -1, 1), ("residual_loc0", 8, -1, -1, 0),
+           ("residual_loc1", 9, 2, -1, 0), ("residual_loc0", 9, 2, -1, 0)]
+histograms = [generate_histogram(0.1 * ir) for ir in range(len(records))]
+widths = [SIGMA] * len(records)
+
+class TestTable(unittest.TestCase):
+    """ Test the parameterisation table with a TestCase class """
+
+    # Test the statistics and ordering
+    def test_build(self):
+        """ This tests the rows of the table """
+
+        ptable = table.build(records, histograms, widths)
+        self.assertEqual(len(ptable), len(records))
+        self.assertEqual(ptable[0]["volume"], 8)
+        self.assertTrue(np.all(np.diff(ptable["key"]) >= 0))
+        row = table.query(ptable, 9, 2, variable="residual_loc0", cluster_size=1)[0]
+        self.assertEqual(row["count"], histograms[0].sum())
+        self.assertAlmostEqual(row["mean"], 0., delta=0.05)
+        self.assertAlmostEqual(row["quantiles"][2], 0., delta=0.05)
+
+    # Test the memory-mapped round trip
+    def test_save_load(self):
+        """ This tests writing and memory-mapped reading """
+
+        ptable = table.build(records, histograms, widths)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "table.npy")
+            table.save(file_name, ptable)
+            loaded = table.load(file_name)
+            self.assertIsInstance(loaded, np.memmap)
+            np.testing.assert_array_equal(loaded, ptable)
+            self.assertEqual(len(table.query(loaded, 9, 2)), 3)
+            self.assertEqual(len(table.query(loaded, 16)), 0)
+            del loaded
+
+if __name__ == '__main__':
+    unittest.main()
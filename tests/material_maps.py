@@ -0,0 +1,132 @@
+""" Unit test for the material map combination"""
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import awkward as ak
+import numpy as np
+import uproot
+
+from material import maps
+from material import surfaces
+
+# volume 16, layer 2
+SURFACE = (16 << 56) | (2 << 36)
+
+def generate_map(slabs) :
+    """ This method generates a map with one binned surface of two bins """
+
+    data = [[{"material": list(parameters) if parameters is not None else [],
+              "thickness": thickness} for thickness, parameters in slabs]]
+    return {"Surfaces": {"entries": [{"volume": 16, "layer": 2,
+                                      "value": {"material": {"type": "binned", "data": data}}}]}}
+
+def map_tracks(tracks, file_name) :
+    """ This method maps tracks on a cylinder binned in 4 phi and 2 z bins
+
+    Every track is a list of (phi, z, thickness, (x0, l0, ar, z, rho)) steps,
+    the steps of a track in a bin are added and the tracks are averaged per
+    bin. The mapped tracks are written to the file.
+    """
+
+    sums = np.zeros((6, 2, 4))
+    tracks_per_bin = np.zeros((2, 4))
+    for track in tracks:
+        track_sums = np.zeros((6, 2, 4))
+        for phi, z, thickness, (x0, l0, ar, z_number, rho) in track:
+            i0 = int(np.floor((phi + np.pi) / (2 * np.pi) * 4)) % 4
+            i1 = min(max(int(np.floor((z + 100.) / 200. * 2)), 0), 1)
+            amount = thickness * rho
+            track_sums[:, i1, i0] += [thickness, thickness / x0, thickness / l0,
+                                      amount, amount * ar, amount * z_number]
+        tracks_per_bin += track_sums[0] > 0.
+        sums += track_sums
+    means = sums / np.maximum(tracks_per_bin, 1.)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        arrays = {"thickness": means[0], "x0": means[0] / means[1], "l0": means[0] / means[2],
+                  "ar": means[4] / means[3], "z": means[5] / means[3], "rho": means[3] / means[0]}
+    arrays = {name: np.nan_to_num(values) for name, values in arrays.items()}
+    material_map = generate_map([(0., None)] * 4)
+    material = material_map["Surfaces"]["entries"][0]["value"]["material"]
+    material["binUtility"] = {"binningdata": [
+        {"value": "binPhi", "type": "equidistant", "option": "closed", "min": -np.pi, "max": np.pi, "bins": 4},
+        {"value": "binZ", "type": "equidistant", "option": "open", "min": -100., "max": 100., "bins": 2}]}
+    material["data"] = maps.to_data(arrays, [material["data"][0], material["data"][0]])
+
+    with uproot.recreate(file_name) as root_file:
+        root_file["material-tracks"] = {
+            "sur_id": ak.values_astype(ak.Array([[SURFACE] * len(track) for track in tracks]), np.uint64),
+            "sur_x": ak.Array([[50. * np.cos(step[0]) for step in track] for track in tracks]),
+            "sur_y": ak.Array([[50. * np.sin(step[0]) for step in track] for track in tracks]),
+            "sur_z": ak.Array([[step[1] for step in track] for track in tracks]),
+        }
+    return material_map
+
+class TestMaps(unittest.TestCase):
+    """ Test the material maps with a TestCase class """
+
+    # Test the per bin combination
+    def test_combine(self):
+        """ This tests the thickness weighted averaging """
+
+        first = maps.slabs(generate_map([(1., (10., 100., 28., 14., 0.1)), (0., None)])
+                           ["Surfaces"]["entries"][0]["value"]["material"]["data"])
+        second = maps.slabs(generate_map([(1., (20., 200., 28., 14., 0.1)), (2., (10., 100., 28., 14., 0.2))])
+                            ["Surfaces"]["entries"][0]["value"]["material"]["data"])
+        combined = maps.combine([first, second], [np.array([[1., 0.]]), np.array([[1., 1.]])])
+        # the thickness in x0 is averaged
+        self.assertAlmostEqual(combined["thickness"][0, 0], 1.)
+        self.assertAlmostEqual(combined["thickness"][0, 0] / combined["x0"][0, 0], 0.075)
+        # a bin without tracks in one part is taken from the other
+        self.assertAlmostEqual(combined["thickness"][0, 1], 2.)
+        self.assertAlmostEqual(combined["rho"][0, 1], 0.2)
+        np.testing.assert_allclose(combined["ar"], [[28., 28.]])
+        # a bin with tracks and without material adds vacuum
+        combined = maps.combine([first, second], [1., 1.])
+        self.assertAlmostEqual(combined["thickness"][0, 1], 1.)
+        self.assertAlmostEqual(combined["rho"][0, 1], 0.2)
+
+    # Test the merging of maps
+    def test_merge(self):
+        """ This tests that identical maps merge to themselves """
+
+        material_map = generate_map([(1., (10., 100., 28., 14., 0.1)), (0., None)])
+        key = maps.entry_key(material_map["Surfaces"]["entries"][0])
+        counts = {key: np.array([[3, 0]])}
+        merged = maps.merge([material_map, material_map], [counts, counts])
+        self.assertEqual(merged, material_map)
+        other = generate_map([(1., (10., 100., 28., 14., 0.1))])
+        with self.assertRaises(ValueError):
+            maps.merge([material_map, other], [counts, counts])
+
+    # Test the merging of the maps of two jobs
+    def test_merge_jobs(self):
+        """ This tests that the maps of two jobs merge to the map of one job """
+
+        rng = np.random.default_rng(42)
+        materials = [(10., 100., 28., 14., 0.1), (90., 400., 56., 26., 0.2)]
+        tracks = [[(rng.uniform(-np.pi, np.pi), rng.uniform(-100., 100.), rng.uniform(0.5, 2.),
+                    materials[rng.integers(2)]) for _ in range(rng.integers(1, 4))]
+                  for _ in range(60)]
+        # a track with two steps in one bin
+        tracks[0] = [(0.1, 10., 1., materials[0]), (0.2, 20., 2., materials[1])]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            single = map_tracks(tracks, os.path.join(tmp_dir, "single.root"))
+            jobs, counts = [], []
+            # the jobs have different numbers of tracks in the bins
+            for ij, job_tracks in enumerate([tracks[:15], tracks[15:]]):
+                file_name = os.path.join(tmp_dir, f"job{ij}.root")
+                jobs.append(map_tracks(job_tracks, file_name))
+                counts.append(surfaces.bin_counts(file_name, jobs[-1], step_size=7))
+        key = maps.entry_key(single["Surfaces"]["entries"][0])
+        self.assertEqual(int(counts[0][key].sum() + counts[1][key].sum()),
+                         sum(len({(int(np.floor((phi + np.pi) / (2 * np.pi) * 4)) % 4, z > 0.)
+                                  for phi, z, _, _ in track}) for track in tracks))
+        merged = maps.merge(jobs, counts)
+        merged_arrays = maps.slabs(merged["Surfaces"]["entries"][0]["value"]["material"]["data"])
+        single_arrays = maps.slabs(single["Surfaces"]["entries"][0]["value"]["material"]["data"])
+        for name, values in single_arrays.items():
+            np.testing.assert_allclose(merged_arrays[name], values, rtol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+""" Unit test for the material map reader"""
+#!/usr/bin/env python3
+import copy
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+import uproot
+
+from material import reader
+
+# thickness and (x0, l0, ar, z, rho) of the 2 x 3 bins of a surface
+BINS = [[(1., (10., 100., 28., 14., 0.1)), (0., None), (2., (20., 100., 28., 14., 0.1))],
+        [(1., (5., 50., 28., 14., 0.1)), (1., (10., 100., 28., 14., 0.1)), (0., None)]]
+
+def generate_map() :
+    """ This method generates a json map with two surfaces in two volumes """
+
+    data = [[{"material": {"data": list(parameters) if parameters is not None else []},
+              "thickness": thickness} for thickness, parameters in row] for row in BINS]
+    return {"Surfaces": {"entries": [
+        {"volume": 16, "layer": 2, "value": {"material": {"type": "binned", "data": data}}},
+        {"volume": 17, "layer": 4, "approach": 1,
+         "value": {"material": {"type": "binned", "data": copy.deepcopy(data)}}}]}}
+
+def write_root(file_name) :
+    """ This method writes the same map in the root format, one directory per surface """
+
+    edges0, edges1 = np.arange(4.), np.arange(3.)
+    with uproot.recreate(file_name) as root_file:
+        for directory in ["SurfaceMaterial_vol16_bou0_lay2_app0_sen0",
+                          "SurfaceMaterial_vol17_bou0_lay4_app1_sen0"]:
+            for name, index in [("t", 0), ("x0", 1), ("l0", 2), ("A", 3), ("Z", 4), ("rho", 5)]:
+                # the histograms are filled as (bin0, bin1)
+                values = np.array([[thickness if index == 0 else
+                                    (parameters[index - 1] if parameters is not None else 0.)
+                                    for thickness, parameters in row] for row in BINS]).T
+                root_file[f"{directory}/{name}"] = (values, edges0, edges1)
+
+class TestReader(unittest.TestCase):
+    """ Test the material map reader with a TestCase class """
+
+    # Test that both formats are read the same way
+    def test_formats(self):
+        """ This tests the json and root reading and the summary """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_file = os.path.join(tmp_dir, "map.json")
+            with open(json_file, "w", encoding="utf-8") as outfile:
+                json.dump(generate_map(), outfile)
+            root_file = os.path.join(tmp_dir, "map.root")
+            write_root(root_file)
+            json_map = reader.MaterialMap(json_file)
+            root_map = reader.MaterialMap(root_file)
+            self.assertEqual(json_map.volumes(), [16, 17])
+            self.assertEqual(root_map.keys(), json_map.keys())
+            # only the requested volume is converted
+            self.assertEqual(list(json_map.volume(17).keys()), [(17, 0, 4, 1, 0, 0)])
+            self.assertEqual(list(json_map.converted.keys()), [(17, 0, 4, 1, 0, 0)])
+            self.assertEqual(root_map.keys([17]), [(17, 0, 4, 1, 0, 0)])
+            for name, values in json_map.surface((16, 0, 2, 0, 0, 0)).items():
+                np.testing.assert_allclose(root_map.surface((16, 0, 2, 0, 0, 0))[name], values)
+            summary = reader.summary(root_map)
+            self.assertEqual(list(summary["filled"]), [4, 4])
+            self.assertEqual(list(summary["bins0"]), [3, 3])
+            np.testing.assert_allclose(summary["t_x0_max"], [0.2, 0.2])
+            self.assertTrue((reader.diff(json_map, root_map)["status"] == "unchanged").all())
+
+    # Test the differences of two maps
+    def test_diff(self):
+        """ This tests the status of changed, added and removed surfaces """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            files = [os.path.join(tmp_dir, name) for name in ["a.json", "b.json"]]
+            changed = generate_map()
+            entries = changed["Surfaces"]["entries"]
+            entries[0]["value"]["material"]["data"][0][0]["thickness"] = 1.001
+            entries[1]["volume"] = 18
+            for file_name, material_map in zip(files, [generate_map(), changed]):
+                with open(file_name, "w", encoding="utf-8") as outfile:
+                    json.dump(material_map, outfile)
+            reference, target = reader.MaterialMap(files[0]), reader.MaterialMap(files[1])
+            differences = reader.diff(reference, target)
+            self.assertEqual(list(differences["status"]), ["changed", "removed", "added"])
+            self.assertEqual(differences["changed_bins"][0], 1)
+            self.assertAlmostEqual(differences["dt_x0"][0], 0.0001)
+            # within the tolerance and restricted to a volume
+            differences = reader.diff(reference, target, tolerance=0.01, volumes=[16])
+            self.assertEqual(list(differences["status"]), ["unchanged"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+""" Unit test for the material budget scan"""
+#!/usr/bin/env python3
+import json
+import math
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from material import reader
+from material import scan
+
+def slab(thickness) :
+    """ This method gives a slab with x0 = 10 and l0 = 100 """
+    return {"material": {"data": [10., 100., 28., 14., 0.1]}, "thickness": thickness}
+
+def generate_map() :
+    """ This method generates a cylinder with 4 x 2 bins and a disc with 2 bins """
+
+    cylinder = {"type": "CylinderSurface",
+                "bounds": {"type": "CylinderBounds", "values": [100., 500., math.pi, 0., 0., 0.]},
+                "transform": {"translation": [0., 0., 0.], "rotation": None},
+                "material": {"type": "binned",
+                             "binUtility": {"binningdata": [
+                                 {"bins": 4, "min": -math.pi, "max": math.pi, "option": "closed",
+                                  "type": "equidistant", "value": "binPhi"},
+                                 {"bins": 2, "min": -500., "max": 500., "option": "open",
+                                  "type": "equidistant", "value": "binZ"}]},
+                             "data": [[slab(0.1 * (i0 + 1) + i1) for i0 in range(4)]
+                                      for i1 in range(2)]}}
+    disc = {"type": "DiscSurface",
+            "bounds": {"type": "RadialBounds", "values": [50., 300., math.pi, 0.]},
+            "transform": {"translation": [0., 0., 600.], "rotation": None},
+            "material": {"type": "binned",
+                         "binUtility": {"binningdata": [
+                             {"bins": 2, "min": 50., "max": 300., "option": "open",
+                              "type": "equidistant", "value": "binR"}]},
+                         "data": [[slab(1.), slab(2.)]]}}
+    plane = {"type": "PlaneSurface", "material": {"type": "binned", "data": [[slab(1.)]]}}
+    return {"Surfaces": {"entries": [{"volume": 2, "layer": 2, "value": cylinder},
+                                     {"volume": 3, "layer": 2, "approach": 1, "value": disc},
+                                     {"volume": 4, "sensitive": 1, "value": plane}]}}
+
+class TestScan(unittest.TestCase):
+    """ Test the material budget scan with a TestCase class """
+
+    # Test the crossings of a cylinder and a disc
+    def test_scan(self):
+        """ This tests the bin lookup and the path correction """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "map.json")
+            with open(file_name, "w", encoding="utf-8") as outfile:
+                json.dump(generate_map(), outfile)
+            model, skipped = scan.build(reader.MaterialMap(file_name))
+        self.assertEqual(skipped, 1)
+        eta = np.array([0., math.asinh(3.), -math.asinh(3.), 5.])
+        phi = np.array([0.1, -3., 0.1, 0.1])
+        budget = scan.scan(model, eta, phi, batch_size=3)
+        # the cylinder is hit at z = 0 and 300 in the upper z bin, the disc at r = 200
+        self.assertEqual(list(budget["crossed"]), [1, 2, 1, 0])
+        np.testing.assert_allclose(budget["t_x0"], [0.13, 0.11 * math.sqrt(10.) + 0.2 * math.sqrt(10.) / 3.,
+                                                    0.03 * math.sqrt(10.), 0.])
+        np.testing.assert_allclose(budget["t_l0"], budget["t_x0"] / 10.)
+
+    # Test the scan grid
+    def test_grid(self):
+        """ This tests the bin centres """
+
+        eta, phi = scan.grid((-1., 1.), 2, 4)
+        np.testing.assert_allclose(eta, [-0.5] * 4 + [0.5] * 4)
+        np.testing.assert_allclose(phi[:4], np.array([-0.75, -0.25, 0.25, 0.75]) * math.pi)
+
+if __name__ == '__main__':
+    unittest.main()
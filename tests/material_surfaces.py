@@ -0,0 +1,83 @@
+""" Unit test for the per surface material accumulation"""
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import awkward as ak
+import numpy as np
+import uproot
+
+from material import surfaces
+
+# volume 16, layer 2, sensitive 5 and volume 17, layer 4, approach 1
+SURFACE_A = (16 << 56) | (2 << 36) | (5 << 8)
+SURFACE_B = (17 << 56) | (4 << 36) | (1 << 28)
+
+def generate_file(file_name) :
+    """ This method writes three mapped tracks """
+
+    ids = [[SURFACE_A, SURFACE_B], [SURFACE_B], [SURFACE_A, 0]]
+    with uproot.recreate(file_name) as root_file:
+        root_file["material-tracks"] = {
+            "sur_id": ak.values_astype(ak.Array(ids), np.uint64),
+            "sur_x": ak.Array([[10., 0.], [0.], [10., 0.]]),
+            "sur_y": ak.Array([[0., 20.], [20.], [0., 0.]]),
+            "sur_z": ak.Array([[1., 2.], [4.], [3., 0.]]),
+            "mat_x": ak.Array([[10., 0.], [0.], [10., 5.]]),
+            "mat_y": ak.Array([[0., 20.], [21.], [0.5, 0.]]),
+            "mat_z": ak.Array([[1., 2.], [4.], [3., 0.]]),
+            "mat_step_length": ak.Array([[1., 1.], [2.], [1., 1.]]),
+            "mat_X0": ak.Array([[10., 20.], [20.], [10., 10.]]),
+            "mat_L0": ak.Array([[100., 200.], [200.], [100., 100.]]),
+        }
+
+class TestSurfaces(unittest.TestCase):
+    """ Test the per surface accumulation with a TestCase class """
+
+    # Test the decoding of the geometry identifier
+    def test_decode(self):
+        """ This tests the bit masks """
+
+        decoded = surfaces.decode(np.array([SURFACE_A, SURFACE_B], dtype=np.uint64))
+        self.assertEqual(list(decoded["volume"]), [16, 17])
+        self.assertEqual(list(decoded["layer"]), [2, 4])
+        self.assertEqual(list(decoded["sensitive"]), [5, 0])
+        self.assertEqual(list(decoded["approach"]), [0, 1])
+        self.assertEqual(surfaces.encode((17, 0, 4, 1, 0, 0)), SURFACE_B)
+
+    # Test the accumulation in chunks and the ranking
+    def test_accumulate(self):
+        """ This tests the sums per surface """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "mapped.root")
+            generate_file(file_name)
+            frame = surfaces.accumulate(file_name, step_size=2)
+        self.assertEqual(list(frame["volume"]), [16, 17])
+        self.assertEqual(list(frame["hits"]), [2, 2])
+        np.testing.assert_allclose(frame["x0"], [0.2, 0.15])
+        np.testing.assert_allclose(frame["distance_mean"], [0.25, 0.5])
+        np.testing.assert_allclose(frame["distance_max"], [0.5, 1.])
+        np.testing.assert_allclose(frame["r"], [10., 20.])
+        ranked = surfaces.rank(frame, "distance_max", top=1)
+        self.assertEqual(list(ranked["volume"]), [17])
+        text = surfaces.table(ranked, ["volume", "layer", "distance_max"])
+        self.assertEqual(text.splitlines()[2].split(), ["17", "4", "1"])
+        compared = surfaces.compare(frame, frame)
+        np.testing.assert_allclose(compared["x0_ratio"], 1.)
+
+    # Test the accumulation of a tree without tracks
+    def test_accumulate_empty(self):
+        """ This tests that an empty tree gives an empty frame """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "mapped.root")
+            with uproot.recreate(file_name) as root_file:
+                root_file.mktree("material-tracks", {name: "var * float64" for name in surfaces.BRANCHES})
+            frame = surfaces.accumulate(file_name)
+        self.assertEqual(len(frame), 0)
+        self.assertIn("x0_per_hit", frame.columns)
+        self.assertIn("volume", frame.columns)
+
+if __name__ == '__main__':
+    unittest.main()
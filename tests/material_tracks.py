@@ -0,0 +1,57 @@
+""" Unit test for the material track integration"""
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import awkward as ak
+import numpy as np
+import uproot
+
+from material import tracks
+
+def generate_file(file_name, x0_scale=1.) :
+    """ This method writes two events with two tracks each, the second track without material """
+
+    with uproot.recreate(file_name) as root_file:
+        root_file["material-tracks"] = {
+            "event_id": np.array([0, 0, 1, 1], dtype=np.uint32),
+            "v_eta": np.array([0.1, 0.2, -1., 2.], dtype=np.float32),
+            "v_phi": np.array([0., 1., 2., 3.], dtype=np.float32),
+            "mat_step_length": ak.Array([[1., 2.], [], [0.5, 0.5, 1.], [3.]]),
+            "mat_X0": ak.Array([[10., 20.], [], [5., 5., 0.], [30.]]) * x0_scale,
+            "mat_L0": ak.Array([[100., 200.], [], [50., 50., 0.], [300.]]),
+        }
+
+class TestTracks(unittest.TestCase):
+    """ Test the material track integration with a TestCase class """
+
+    # Test the integration per track
+    def test_integrate(self):
+        """ This tests the per track sums in chunks """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "tracks.root")
+            generate_file(file_name)
+            frame = tracks.integrate(file_name, step_size=3)
+        np.testing.assert_allclose(frame["x0"], [0.2, 0., 0.2, 0.1])
+        np.testing.assert_allclose(frame["l0"], [0.02, 0., 0.02, 0.01])
+        self.assertEqual(list(frame["index"]), [0, 1, 0, 1])
+        self.assertEqual(list(frame["steps"]), [2, 0, 3, 1])
+
+    # Test the matching of two files
+    def test_match(self):
+        """ This tests the per track difference """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            generate_file(os.path.join(tmp_dir, "recorded.root"))
+            generate_file(os.path.join(tmp_dir, "validated.root"), 2.)
+            recorded = tracks.integrate(os.path.join(tmp_dir, "recorded.root"))
+            validated = tracks.integrate(os.path.join(tmp_dir, "validated.root"))
+        validated.loc[3, "eta"] = 2.5
+        matched = tracks.match(recorded, validated)
+        self.assertEqual(len(matched), 3)
+        np.testing.assert_allclose(matched["dx0"], [-0.1, 0., -0.1])
+        np.testing.assert_allclose(matched["dl0"], 0.)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+""" Unit test for the progress reporting"""
+#!/usr/bin/env python3
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from monitoring import progress
+
+def process_batch(n_rows) :
+    """ This method stands for a worker that processes a batch """
+
+    progress.add(n_rows, 8 * n_rows)
+    return n_rows
+
+class TestProgress(unittest.TestCase):
+    """ Test the progress reporting with a TestCase class """
+
+    # Test that the workers of a process pool add to the same counter
+    def test_workers(self):
+        """ This tests the aggregation over processes """
+
+        counter = progress.Counter()
+        with progress.Progress(1000, "Test", "none", counter) as test_progress:
+            with ProcessPoolExecutor(max_workers=2, initializer=progress.init_worker,
+                                     initargs=(counter,)) as pool:
+                n_rows = sum(pool.map(process_batch, [100] * 9))
+            test_progress.add(100, 800)
+        self.assertEqual(n_rows, 900)
+        self.assertEqual(counter.values(), (1000, 8000))
+
+    # Test the status line and the logging
+    def test_status(self):
+        """ This tests the rates and the remaining time """
+
+        self.assertEqual(progress.status(250, 2 << 20, 5.0, 1000),
+                         "250/1000 entries (25.0%), 2.0 MB, 50 entries/s, 0.4 MB/s, ETA 15 s")
+        self.assertEqual(progress.status(250, 0, 5.0), "250 entries, 0.0 MB, 50 entries/s, 0.0 MB/s")
+        self.assertEqual(progress.entry_range(1000, 100, None), 900)
+        self.assertEqual(progress.entry_range(1000, None, 2000), 1000)
+        with self.assertLogs(level="INFO") as logs:
+            with progress.Progress(10, "Test", "log") as test_progress:
+                test_progress.add(10)
+        self.assertIn("Test: 10/10 entries (100.0%)", logs.output[-1])
+        with self.assertRaises(ValueError):
+            progress.Progress(mode="fast")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+""" Unit test for the evaluation of timed runs"""
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+
+from monitoring import timing
+
+class TestTiming(unittest.TestCase):
+    """ Test the run timing with a TestCase class """
+
+    # Test the throughput and latencies without the warm-up events
+    def test_evaluate(self):
+        """ This tests the warm-up and the percentiles """
+
+        # a slow first event and then one event per second, 2 seconds each
+        starts = [0., 9., 10., 11., 12.]
+        ends = [10., 11., 12., 13., 14.]
+        result = timing.evaluate(starts, ends, warmup=1, tracks_per_event=100)
+        self.assertEqual(result["events"], 4)
+        self.assertAlmostEqual(result["time"], 4.)
+        self.assertAlmostEqual(result["tracks_per_second"], 100.)
+        self.assertAlmostEqual(result["latency_p50"], 2.)
+        self.assertAlmostEqual(result["latency_p99"], 2.)
+        # the warm-up is limited to the events of the run
+        self.assertEqual(timing.evaluate(starts, ends, warmup=10)["events"], 1)
+
+    # Test the speedup and efficiency
+    def test_scaling(self):
+        """ This tests the reference to the fewest threads """
+
+        results = timing.scaling([{"threads": 4, "tracks_per_second": 300.},
+                                  {"threads": 1, "tracks_per_second": 100.}])
+        self.assertAlmostEqual(results[0]["speedup"], 3.)
+        self.assertAlmostEqual(results[0]["efficiency"], 0.75)
+        self.assertAlmostEqual(results[1]["efficiency"], 1.)
+
+    # Test the reading of the sequencer timing file
+    def test_read_sequencer_timing(self):
+        """ This tests csv and tsv timing files """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for delimiter in [",", "\t"]:
+                file_name = os.path.join(tmp_dir, "timing.csv")
+                with open(file_name, "w") as timing_file:
+                    timing_file.write(delimiter.join(["identifier", "time_total_s", "time_perevent_s"]) + "\n")
+                    timing_file.write(delimiter.join(["Algorithm:PropagationAlgorithm", "2.5", "0.025"]) + "\n")
+                algorithms = timing.read_sequencer_timing(file_name)
+                self.assertEqual(algorithms["Algorithm:PropagationAlgorithm"],
+                                 {"total": 2.5, "per_event": 0.025})
+
+    # Test the reading of the event loop summary
+    def test_read_event_loop(self):
+        """ This tests the units and a log without summary """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, "log.txt")
+            with open(file_name, "w") as log_file:
+                log_file.write("12:00:00    Sequencer      INFO      Starting event loop with 4 threads\n")
+                log_file.write("12:00:02    Sequencer      INFO      Processed 100 events in 2.500000 s (wall clock)\n")
+            self.assertEqual(timing.read_event_loop(file_name), {"events": 100, "time": 2.5})
+            with open(file_name, "w") as log_file:
+                log_file.write("Processed 10 events in 250.000000 ms (wall clock)\n")
+            self.assertAlmostEqual(timing.read_event_loop(file_name)["time"], 0.25)
+            with open(file_name, "w") as log_file:
+                log_file.write("Traceback (most recent call last):\n")
+            self.assertIsNone(timing.read_event_loop(file_name))
+
+if __name__ == '__main__':
+    unittest.main()
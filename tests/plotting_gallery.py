@@ -0,0 +1,68 @@
+""" Unit test for the rendering of plot galleries"""
+#!/usr/bin/env python3
+import os
+import re
+import tempfile
+import unittest
+import numpy as np
+import hist
+import matplotlib.pyplot as plt
+
+from plotting import gallery
+
+def generate_jobs(n_jobs=3) :
+    """ This method generates plot jobs with filled histograms """
+
+    jobs = []
+    for ij in range(n_jobs):
+        h = hist.Hist(hist.axis.Regular(20, -1., 1., name="loc0"))
+        h.fill(np.random.normal(0, 0.2 * (ij + 1), 1000))
+        jobs.append(gallery.PlotJob(f"residual_loc0_vol{ij}", h, title=f"Volume {ij}",
+                                    xlabel="loc0", ylabel="entries"))
+    return jobs
+
+class TestGallery(unittest.TestCase):
+    """ Test the gallery rendering with a TestCase class """
+
+    # Test the rendering into the formats, sequential and in a pool
+    def test_render(self):
+        """ This tests the written files and pages, and that no figure is left open """
+
+        jobs = generate_jobs()
+        for workers in [1, 2]:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                files = gallery.render(jobs, tmp_dir, "png", workers)
+                self.assertEqual(sorted(os.path.basename(f) for f in files),
+                                 sorted(job.name + ".png" for job in jobs))
+                self.assertTrue(all(os.path.getsize(f) > 0 for f in files))
+
+                files = gallery.render(jobs, tmp_dir, "pdf", workers, name="pages")
+                self.assertEqual(files, [os.path.join(tmp_dir, "pages.pdf")])
+                with open(files[0], "rb") as pdf:
+                    pages = re.findall(rb"/Type\s*/Page[^s]", pdf.read())
+                self.assertEqual(len(pages), len(jobs))
+
+                files = gallery.render(jobs, tmp_dir, "html", workers)
+                with open(files[0], "r", encoding="utf-8") as page:
+                    content = page.read()
+                for job in jobs:
+                    self.assertIn(f"<figure id=\"{job.name}\">", content)
+                self.assertEqual(content.count("data:image/png;base64,"), len(jobs))
+
+                # the rendered plots are counted, also by the workers of the pool
+                with self.assertLogs(level="INFO") as logs:
+                    gallery.render(jobs, tmp_dir, "png", workers, progress_mode="log")
+                self.assertIn(f"Plotting: {len(jobs)}/{len(jobs)} entries", logs.output[-1])
+            self.assertEqual(plt.get_fignums(), [])
+
+    # Test the corner cases
+    def test_arguments(self):
+        """ This tests empty job lists and unknown formats """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.assertEqual(gallery.render([], tmp_dir, "html"), [])
+            with self.assertRaises(ValueError):
+                gallery.render(generate_jobs(1), tmp_dir, "svg")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+""" Unit test for thread scaling plotting"""
+#!/usr/bin/env python3
+import unittest
+import matplotlib.pyplot as plt
+
+from plotting import scaling
+from plotting import style
+
+class TestScaling(unittest.TestCase):
+    """ Test the scaling plotting with a TestCase class """
+
+    # Test the speedup curve
+    def test_speedup(self):
+        """ This tests the speedup curve with the ideal scaling """
+
+        fig, ax = plt.subplots()
+        scaling.speedup(ax, [1, 2, 4], [1., 1.8, 3.1], style.Style(color="blue"), "test")
+        self.assertEqual(len(ax.get_lines()), 2)
+        self.assertEqual(list(ax.get_lines()[1].get_ydata()), [1., 1.8, 3.1])
+        plt.close(fig)
+
+    # Test the per algorithm breakdown
+    def test_breakdown(self):
+        """ This tests the largest algorithms and the summed others """
+
+        fig, ax = plt.subplots()
+        algorithms = [{"Algorithm:Propagation": 0.01, "Reader:Gun": 0.001, "Writer:Summary": 0.002},
+                      {"Algorithm:Propagation": 0.02, "Reader:Gun": 0.001, "Writer:Summary": 0.004}]
+        shown = scaling.breakdown(ax, [1, 2], algorithms, max_algorithms=2)
+        self.assertEqual(shown, ["Algorithm:Propagation", "Writer:Summary"])
+        # two bars per shown algorithm and the others
+        self.assertEqual(len(ax.patches), 6)
+        plt.close(fig)
+
+if __name__ == '__main__':
+    unittest.main()